@@ -1,2 +1,27 @@
-#TODO: get activities
-#TODO: create activities
\ No newline at end of file
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.shards import ShardSessions, get_read_shards, get_group_read_db
+from app.core.dependencies import get_current_user
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.services.activity_services import list_group_activity, list_user_activity
+
+router = APIRouter()
+
+@router.get("/groups/{group_id}/activity-log", description="group activity, newest first")
+async def group_activity(
+    group_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None,
+    db: AsyncSession = Depends(get_group_read_db),
+    user = Depends(get_current_user)
+):
+    return await list_group_activity(db, user.id, group_id, limit=limit, after=after)
+
+@router.get("/users/me/activity", description="activity across my groups, newest first")
+async def my_activity(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None,
+    shards: ShardSessions = Depends(get_read_shards),
+    user = Depends(get_current_user)
+):
+    return await list_user_activity(shards, user.id, limit=limit, after=after)
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.session import get_db
+from typing import Literal
+from app.db.shards import ShardSessions, get_read_shards
 from app.core.dependencies import get_current_user
 from app.services.balance_services import get_overall_balances, get_user_balance, get_simplified_balances
 
@@ -8,21 +8,22 @@ router = APIRouter()
 
 @router.get("/overall")
 async def overall_balances(
-    db: AsyncSession = Depends(get_db)
+    shards: ShardSessions = Depends(get_read_shards)
 ):
-    return await get_overall_balances(db)
+    return await get_overall_balances(shards)
 
 
 @router.get("/user/{user_id}")
 async def user_balance(
     user_id: int,
-    db: AsyncSession = Depends(get_db)
+    shards: ShardSessions = Depends(get_read_shards)
 ):
-    return await get_user_balance(db, user_id)
+    return await get_user_balance(shards, user_id)
 
 
 @router.get("/simplified")
 async def simplified_balances(
-    db: AsyncSession = Depends(get_db)
+    strategy: Literal["optimal", "greedy"] = "greedy",
+    shards: ShardSessions = Depends(get_read_shards)
 ):
-    return await get_simplified_balances(db)
+    return await get_simplified_balances(shards, strategy=strategy)
@@ -1,61 +1,100 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Header, Request
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.session import get_db
-from app.schemas.expense import ExpenseCreate
-from app.services.expense_services import create_expense, delete_expense, edit_expense, get_my_expenses, get_debt, get_cred, get_expenses, get_expense_by_id
+from app.db.shards import ShardSessions, get_shards, get_read_shards, get_expense_db, get_expense_read_db
+from app.schemas.expense import ExpenseCreate, ExpenseUpdate, ExpenseBulkCreate
+from app.services.expense_services import create_expense, bulk_create_expenses_sharded, delete_expense, edit_expense, get_my_expenses, get_debt, get_cred, get_expenses, get_expense_by_id
 from app.core.dependencies import get_current_user
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.core.idempotency import IDEMPOTENCY_HEADER, idempotent, request_fingerprint
 
 router = APIRouter()
 
 @router.post("/")
-async def add_expense(data: ExpenseCreate, db: AsyncSession = Depends(get_db), current_user = Depends(get_current_user)):
-    return await create_expense(db, data, current_user.id)
+async def add_expense(
+    data: ExpenseCreate,
+    request: Request,
+    idempotency_key: str | None = Header(None, alias=IDEMPOTENCY_HEADER),
+    shards: ShardSessions = Depends(get_shards),
+    current_user = Depends(get_current_user)
+):
+    db = shards.for_group(data.group_id)
+
+    return await idempotent(
+        db,
+        current_user.id,
+        idempotency_key,
+        request_fingerprint(request.method, request.url.path, data),
+        lambda before_commit: create_expense(db, data, current_user.id, before_commit=before_commit)
+    )
+
+@router.post("/bulk")
+async def add_expenses_bulk(data: ExpenseBulkCreate, shards: ShardSessions = Depends(get_shards), current_user = Depends(get_current_user)):
+    return await bulk_create_expenses_sharded(shards, data, current_user.id)
 
 @router.delete("/{expense_id}")
-async def del_expense(expense_id: int, db:AsyncSession = Depends(get_db), current_user = Depends(get_current_user)):
+async def del_expense(expense_id: int, db:AsyncSession = Depends(get_expense_db), current_user = Depends(get_current_user)):
     return await delete_expense(db, user_id=current_user.id, expense_id=expense_id)
 
 @router.patch("/{expense_id}")
-async def edit(data, expense_id: int, db: AsyncSession = Depends(get_db), current_user = Depends(get_current_user)):
+async def edit(data: ExpenseUpdate, expense_id: int, db: AsyncSession = Depends(get_expense_db), current_user = Depends(get_current_user)):
     return await edit_expense(db, data, expense_id=expense_id, user_id=current_user.id)
 
 @router.get("/my-expenses")
 async def expenses_paid_by_me(
-    db: AsyncSession = Depends(get_db),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    shards: ShardSessions = Depends(get_read_shards),
     current_user = Depends(get_current_user),
 ):
-    return await get_my_expenses(db, user_id=current_user.id)
+    return await get_my_expenses(shards, user_id=current_user.id, limit=limit, after=after, since=since, until=until)
 
 @router.get("/debt")
 async def expenses_i_owe(
-    db: AsyncSession = Depends(get_db),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    shards: ShardSessions = Depends(get_read_shards),
     current_user = Depends(get_current_user),
 ):
-    return await get_debt(db, user_id=current_user.id)
+    return await get_debt(shards, user_id=current_user.id, limit=limit, after=after, since=since, until=until)
 
 @router.get("/cred")
 async def expenses_i_am_owed(
-    db: AsyncSession = Depends(get_db),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    shards: ShardSessions = Depends(get_read_shards),
     current_user = Depends(get_current_user),
 ):
-    return await get_cred(db, user_id=current_user.id)
+    return await get_cred(shards, user_id=current_user.id, limit=limit, after=after, since=since, until=until)
 
 @router.get("/my-expenses/all")
 async def my_expenses(
-    db: AsyncSession = Depends(get_db),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    shards: ShardSessions = Depends(get_read_shards),
     current_user = Depends(get_current_user),
 ):
-    return await get_expenses(db, user_id=current_user.id)
+    return await get_expenses(shards, user_id=current_user.id, limit=limit, after=after, since=since, until=until)
 
 @router.get("/{expense_id}")
 async def fetch(
     expense_id: int,
-    db: AsyncSession = Depends(get_db),
+    include_archived: bool = Query(False, description="audit view: also deleted and archived expenses"),
+    db: AsyncSession = Depends(get_expense_read_db),
     current_user = Depends(get_current_user),
 ):
     return await get_expense_by_id(
         db,
         expense_id=expense_id,
-        user_id=current_user.id
+        user_id=current_user.id,
+        include_archived=include_archived
     )
 
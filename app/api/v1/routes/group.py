@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Header, Request
+from fastapi.responses import StreamingResponse
+from typing import Literal
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.session import get_db
-from app.services.group_services import create_group, add_member, list_group_for_user, list_group_members, delete_group, remove_member, exit_group, edit_group, get_group_settlement_plan, list_group_expenses
+from app.db.shards import ShardSessions, get_shards, get_read_shards, get_group_db, get_group_read_db, next_group_shard
+from app.services.group_services import create_group, add_member, list_group_for_user, list_group_members, delete_group, remove_member, exit_group, edit_group, get_group_settlement_plan, list_group_expenses, stream_group_expenses
 from app.schemas.group import GroupCreate, GroupMemberOut, GroupOut
 from app.schemas.balances import GroupBalanceOut
 from app.schemas.user import UserOut
 from app.core.dependencies import get_current_user, check_group_membership
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, created_between
+from app.core.idempotency import IDEMPOTENCY_HEADER, idempotent, request_fingerprint
+from app.core.events import stream_group_events
+from app.core.config import settings
 from app.services.settlement_service import compute_group_settlements, add_settlement, get_settlement_history,undo_settlement
 from app.schemas.settlements import Settlement, SettlementHistoryCreate, SettlementHistoryOut
 
@@ -14,59 +21,64 @@ router = APIRouter()
 @router.post("/", response_model=GroupOut, description="create new group")
 async def create_new_group(
     data:GroupCreate,
-    db: AsyncSession = Depends(get_db),
+    shards: ShardSessions = Depends(get_shards),
     user = Depends(get_current_user)
 ):
-    group = await create_group(db, data.name, user.id)
+    group = await create_group(shards.get(next_group_shard()), data.name, user.id)
     return group
 
 @router.get("/my-groups", response_model=list[GroupOut], description="get user groups")
-async def my_groups(db: AsyncSession = Depends(get_db), user = Depends(get_current_user)):
-    return await list_group_for_user(db, user.id)
+async def my_groups(shards: ShardSessions = Depends(get_read_shards), user = Depends(get_current_user)):
+    return await list_group_for_user(shards, user.id)
 
 @router.patch("/{group_id}")
-async def edit(group_id: int, data, db: AsyncSession = Depends(get_db), current_user = Depends(get_current_user)):
+async def edit(group_id: int, data, db: AsyncSession = Depends(get_group_db), current_user = Depends(get_current_user)):
     await check_group_membership(db, group_id, current_user.id)
     return await edit_group(db, group_id, current_user.id, data)
 
 @router.delete("/{group_id}")
-async def del_group(group_id: int, db: AsyncSession = Depends(get_db), current_user: int = Depends(get_current_user)):
+async def del_group(group_id: int, db: AsyncSession = Depends(get_group_db), current_user: int = Depends(get_current_user)):
     return await delete_group(db, group_id=group_id, creator_id=current_user.id)
 
 @router.post("/{group_id}/add/{user_id}", response_model=GroupMemberOut)
 async def add_user_to_group(
     group_id: int, 
     user_id: int, 
-    db: AsyncSession = Depends(get_db), 
+    db: AsyncSession = Depends(get_group_db), 
     current_user = Depends(get_current_user)
 ):
     return await add_member(db, group_id, user_id, current_user.id)
 
 @router.delete("/{group_id}/remove/{user_id}")
-async def rem_mem(group_id: int, user_id : int, db: AsyncSession = Depends(get_db), current_user = Depends(get_current_user)):
+async def rem_mem(group_id: int, user_id : int, db: AsyncSession = Depends(get_group_db), current_user = Depends(get_current_user)):
     await check_group_membership(db, group_id, current_user.id)
     return await remove_member(db, group_id=group_id, user_id=user_id, creator_id = current_user.id)
 
 @router.delete("/{group_id}/exit")
-async def exit(group_id: int, db:AsyncSession = Depends(get_db), current_user = Depends(get_current_user)):
+async def exit(group_id: int, db:AsyncSession = Depends(get_group_db), current_user = Depends(get_current_user)):
     await check_group_membership(db, group_id, current_user.id)
     return await exit_group(db, group_id=group_id, user_id=current_user.id)
 
 @router.get("/{group_id}/group-members", response_model=list[UserOut])
-async def group_members(group_id: int, db: AsyncSession = Depends(get_db), current_user=Depends(get_current_user)):
+async def group_members(group_id: int, db: AsyncSession = Depends(get_group_read_db), current_user=Depends(get_current_user)):
     await check_group_membership(db, group_id, current_user.id)
     return await list_group_members(db, current_user.id, group_id=group_id)
 
 @router.get("/{group_id}/balances", response_model=GroupBalanceOut)
-async def group_balances(group_id: int, db: AsyncSession = Depends(get_db), current_user = Depends(get_current_user)):
+async def group_balances(
+    group_id: int,
+    strategy: Literal["optimal", "greedy"] = "greedy",
+    db: AsyncSession = Depends(get_group_read_db),
+    current_user = Depends(get_current_user)
+):
     await check_group_membership(db, group_id, current_user.id)
-    plan = await get_group_settlement_plan(db, group_id=group_id)
+    plan = await get_group_settlement_plan(db, group_id=group_id, strategy=strategy)
     return plan
 
 @router.get("/{group_id}/settlements", response_model=list[Settlement])
 async def get_group_settlements(
     group_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_group_read_db),
     user = Depends(get_current_user)
 ):
     return await compute_group_settlements(db, group_id, user.id)
@@ -74,23 +86,34 @@ async def get_group_settlements(
 @router.post("/{group_id}/settlements/add", response_model=SettlementHistoryOut)
 async def add_manual_settlement(
     data: SettlementHistoryCreate,
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    idempotency_key: str | None = Header(None, alias=IDEMPOTENCY_HEADER),
+    shards: ShardSessions = Depends(get_shards),
     user = Depends(get_current_user)
 ):
-    return await add_settlement(db, user.id, data)
+    db = shards.for_group(data.group_id)
+
+    return await idempotent(
+        db,
+        user.id,
+        idempotency_key,
+        request_fingerprint(request.method, request.url.path, data),
+        lambda before_commit: add_settlement(db, user.id, data, before_commit=before_commit),
+        encode=lambda s: SettlementHistoryOut.model_validate(s).model_dump(mode="json")
+    )
 
 @router.delete("/{group_id}/settlements/undo/{settlement_id}")
 async def undo_settlement_route(
     settlement_id: int,
-    db: AsyncSession = Depends(get_db),
+    shards: ShardSessions = Depends(get_shards),
     user = Depends(get_current_user)
 ):
-    return await undo_settlement(db, settlement_id, user.id)
+    return await undo_settlement(shards.for_row(settlement_id), settlement_id, user.id)
 
 @router.get("/{group_id}/settlement-history", response_model=list[SettlementHistoryOut])
 async def fetch_history(
     group_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_group_read_db),
     user = Depends(get_current_user)
 ):
     return await get_settlement_history(db, group_id, user.id)
@@ -98,9 +121,56 @@ async def fetch_history(
 @router.get("/{group_id}/expenses", description="get all expenses of the group")
 async def fetch_expenses(
     group_id: int,
-    db: AsyncSession = Depends(get_db),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None,
+    include_archived: bool = Query(False, description="audit view: also deleted and archived expenses"),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    db: AsyncSession = Depends(get_group_read_db),
+    user = Depends(get_current_user)
+):
+    return await list_group_expenses(
+        db, user.id, group_id, limit=limit, after=after,
+        include_archived=include_archived, since=since, until=until
+    )
+
+@router.get("/{group_id}/expenses/export", description="stream the group's full expense ledger")
+async def export_expenses(
+    group_id: int,
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    include_archived: bool = Query(False, description="audit view: also deleted and archived expenses"),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    db: AsyncSession = Depends(get_group_read_db),
     user = Depends(get_current_user)
 ):
-    return await list_group_expenses(db, user.id, group_id)
+    await check_group_membership(db, group_id, user.id)
+    # reject a bad window before the response starts
+    created_between(since, until)
+
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+
+    return StreamingResponse(
+        stream_group_expenses(db, group_id, fmt, include_archived=include_archived, since=since, until=until),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="group-{group_id}-expenses.{fmt}"'}
+    )
+
+@router.get("/{group_id}/events", description="live group events as Server-Sent Events")
+async def group_events(
+    group_id: int,
+    db: AsyncSession = Depends(get_group_read_db),
+    user = Depends(get_current_user)
+):
+    await check_group_membership(db, group_id, user.id)
+
+    # the stream can stay open for hours; don't hold a pooled connection for it
+    await db.close()
+
+    return StreamingResponse(
+        stream_group_events(group_id, user.id, settings.EVENTS_KEEPALIVE_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # 14 - Group APIs
\ No newline at end of file
@@ -1,2 +1,33 @@
-#TODO: /notifications
-#TODO: /notifications/mark-read
\ No newline at end of file
+from fastapi import APIRouter, Depends, Query
+from app.db.shards import ShardSessions, get_shards, get_read_shards
+from app.core.dependencies import get_current_user
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.schemas.notifications import NotificationMarkRead
+from app.services.notification_services import list_notifications, get_unread_count, mark_read
+
+router = APIRouter()
+
+@router.get("/", description="my notifications, newest first")
+async def get_notifications(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None,
+    unread_only: bool = False,
+    shards: ShardSessions = Depends(get_read_shards),
+    user = Depends(get_current_user)
+):
+    return await list_notifications(shards, user.id, limit=limit, after=after, unread_only=unread_only)
+
+@router.get("/unread-count", description="unread badge")
+async def unread_count(
+    shards: ShardSessions = Depends(get_read_shards),
+    user = Depends(get_current_user)
+):
+    return {"unread_count": await get_unread_count(shards, user.id)}
+
+@router.post("/mark-read", description="mark an id range (or everything) as read")
+async def mark_notifications_read(
+    data: NotificationMarkRead,
+    shards: ShardSessions = Depends(get_shards),
+    user = Depends(get_current_user)
+):
+    return await mark_read(shards, user.id, from_id=data.from_id, to_id=data.to_id)
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.responses import PlainTextResponse
 from app.services.system_services import check_db_service, system_metrics, system_health
-from app.db.session import get_db
+from app.db.shards import ShardSessions, get_shards
 
 router = APIRouter()
 
@@ -9,11 +9,14 @@ router = APIRouter()
 async def check_db():
     return await check_db_service()
 
-@router.get("/metrics")
+@router.get("/metrics", response_class=PlainTextResponse)
 async def metrics(
-    db: AsyncSession = Depends(get_db)
+    shards: ShardSessions = Depends(get_shards)
 ):
-    return await system_metrics(db)
+    return PlainTextResponse(
+        await system_metrics(shards),
+        media_type="text/plain; version=0.0.4"
+    )
 
 @router.get("/health")
 async def health():
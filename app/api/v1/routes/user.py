@@ -1,18 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, Response, Cookie
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
+from app.db.shards import ShardSessions, get_read_shards
 from app.schemas.user import UserCreate, UserOut, UserLogin
 from app.models.user import User
 from app.services.user_service import create_user, edit_user, login_user_service
 from app.services.user_queries import get_all_users, get_user_by_id
 from app.core.dependencies import get_current_user
 from app.core.jwt_config import create_access_token, create_refresh_token, decode_token
-from app.core.utils import get_user_total_balance
+from app.core.utils import get_user_total_balance, cents_to_float
+from app.core.principal_cache import principal_cache
 
 router = APIRouter()
 
 @router.get("/", response_model=list[UserOut])
-async def get_all(db:AsyncSession = Depends(get_db)):
+async def get_all(db:AsyncSession = Depends(get_read_db)):
     users = await get_all_users(db)
     return users
 
@@ -85,8 +87,11 @@ async def refresh_token(
 
     new_refresh = create_refresh_token({"sub" : str(user.id)})
 
+    user.refresh_token = new_refresh
+
     await db.commit()
     await db.refresh(user)
+    principal_cache.invalidate_user(user.id)
     
     response.set_cookie(
         "refresh_token",
@@ -110,6 +115,7 @@ async def refresh_token(
 async def logout_user(response: Response, db: AsyncSession = Depends(get_db), current_user : User = Depends(get_current_user)):
     current_user.refresh_token = None
     await db.commit()
+    principal_cache.invalidate_user(current_user.id)
 
     response.delete_cookie("refresh_token")
     return {"message":"Logged out"}
@@ -119,6 +125,6 @@ async def edit(data, db:AsyncSession = Depends(get_db), current_user = Depends(g
     return await edit_user(db, data, user_id=current_user.id)
 
 @router.get("/{user_id}/balance")
-async def user_balance(user_id: int, db: AsyncSession = Depends(get_db)):
-    bal = await get_user_total_balance(db, user_id=user_id)
-    return {"user_id": user_id, "amount": float(bal)}
\ No newline at end of file
+async def user_balance(user_id: int, shards: ShardSessions = Depends(get_read_shards)):
+    bal = sum(await shards.gather(lambda db: get_user_total_balance(db, user_id=user_id)))
+    return {"user_id": user_id, "amount": cents_to_float(bal)}
\ No newline at end of file
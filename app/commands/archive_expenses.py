@@ -0,0 +1,29 @@
+import argparse
+import asyncio
+from app.core.archiver import expense_archiver
+from app.db.shards import shard_engines, shard_sessionmakers
+
+async def run(settled_after_days: int | None):
+    if settled_after_days is not None:
+        expense_archiver.settled_after_days = settled_after_days
+
+    moved = 0
+    for sessionmaker in shard_sessionmakers:
+        async with sessionmaker() as db:
+            moved += await expense_archiver.archive(db)
+
+    for e in shard_engines:
+        await e.dispose()
+
+    stats = expense_archiver.stats()
+    print(f"Archived {moved} expenses ({stats['archived_deleted']} deleted, {stats['archived_settled']} settled) in {stats['batches']} batches")
+
+def main():
+    parser = argparse.ArgumentParser(description="Move deleted (and optionally settled) expenses to the archive tables now")
+    parser.add_argument("--settled-after-days", type=int, default=None, help="also archive settled expenses older than this (overrides ARCHIVE_SETTLED_AFTER_DAYS)")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.settled_after_days))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+from sqlalchemy import select, func, text
+from app.db.session import Base
+from app.db.shards import SHARD_COUNT, shard_engines, shard_sessionmakers
+from app.models.user import User
+from app.models.group import Group
+from app.services.user_service import mirror_users
+# every table with an id sequence has to be on Base.metadata
+import app.models.group_member
+import app.models.expense
+import app.models.expense_split
+import app.models.settlement_history
+import app.models.group_balance
+import app.models.idempotency_key
+import app.models.activity
+import app.models.notification
+
+USER_BATCH = 1000
+
+def _next_id(max_id: int, shard: int) -> int:
+    # smallest id above max_id that belongs to this shard
+    start = max_id + 1
+    return start + (shard - start) % SHARD_COUNT
+
+async def _interleave_sequences(shard: int) -> int:
+    # users keep their shard-0 ids everywhere, so only the other tables' sequences move
+    tables = [
+        t for t in Base.metadata.sorted_tables
+        if t.name != User.__tablename__ and "id" in t.c and t.c.id.primary_key
+    ]
+    changed = 0
+
+    async with shard_engines[shard].begin() as conn:
+        for table in tables:
+            seq = await conn.scalar(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": table.name})
+            if seq is None:
+                continue
+
+            max_id = await conn.scalar(select(func.coalesce(func.max(table.c.id), 0)))
+            await conn.execute(text(
+                f"ALTER SEQUENCE {seq} INCREMENT BY {SHARD_COUNT} MINVALUE 1 "
+                f"RESTART WITH {_next_id(max_id, shard)}"
+            ))
+            changed += 1
+
+    return changed
+
+async def _misplaced_groups(shard: int) -> int:
+    async with shard_sessionmakers[shard]() as db:
+        q = select(func.count(Group.id)).where(Group.id % SHARD_COUNT != shard)
+        return (await db.execute(q)).scalar()
+
+async def _backfill_users() -> int:
+    copied = 0
+    last_id = 0
+
+    async with shard_sessionmakers[0]() as db:
+        while True:
+            q = select(User).where(User.id > last_id).order_by(User.id).limit(USER_BATCH)
+            users = (await db.execute(q)).scalars().all()
+            if not users:
+                return copied
+
+            await mirror_users(users)
+            copied += len(users)
+            last_id = users[-1].id
+
+async def run():
+    if SHARD_COUNT == 1:
+        print("Only one shard configured (SHARD_DATABASE_URLS is empty): nothing to do")
+        return
+
+    if any(e.dialect.name != "postgresql" for e in shard_engines):
+        raise SystemExit("Sharding needs PostgreSQL sequences on every shard")
+
+    # 1. Every group must already sit on the shard its id points at
+    for shard in range(SHARD_COUNT):
+        misplaced = await _misplaced_groups(shard)
+        if misplaced:
+            raise SystemExit(
+                f"Shard {shard} holds {misplaced} groups whose id belongs to another shard; "
+                "move them before enabling sharding"
+            )
+
+    # 2. Interleave ids: shard k hands out k, k + N, k + 2N, ...
+    for shard in range(SHARD_COUNT):
+        changed = await _interleave_sequences(shard)
+        print(f"Shard {shard}: {changed} sequences now step by {SHARD_COUNT}")
+
+    # 3. Copy users to the other shards (without their password hashes;
+    # re-running this clears hashes mirrored by earlier versions)
+    print(f"Mirrored {await _backfill_users()} users to {SHARD_COUNT - 1} shards")
+
+    for e in shard_engines:
+        await e.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description="Prepare the databases in SHARD_DATABASE_URLS: interleave id sequences and mirror users")
+    parser.parse_args()
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import argparse
+import asyncio
+from app.db.shards import shard_for, shard_sessionmakers
+from app.services.ledger_services import rebuild_group_balances
+
+async def run(group_id: int | None):
+    # one group lives on one shard; a full rebuild walks all of them
+    shards = [shard_for(group_id)] if group_id is not None else range(len(shard_sessionmakers))
+    rows = 0
+
+    for shard in shards:
+        async with shard_sessionmakers[shard]() as db:
+            rows += await rebuild_group_balances(db, group_id=group_id)
+            await db.commit()
+
+    scope = f"group {group_id}" if group_id is not None else "all groups"
+    print(f"Rebuilt {rows} balance rows for {scope}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the group_balances ledger from expenses and settlements")
+    parser.add_argument("--group-id", type=int, default=None, help="only rebuild this group")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.group_id))
+
+if __name__ == "__main__":
+    main()
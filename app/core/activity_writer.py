@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from app.core.config import settings
+from app.db.shards import shard_for, shard_sessionmakers
+from app.models.activity import Activity
+from app.models.group import Group
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_COLUMNS = ("group_id", "actor_id", "action", "expense_id", "settlement_id", "target_user_id", "amount_cents")
+
+class ActivityWriter:
+    # Write-behind buffer for the activity log. record() only appends to a list,
+    # so mutations never wait on it; run() flushes with one multi-row INSERT
+    # when flush_size events are pending or flush_interval has passed.
+    def __init__(self, flush_size: int, flush_interval: float, buffer_limit: int):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.buffer_limit = buffer_limit
+        self._buffer: List[dict] = []
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.failures = 0
+
+    def record(self, group_id: int, actor_id: int, action: str, **fields):
+        row = dict.fromkeys(ACTIVITY_COLUMNS)
+        row.update(fields, group_id=group_id, actor_id=actor_id, action=action)
+        row["created_at"] = datetime.now(timezone.utc)
+
+        self._buffer.append(row)
+        self.recorded += 1
+
+        # Bounded while the database is unreachable: drop the oldest events
+        overflow = len(self._buffer) - self.buffer_limit
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.dropped += overflow
+
+        if len(self._buffer) >= self.flush_size:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            if not self._buffer:
+                return 0
+
+            rows, self._buffer = self._buffer, []
+
+            # each event goes to its group's shard
+            by_shard: Dict[int, List[dict]] = {}
+            for row in rows:
+                by_shard.setdefault(shard_for(row["group_id"]), []).append(row)
+
+            written = 0
+            for shard, shard_rows in list(by_shard.items()):
+                try:
+                    written += await self._write(shard, shard_rows)
+                except Exception:
+                    # keep what is left for the next attempt, ahead of newer events
+                    self._buffer[:0] = [row for row in rows if shard_for(row["group_id"]) in by_shard]
+                    self.written += written
+                    self.failures += 1
+                    raise
+                del by_shard[shard]
+
+            self.written += written
+            self.flushes += 1
+            return written
+
+    async def _write(self, shard: int, rows: List[dict]) -> int:
+        async with shard_sessionmakers[shard]() as db:
+            try:
+                await db.execute(insert(Activity.__table__), rows)
+            except IntegrityError:
+                # a group was deleted after its events were recorded
+                await db.rollback()
+                rows = await self._without_deleted_groups(db, rows)
+                if rows:
+                    await db.execute(insert(Activity.__table__), rows)
+            await db.commit()
+
+        return len(rows)
+
+    async def _without_deleted_groups(self, db, rows: List[dict]) -> List[dict]:
+        group_ids = {row["group_id"] for row in rows}
+        existing = set((await db.execute(select(Group.id).where(Group.id.in_(group_ids)))).scalars().all())
+
+        kept = [row for row in rows if row["group_id"] in existing]
+        self.dropped += len(rows) - len(kept)
+        return kept
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("activity flush failed")
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "failures": self.failures
+        }
+
+activity_writer = ActivityWriter(
+    flush_size=settings.ACTIVITY_FLUSH_SIZE,
+    flush_interval=settings.ACTIVITY_FLUSH_INTERVAL_SECONDS,
+    buffer_limit=settings.ACTIVITY_BUFFER_LIMIT
+)
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List
+from sqlalchemy import select, insert, delete, exists, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.db.shards import shard_sessionmakers
+from app.models.expense import Expense
+from app.models.expense_split import ExpenseSplit
+from app.models.expense_archive import ExpenseArchive, ExpenseSplitArchive
+from app.models.group_balance import GroupBalance
+from app.models.settlement_history import SettlementHistory
+
+logger = logging.getLogger(__name__)
+
+EXPENSE_COLUMNS = ("id", "group_id", "paid_by", "amount", "description", "created_at", "is_deleted")
+SPLIT_COLUMNS = ("id", "expense_id", "user_id", "amount")
+
+class ExpenseArchiver:
+    # Moves soft-deleted expenses (and, when settled_after_days is set, expenses
+    # a fully settled group no longer needs) out of the hot tables, batch_size
+    # expenses per transaction so locks stay short and replicas keep up.
+    def __init__(self, batch_size: int, interval: float, settled_after_days: int):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.settled_after_days = settled_after_days
+
+        self.archived_deleted = 0
+        self.archived_settled = 0
+        self.batches = 0
+        self.failures = 0
+
+    def _deleted_batch(self):
+        return (
+            select(Expense.id)
+            .where(Expense.is_deleted == True)
+            .order_by(Expense.id)
+            .limit(self.batch_size)
+            .with_for_update(of=Expense, skip_locked=True)
+        )
+
+    def _settled_batch(self):
+        # A group whose balances are all zero was fully settled by its latest
+        # settlement; everything before it can't change anyone's balance again.
+        unsettled = exists().where(
+            GroupBalance.group_id == SettlementHistory.group_id,
+            GroupBalance.net_cents != 0
+        )
+        settled = (
+            select(SettlementHistory.group_id, func.max(SettlementHistory.created_at).label("settled_at"))
+            .where(~unsettled)
+            .group_by(SettlementHistory.group_id)
+            .subquery()
+        )
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.settled_after_days)
+
+        return (
+            select(Expense.id)
+            .join(settled, settled.c.group_id == Expense.group_id)
+            .where(
+                Expense.is_deleted == False,
+                Expense.created_at <= settled.c.settled_at,
+                Expense.created_at < cutoff
+            )
+            .order_by(Expense.id)
+            .limit(self.batch_size)
+            .with_for_update(of=Expense, skip_locked=True)
+        )
+
+    async def _move(self, db: AsyncSession, ids: List[int]) -> int:
+        # Copy expenses then splits, delete splits then expenses: one transaction
+        expense_cols = [Expense.__table__.c[c] for c in EXPENSE_COLUMNS]
+        split_cols = [ExpenseSplit.__table__.c[c] for c in SPLIT_COLUMNS]
+
+        await db.execute(
+            insert(ExpenseArchive.__table__)
+            .from_select(EXPENSE_COLUMNS, select(*expense_cols).where(Expense.id.in_(ids)))
+        )
+        await db.execute(
+            insert(ExpenseSplitArchive.__table__)
+            .from_select(SPLIT_COLUMNS, select(*split_cols).where(ExpenseSplit.expense_id.in_(ids)))
+        )
+
+        await db.execute(
+            delete(ExpenseSplit)
+            .where(ExpenseSplit.expense_id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        res = await db.execute(
+            delete(Expense)
+            .where(Expense.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+
+        await db.commit()
+        self.batches += 1
+        return res.rowcount
+
+    async def _drain(self, db: AsyncSession, batch_q) -> int:
+        moved = 0
+
+        while True:
+            ids = (await db.execute(batch_q)).scalars().all()
+            if not ids:
+                await db.rollback()
+                return moved
+
+            moved += await self._move(db, ids)
+
+            if len(ids) < self.batch_size:
+                return moved
+
+    async def archive(self, db: AsyncSession) -> int:
+        deleted = await self._drain(db, self._deleted_batch())
+        self.archived_deleted += deleted
+
+        settled = 0
+        if self.settled_after_days > 0:
+            settled = await self._drain(db, self._settled_batch())
+            self.archived_settled += settled
+
+        return deleted + settled
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+
+            for sessionmaker in shard_sessionmakers:
+                try:
+                    async with sessionmaker() as db:
+                        await self.archive(db)
+                except Exception:
+                    self.failures += 1
+                    logger.exception("expense archiving failed")
+
+    def stats(self) -> dict:
+        return {
+            "archived_deleted": self.archived_deleted,
+            "archived_settled": self.archived_settled,
+            "batches": self.batches,
+            "failures": self.failures
+        }
+
+expense_archiver = ExpenseArchiver(
+    batch_size=settings.ARCHIVE_BATCH_SIZE,
+    interval=settings.ARCHIVE_INTERVAL_SECONDS,
+    settled_after_days=settings.ARCHIVE_SETTLED_AFTER_DAYS
+)
@@ -1,9 +1,51 @@
 from pydantic_settings import BaseSettings
+from typing import Literal
 
 class Settings(BaseSettings):
     DATABASE_URL: str
     JWT_SECRET: str
     JWT_ALGO: str = "HS256"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_LIVENESS: Literal["pre_ping", "recycle", "none"] = "pre_ping"
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    SETTLEMENT_SOLVER_BUDGET_MS: int = 50
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_LIMIT: int = 64
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_CACHE_SIZE: int = 10000
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS: float = 3600
+    ACTIVITY_FLUSH_SIZE: int = 500
+    ACTIVITY_FLUSH_INTERVAL_SECONDS: float = 1.0
+    ACTIVITY_BUFFER_LIMIT: int = 100000
+    # Relay group events between workers over Postgres LISTEN/NOTIFY;
+    # leave off for a single worker (events then stay in-process)
+    EVENTS_PG_BRIDGE: bool = False
+    EVENTS_CHANNEL: str = "splitwise_group_events"
+    EVENTS_QUEUE_SIZE: int = 100
+    EVENTS_KEEPALIVE_SECONDS: float = 15
+    # Comma-separated replica URLs for GET routes; empty reads from the primary
+    READ_REPLICA_URLS: str = ""
+    # After a write, that user's reads stay on the primary for this long
+    READ_YOUR_WRITES_SECONDS: float = 5
+    READ_YOUR_WRITES_MAX_USERS: int = 100000
+    # Extra databases for group-scoped data, comma-separated; DATABASE_URL is
+    # shard 0. Run app.commands.init_shards after changing the list.
+    SHARD_DATABASE_URLS: str = ""
+    # Deleted expenses move to the *_archive tables in batches; with
+    # ARCHIVE_SETTLED_AFTER_DAYS > 0 so do expenses older than that from
+    # before a group's last full settlement
+    ARCHIVE_INTERVAL_SECONDS: float = 600
+    ARCHIVE_BATCH_SIZE: int = 500
+    ARCHIVE_SETTLED_AFTER_DAYS: int = 0
+    # Monthly expense partitions (PostgreSQL) are kept created this many
+    # months ahead, checked at startup and then every interval
+    EXPENSE_PARTITION_MONTHS_AHEAD: int = 3
+    EXPENSE_PARTITION_CHECK_SECONDS: float = 86400
 
     class Config:
         env_file = ".env"
@@ -2,49 +2,89 @@ from fastapi import Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.jwt_config import decode_token, get_token_from_cookie
 from app.services.user_queries import get_user_by_id
-from app.db.session import get_db
-from sqlalchemy import select
+from app.db.session import get_db, current_user_id
+from sqlalchemy import select, exists
+from typing import NamedTuple
 from app.models.group import Group
 from app.models.group_member import GroupMember
+from app.core.principal_cache import principal_cache, snapshot_user, user_from_snapshot
 
 async def get_current_user(request: Request,db: AsyncSession = Depends(get_db)):
     try:
         token = get_token_from_cookie(request=request)
         payload = decode_token(token)
-        print(payload)
         user_id = payload.get("sub")
         
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
         
+        cache_key = (int(user_id), payload.get("jti") or payload.get("iat"))
+        cached = principal_cache.get(cache_key)
+
+        if cached is not None:
+            current_user_id.set(cache_key[0])
+            # Attach to this request's session without a round trip
+            return await db.merge(user_from_snapshot(cached), load=False)
+
         user = await get_user_by_id(db, int(user_id))
 
         if user is None:
             raise HTTPException(status_code=401, detail="User not found")
         
+        principal_cache.put(cache_key, snapshot_user(user))
+        current_user_id.set(user.id)
         return user
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
     
-async def check_group_membership(db: AsyncSession, group_id: int, user_id: int):
-    q_group = select(Group).where(Group.id == group_id)
-    res_group = await db.execute(q_group)
-    group = res_group.scalar_one_or_none()
+class GroupAccess(NamedTuple):
+    group_id: int
+    user_id: int
+    created_by: int | None
+    is_member: bool
 
-    if not group:
-        raise HTTPException(404, "Group does not exist")
+    @property
+    def is_admin(self) -> bool:
+        return self.created_by == self.user_id
+
+async def get_group_access(db: AsyncSession, group_id: int, user_id: int) -> GroupAccess | None:
+    # Group existence, creator and membership in one statement, memoized on the
+    # session (one session per request) so routes and services share the result.
+    memo = db.info.setdefault("group_access", {})
+    key = (group_id, user_id)
+
+    if key in memo:
+        return memo[key]
 
-    q_member = select(GroupMember).where(
-        GroupMember.group_id == group_id,
+    is_member = exists().where(
+        GroupMember.group_id == Group.id,
         GroupMember.user_id == user_id
     )
+    q = select(Group.created_by, is_member.label("is_member")).where(Group.id == group_id)
+    row = (await db.execute(q)).first()
 
-    res_member = await db.execute(q_member)
-    member = res_member.scalar_one_or_none()
+    access = None
+    if row is not None:
+        access = GroupAccess(group_id, user_id, row.created_by, bool(row.is_member))
+
+    memo[key] = access
+    return access
+
+def forget_group_access(db: AsyncSession, group_id: int):
+    # Call after changing a group's membership within the same session
+    memo = db.info.get("group_access", {})
+    for key in [k for k in memo if k[0] == group_id]:
+        del memo[key]
+
+async def check_group_membership(db: AsyncSession, group_id: int, user_id: int) -> GroupAccess:
+    access = await get_group_access(db, group_id, user_id)
+
+    if access is None:
+        raise HTTPException(404, "Group does not exist")
 
-    if not member:
+    if not access.is_member:
         raise HTTPException(403, "You are not a member of this group")
 
-    return member
\ No newline at end of file
+    return access
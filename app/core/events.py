@@ -0,0 +1,165 @@
+import asyncio
+import json
+import logging
+import uuid
+from contextlib import contextmanager
+from typing import AsyncIterator, Dict, Set
+import asyncpg
+from sqlalchemy.engine import make_url
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BRIDGE_RECONNECT_SECONDS = 5
+# NOTIFY payloads are capped at 8000 bytes; group events are far smaller
+MAX_NOTIFY_BYTES = 8000
+
+def _resync(group_id: int) -> dict:
+    # The subscriber may have missed events: refetch balances / expenses
+    return {"type": "resync", "group_id": group_id}
+
+class EventHub:
+    # In-process pub/sub for group events. publish() is synchronous so services
+    # can call it right after commit. With the Postgres bridge running, events
+    # are also relayed to the other workers over NOTIFY, and theirs come back
+    # in over LISTEN; each worker skips its own messages.
+    def __init__(self, queue_size: int, channel: str):
+        self.queue_size = queue_size
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._outbox: asyncio.Queue | None = None
+
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+        self.relayed = 0
+        self.received = 0
+
+    @contextmanager
+    def subscribe(self, group_id: int):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(group_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(group_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[group_id]
+
+    def publish(self, group_id: int, event_type: str, **fields):
+        event = {"type": event_type, "group_id": group_id, **fields}
+        self.published += 1
+        self._deliver(event)
+
+        if self._outbox is not None:
+            try:
+                self._outbox.put_nowait(event)
+            except asyncio.QueueFull:
+                logger.warning("event bridge backlog full, dropping %s", event_type)
+
+    def _deliver(self, event: dict):
+        for queue in self._subscribers.get(event["group_id"], ()):
+            if queue.full():
+                # slow client: drop what it hasn't read and tell it to refetch
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_resync(event["group_id"]))
+                self.overflows += 1
+                continue
+
+            queue.put_nowait(event)
+            self.delivered += 1
+
+    def _resync_all(self):
+        for group_id in list(self._subscribers):
+            self._deliver(_resync(group_id))
+
+    def _on_notify(self, conn, pid, channel, payload: str):
+        message = json.loads(payload)
+        if message["origin"] == self.origin:
+            return
+
+        self.received += 1
+        self._deliver(message["event"])
+
+    async def run_bridge(self, database_url: str):
+        dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        connected_before = False
+
+        while True:
+            try:
+                conn = await asyncpg.connect(dsn)
+            except Exception:
+                logger.exception("event bridge could not connect")
+                await asyncio.sleep(BRIDGE_RECONNECT_SECONDS)
+                continue
+
+            try:
+                await conn.add_listener(self.channel, self._on_notify)
+                self._outbox = asyncio.Queue(maxsize=self.queue_size * 100)
+
+                # events from other workers were lost while disconnected
+                if connected_before:
+                    self._resync_all()
+                connected_before = True
+
+                while True:
+                    event = await self._outbox.get()
+                    payload = json.dumps({"origin": self.origin, "event": event}, separators=(",", ":"))
+
+                    if len(payload.encode()) > MAX_NOTIFY_BYTES:
+                        logger.warning("event %s too large to relay", event["type"])
+                        continue
+
+                    await conn.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+                    self.relayed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("event bridge failed, reconnecting")
+            finally:
+                self._outbox = None
+                await conn.close(timeout=BRIDGE_RECONNECT_SECONDS)
+
+            await asyncio.sleep(BRIDGE_RECONNECT_SECONDS)
+
+    def stats(self) -> dict:
+        return {
+            "groups": len(self._subscribers),
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+            "relayed": self.relayed,
+            "received": self.received
+        }
+
+event_hub = EventHub(queue_size=settings.EVENTS_QUEUE_SIZE, channel=settings.EVENTS_CHANNEL)
+
+def _sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+async def stream_group_events(group_id: int, user_id: int, keepalive_seconds: float) -> AsyncIterator[str]:
+    with event_hub.subscribe(group_id) as queue:
+        # subscribed before the first byte, so a snapshot fetched after
+        # "ready" can't miss an event
+        yield _sse({"type": "ready", "group_id": group_id})
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=keepalive_seconds)
+            except asyncio.TimeoutError:
+                # comment line keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+                continue
+
+            yield _sse(event)
+
+            # the stream belongs to a member; stop once they aren't one
+            if event["type"] == "group_deleted":
+                return
+            if event["type"] == "member_left" and event.get("user_id") == user_id:
+                return
@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, NamedTuple, Tuple
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.db.shards import shard_sessionmakers
+from app.models.idempotency_key import IdempotencyKey
+from app.services.ledger_services import insert_for
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+# How long a request that finds a claim without a response waits for its
+# worker to store one before giving up with 409.
+PENDING_POLL_ATTEMPTS = 20
+PENDING_POLL_SECONDS = 0.1
+
+CacheKey = Tuple[int, str]
+
+class StoredResponse(NamedTuple):
+    fingerprint: str
+    status_code: int
+    body: str
+
+class IdempotencyCache:
+    # Hot LRU in front of idempotency_keys, plus the requests currently being
+    # processed so a concurrent duplicate in this process waits instead of racing.
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[CacheKey, Tuple[float, StoredResponse]]" = OrderedDict()
+        self.in_flight: Dict[CacheKey, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.conflicts = 0
+
+    def get(self, key: CacheKey) -> StoredResponse | None:
+        entry = self._entries.get(key)
+
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: CacheKey, stored: StoredResponse, age_seconds: float = 0):
+        if self.max_size <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl_seconds - age_seconds, stored)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "in_flight": len(self.in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "waits": self.waits,
+            "conflicts": self.conflicts
+        }
+
+idempotency_cache = IdempotencyCache(
+    max_size=settings.IDEMPOTENCY_CACHE_SIZE,
+    ttl_seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS
+)
+
+def request_fingerprint(method: str, path: str, payload) -> str:
+    raw = json.dumps([method, path, jsonable_encoder(payload)], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def _cutoff() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+
+def _age_seconds(created_at: datetime) -> float:
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - created_at).total_seconds()
+
+def _replay(stored: StoredResponse, fingerprint: str) -> Response:
+    if stored.fingerprint != fingerprint:
+        raise HTTPException(422, "Idempotency-Key was already used for a different request")
+
+    return Response(
+        content=stored.body,
+        status_code=stored.status_code,
+        media_type="application/json",
+        headers={REPLAY_HEADER: "true"}
+    )
+
+async def _load(db: AsyncSession, user_id: int, key: str) -> IdempotencyKey | None:
+    q = select(IdempotencyKey).where(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key
+    )
+    row = (await db.execute(q)).scalar_one_or_none()
+
+    if row is not None and _age_seconds(row.created_at) > settings.IDEMPOTENCY_KEY_TTL_SECONDS:
+        # expired but not purged yet: the key is free again
+        await db.delete(row)
+        await db.flush()
+        return None
+
+    return row
+
+def _remember(cache_key: CacheKey, row: IdempotencyKey) -> StoredResponse:
+    stored = StoredResponse(row.fingerprint, row.status_code, row.response_body)
+    idempotency_cache.put(cache_key, stored, age_seconds=_age_seconds(row.created_at))
+    return stored
+
+async def _wait_for_other_worker(db: AsyncSession, cache_key: CacheKey, fingerprint: str) -> Response | None:
+    for _ in range(PENDING_POLL_ATTEMPTS):
+        row = await _load(db, *cache_key)
+
+        if row is None:
+            return None
+        if row.fingerprint != fingerprint:
+            raise HTTPException(422, "Idempotency-Key was already used for a different request")
+        if row.status_code is not None:
+            return _replay(_remember(cache_key, row), fingerprint)
+
+        await db.rollback()
+        await asyncio.sleep(PENDING_POLL_SECONDS)
+
+    raise HTTPException(409, "A request with this Idempotency-Key is still being processed")
+
+async def idempotent(
+    db: AsyncSession,
+    user_id: int,
+    key: str | None,
+    fingerprint: str,
+    handler: Callable[[Callable[..., Awaitable] | None], Awaitable],
+    encode: Callable = jsonable_encoder
+):
+    # handler(before_commit) runs the write and awaits before_commit(result)
+    # right before its own commit, so the claim, the write and the stored
+    # response all land in that single commit.
+    if key is None:
+        return await handler(None)
+
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+
+    cache_key = (user_id, key)
+
+    # 1. Replay from memory, or wait for the same key already running here
+    while True:
+        stored = idempotency_cache.get(cache_key)
+        if stored is not None:
+            return _replay(stored, fingerprint)
+
+        running = idempotency_cache.in_flight.get(cache_key)
+        if running is None:
+            break
+
+        idempotency_cache.waits += 1
+        await asyncio.shield(running)
+
+    done = asyncio.get_running_loop().create_future()
+    idempotency_cache.in_flight[cache_key] = done
+
+    try:
+        # 2. Replay from the table (other workers, or evicted from the LRU)
+        row = await _load(db, user_id, key)
+
+        if row is not None:
+            if row.status_code is None:
+                idempotency_cache.conflicts += 1
+                replay = await _wait_for_other_worker(db, cache_key, fingerprint)
+                if replay is not None:
+                    return replay
+            else:
+                if row.fingerprint != fingerprint:
+                    raise HTTPException(422, "Idempotency-Key was already used for a different request")
+                return _replay(_remember(cache_key, row), fingerprint)
+
+        # 3. Claim the key. A concurrent claim of the same key makes this wait
+        # until that transaction ends and then insert nothing; any other
+        # integrity error belongs to the write and propagates as is.
+        claim = insert_for(db)(IdempotencyKey).values(user_id=user_id, key=key, fingerprint=fingerprint)
+        claim = claim.on_conflict_do_nothing(index_elements=[IdempotencyKey.user_id, IdempotencyKey.key])
+
+        if not (await db.execute(claim)).rowcount:
+            await db.rollback()
+            idempotency_cache.conflicts += 1
+            replay = await _wait_for_other_worker(db, cache_key, fingerprint)
+            if replay is None:
+                raise HTTPException(409, "A request with this Idempotency-Key is still being processed")
+            return replay
+
+        # 4. Store the response inside the handler's transaction; a failed
+        # request rolls everything back and leaves the key unused
+        body = None
+
+        async def store_response(result):
+            nonlocal body
+            body = json.dumps(encode(result))
+            await db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+                .values(status_code=200, response_body=body)
+            )
+
+        await handler(store_response)
+
+        idempotency_cache.put(cache_key, StoredResponse(fingerprint, 200, body))
+
+        return Response(content=body, status_code=200, media_type="application/json")
+    finally:
+        idempotency_cache.in_flight.pop(cache_key, None)
+        done.set_result(None)
+
+async def purge_expired_keys(db: AsyncSession) -> int:
+    res = await db.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < _cutoff()))
+    await db.commit()
+    return res.rowcount
+
+async def purge_loop(interval_seconds: float):
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            # keys are claimed on the shard of the write they guard
+            for sessionmaker in shard_sessionmakers:
+                async with sessionmaker() as db:
+                    await purge_expired_keys(db)
+        except Exception:
+            logger.exception("idempotency key purge failed")
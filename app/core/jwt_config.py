@@ -1,4 +1,5 @@
 import jwt
+import uuid
 from jwt import PyJWKError, ExpiredSignatureError
 from datetime import datetime, timedelta, timezone
 from app.core.config import settings
@@ -6,15 +7,17 @@ from fastapi import HTTPException, Request
 
 def create_access_token(data: dict, expires_min: int = 30):
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(minutes=expires_min)
-    to_encode.update({"exp": expire})
+    now = datetime.now(timezone.utc)
+    expire = now + timedelta(minutes=expires_min)
+    to_encode.update({"exp": expire, "iat": now, "jti": uuid.uuid4().hex})
 
     return jwt.encode(to_encode, settings.JWT_SECRET, algorithm = settings.JWT_ALGO)
 
 def create_refresh_token(data: dict, expires_days: int = 7):
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(days=expires_days)
-    to_encode.update({"exp" : expire})
+    now = datetime.now(timezone.utc)
+    expire = now + timedelta(days=expires_days)
+    to_encode.update({"exp" : expire, "iat": now, "jti": uuid.uuid4().hex})
 
     return jwt.encode(to_encode, settings.JWT_SECRET, algorithm = settings.JWT_ALGO)
 
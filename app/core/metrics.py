@@ -0,0 +1,238 @@
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+QUERY_COUNT_HEADER = "X-Query-Count"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Iterable[str], values: Iterable) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        # [bucket counts..., sum, count]
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+
+        for labels, series in sorted(self._series.items()):
+            for bound, count in zip(self.buckets, series):
+                le = _format_labels(self.labelnames + ("le",), labels + (bound,))
+                lines.append(f"{self.name}_bucket{le} {count}")
+            inf = _format_labels(self.labelnames + ("le",), labels + ("+Inf",))
+            lines.append(f"{self.name}_bucket{inf} {series[-1]}")
+
+            base = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{base} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{base} {series[-1]}")
+
+        return lines
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, labels: tuple, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+def gauge_lines(name: str, help: str, value) -> List[str]:
+    return [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {_format_value(value)}"]
+
+# Type and help text of every key a component's stats() may report.
+# Counters only ever grow while the process lives, so Prometheus treats a
+# drop as a restart; they are exported with a _total suffix.
+STAT_METRICS: Dict[str, Tuple[str, str]] = {
+    # caches
+    "size": ("gauge", "entries held"),
+    "max_size": ("gauge", "entry limit"),
+    "ttl_seconds": ("gauge", "entry lifetime in seconds"),
+    "hits": ("counter", "lookups answered from memory"),
+    "misses": ("counter", "lookups that missed"),
+    "invalidations": ("counter", "entries invalidated"),
+    "in_flight": ("gauge", "requests being processed"),
+    "waits": ("counter", "duplicate requests that waited for the first one"),
+    "conflicts": ("counter", "keys found claimed by another worker"),
+    # worker pools
+    "workers": ("gauge", "worker threads"),
+    "queue_limit": ("gauge", "queued jobs allowed before rejecting"),
+    "queue_depth": ("gauge", "jobs waiting for a worker"),
+    "completed": ("counter", "jobs completed"),
+    "rejected": ("counter", "jobs rejected with a full queue"),
+    "wait_seconds_total": ("counter", "seconds spent waiting"),
+    "wait_seconds_max": ("gauge", "longest single wait in seconds"),
+    # background writers
+    "buffered": ("gauge", "rows waiting to be written"),
+    "recorded": ("counter", "rows recorded"),
+    "written": ("counter", "rows written"),
+    "dropped": ("counter", "rows dropped with a full buffer"),
+    "flushes": ("counter", "batches flushed"),
+    "failures": ("counter", "batches that failed"),
+    "archived_deleted": ("counter", "deleted expenses archived"),
+    "archived_settled": ("counter", "settled expenses archived"),
+    "batches": ("counter", "batches processed"),
+    # live events
+    "groups": ("gauge", "groups with subscribers"),
+    "subscribers": ("gauge", "open event streams"),
+    "published": ("counter", "events published"),
+    "delivered": ("counter", "events delivered to streams"),
+    "overflows": ("counter", "events dropped for slow streams"),
+    "relayed": ("counter", "events relayed to other workers"),
+    "received": ("counter", "events received from other workers"),
+    # connection pools
+    "checked_out": ("gauge", "connections in use"),
+    "overflow": ("gauge", "connections open beyond the pool size"),
+    "checkouts": ("counter", "connections checked out"),
+    "timeouts": ("counter", "checkouts that timed out"),
+    "connects": ("counter", "connections opened"),
+    "connect_seconds_total": ("counter", "seconds spent opening connections"),
+    # read routing
+    "replicas": ("gauge", "read replicas"),
+    "pinned_users": ("gauge", "users pinned to the primary"),
+    "pins": ("counter", "writes that pinned their user to the primary"),
+    "pinned_reads": ("counter", "reads sent to the primary by a pin"),
+}
+
+def stats_lines(prefix: str, subject: str, stats: dict) -> List[str]:
+    # One HELP / TYPE / sample block per stat, named prefix_key
+    lines = []
+    for key, value in stats.items():
+        if value is None:
+            continue
+
+        kind, help = STAT_METRICS.get(key, ("gauge", key.replace("_", " ")))
+        name = f"{prefix}_{key}"
+        if kind == "counter" and not name.endswith("_total"):
+            name += "_total"
+
+        lines += [f"# HELP {name} {subject}: {help}", f"# TYPE {name} {kind}", f"{name} {_format_value(value)}"]
+    return lines
+
+REQUEST_LATENCY = Histogram(
+    "splitwise_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ("method", "route"),
+    LATENCY_BUCKETS
+)
+REQUESTS = Counter(
+    "splitwise_http_requests_total",
+    "HTTP requests by route and status",
+    ("method", "route", "status")
+)
+REQUEST_QUERIES = Histogram(
+    "splitwise_db_queries_per_request",
+    "SQL statements executed per request",
+    ("method", "route"),
+    QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_TIME = Counter(
+    "splitwise_db_time_seconds_total",
+    "Time spent executing SQL statements by route",
+    ("method", "route")
+)
+
+def render_http_metrics() -> List[str]:
+    return (
+        REQUEST_LATENCY.render()
+        + REQUESTS.render()
+        + REQUEST_QUERIES.render()
+        + REQUEST_DB_TIME.render()
+    )
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = request_stats.get()
+
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - context._metrics_started
+
+def install_query_hooks(engine):
+    # Works for AsyncEngine as well: events fire on the underlying sync engine,
+    # inside a greenlet that inherits the request's context.
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+class MetricsMiddleware:
+    # Plain ASGI middleware (not BaseHTTPMiddleware) so the endpoint runs in the
+    # same context as the RequestStats set here.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_query_count(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append(QUERY_COUNT_HEADER, str(stats.queries))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_query_count)
+        finally:
+            request_stats.reset(token)
+
+            # Label by route template, not raw path, to keep series bounded
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", "unmatched"))
+
+            REQUEST_LATENCY.observe(labels, time.perf_counter() - started)
+            REQUESTS.inc(labels + (str(status),))
+            REQUEST_QUERIES.observe(labels, stats.queries)
+            REQUEST_DB_TIME.inc(labels, stats.db_seconds)
@@ -0,0 +1,94 @@
+import base64
+import heapq
+import json
+from datetime import datetime
+from typing import List, Tuple
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(created_at: datetime, *ids: int) -> str:
+    raw = json.dumps({"created_at": created_at.isoformat(), "ids": list(ids)}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, id_count: int = 1) -> Tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        ids = [int(i) for i in data["ids"]]
+        created_at = datetime.fromisoformat(data["created_at"])
+    except Exception:
+        raise HTTPException(400, "Invalid cursor")
+
+    if len(ids) != id_count:
+        raise HTTPException(400, "Invalid cursor")
+
+    return (created_at, *ids)
+
+def keyset_page(q, created_col, *id_cols, limit: int, after: str | None = None):
+    # Same (created_at desc, id desc) ordering the list endpoints always used;
+    # the row-value comparison lets the planner seek straight to the cursor.
+    columns = (created_col, *id_cols)
+
+    if after:
+        q = q.where(tuple_(*columns) < tuple_(*decode_cursor(after, len(id_cols))))
+
+    # One extra row tells us whether another page exists
+    return q.order_by(*(c.desc() for c in columns)).limit(limit + 1)
+
+def created_between(since: datetime | None, until: datetime | None, *columns) -> List:
+    # Optional [since, until) window, applied to every given created_at column
+    # so the planner can skip whole monthly partitions of expenses / splits
+    if since is not None and until is not None and since >= until:
+        raise HTTPException(400, "since must be earlier than until")
+
+    conditions = []
+    for column in columns:
+        if since is not None:
+            conditions.append(column >= since)
+        if until is not None:
+            conditions.append(column < until)
+
+    return conditions
+
+def split_page(rows: List, limit: int, key) -> Tuple[List, str | None]:
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
+
+def encode_id_cursor(last_id: int) -> str:
+    raw = json.dumps({"id": last_id}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_id_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded.encode()))["id"])
+    except Exception:
+        raise HTTPException(400, "Invalid cursor")
+
+def id_page(q, id_col, limit: int, after: str | None = None):
+    # For append-only tables where the id alone orders rows (newest first)
+    if after:
+        q = q.where(id_col < decode_id_cursor(after))
+
+    return q.order_by(id_col.desc()).limit(limit + 1)
+
+def split_id_page(rows: List, limit: int, key) -> Tuple[List, str | None]:
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_id_cursor(key(rows[-1]))
+
+def merge_pages(pages: List[List], key) -> List:
+    # Pages fetched from every shard with the same cursor and ordering:
+    # interleave them newest first, then split_page / split_id_page cut it
+    if len(pages) == 1:
+        return pages[0]
+
+    return list(heapq.merge(*pages, key=key, reverse=True))
@@ -0,0 +1,46 @@
+import asyncio
+import logging
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.shards import shard_sessionmakers
+
+logger = logging.getLogger(__name__)
+
+# Installed by the partition migration (PostgreSQL only)
+PARTITION_FUNCTION = "create_expense_partitions(date, date)"
+
+async def ensure_expense_partitions(db: AsyncSession, months_ahead: int) -> int | None:
+    # Keeps monthly partitions of expenses / expense_splits ready from this
+    # month to months_ahead out. None where the tables aren't partitioned
+    # (SQLite, or a schema built with create_all).
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+
+    if await db.scalar(text("SELECT to_regprocedure(:fn) IS NULL"), {"fn": PARTITION_FUNCTION}):
+        return None
+
+    created = await db.scalar(
+        text("""
+            SELECT create_expense_partitions(
+                date_trunc('month', now())::date,
+                (date_trunc('month', now()) + make_interval(months => :months))::date
+            )
+        """),
+        {"months": months_ahead}
+    )
+    await db.commit()
+    return created
+
+async def partition_loop(interval_seconds: float, months_ahead: int):
+    # First pass at startup, then periodically
+    while True:
+        for sessionmaker in shard_sessionmakers:
+            try:
+                async with sessionmaker() as db:
+                    created = await ensure_expense_partitions(db, months_ahead)
+                if created:
+                    logger.info("created %d expense partitions", created)
+            except Exception:
+                logger.exception("expense partition maintenance failed")
+
+        await asyncio.sleep(interval_seconds)
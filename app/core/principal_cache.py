@@ -0,0 +1,91 @@
+from collections import OrderedDict
+from typing import Dict, Set, Tuple
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+import time
+from app.core.config import settings
+from app.models.user import User
+
+PrincipalKey = Tuple[int, object]
+
+class PrincipalCache:
+    # Bounded LRU of user column snapshots, keyed by (user_id, token id).
+    # Snapshots (not ORM instances) are stored so a cached principal is never
+    # shared between request sessions.
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[PrincipalKey, Tuple[float, dict]]" = OrderedDict()
+        self._keys_by_user: Dict[int, Set[PrincipalKey]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    def get(self, key: PrincipalKey) -> dict | None:
+        entry = self._entries.get(key)
+
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: PrincipalKey, snapshot: dict):
+        if not self.enabled:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, snapshot)
+        self._entries.move_to_end(key)
+        self._keys_by_user.setdefault(key[0], set()).add(key)
+
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def invalidate_user(self, user_id: int):
+        keys = self._keys_by_user.pop(user_id, set())
+        for key in keys:
+            self._entries.pop(key, None)
+        self.invalidations += 1
+
+    def _remove(self, key: PrincipalKey):
+        self._entries.pop(key, None)
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations
+        }
+
+principal_cache = PrincipalCache(
+    max_size=settings.PRINCIPAL_CACHE_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
+
+def snapshot_user(user: User) -> dict:
+    return {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+
+def user_from_snapshot(snapshot: dict) -> User:
+    # A detached, clean instance that Session.merge(load=False) can attach
+    # without emitting a SELECT
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return user
@@ -1,5 +1,10 @@
 from passlib.context import CryptContext
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from app.core.config import settings
+import asyncio
 import hashlib
+import time
 import bcrypt
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -13,3 +18,64 @@ def verify_password(password:str, hashed_password:str) -> bool:
     sha_digest = hashlib.sha256(password.encode("utf-8")).digest()
     return bcrypt.checkpw(sha_digest, hashed_password.encode())
 
+class PasswordHasherPool:
+    # bcrypt takes ~100-300 ms of CPU per call; running it on the event loop
+    # stalls every other request on the worker. Calls go to a small dedicated
+    # thread pool instead, and once workers + queue_limit calls are pending new
+    # ones are rejected with 503 rather than piling up behind a login burst.
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    async def run(self, fn, *args):
+        if self._pending >= self.workers + self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(503, "Server is busy, please retry", headers={"Retry-After": "1"})
+
+        self._pending += 1
+        queued_at = time.perf_counter()
+
+        def job():
+            waited = time.perf_counter() - queued_at
+            return waited, fn(*args)
+
+        try:
+            waited, result = await asyncio.get_running_loop().run_in_executor(self._executor, job)
+        finally:
+            self._pending -= 1
+
+        self.completed += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": min(self._pending, self.workers),
+            "queue_depth": max(self._pending - self.workers, 0),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6)
+        }
+
+password_pool = PasswordHasherPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_limit=settings.PASSWORD_HASH_QUEUE_LIMIT
+)
+
+async def hash_password_async(password: str) -> str:
+    return await password_pool.run(hash_password, password)
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    return await password_pool.run(verify_password, password, hashed_password)
@@ -1,27 +1,72 @@
 from decimal import Decimal, ROUND_HALF_UP, getcontext
+from fractions import Fraction
 from typing import Dict, List, Tuple
-from sqlalchemy import select, func
+from itertools import combinations
+import time
+from sqlalchemy import select, func, cast, union_all, false, true, BigInteger
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.expense import Expense
 from app.models.expense_split import ExpenseSplit
+from app.models.expense_archive import ExpenseArchive, ExpenseSplitArchive
+from app.models.group_balance import GroupBalance
+from app.models.settlement_history import SettlementHistory
+from app.core.config import settings
 from collections import deque
 
 getcontext().prec = 28
 CENTS= Decimal("0.01")
 
+# Above this many non-zero balances the exact bitmask DP (2^n states) is
+# replaced by the bounded zero-sum subset search.
+EXACT_SOLVER_MAX_USERS = 15
+HEURISTIC_MAX_SUBSET = 4
+
 def qround(d : Decimal) -> Decimal:
     return d.quantize(CENTS, rounding=ROUND_HALF_UP)
 
-def simplify_debts(net_map: Dict[int, Decimal]):
-    creditors = []
-    debtors = []
+def to_cents(amount) -> int:
+    return int((Decimal(str(amount)) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+def from_cents(cents: int) -> Decimal:
+    return Decimal(int(cents)).scaleb(-2)
+
+def allocate_cents(total_cents: int, weights: List) -> List[int]:
+    # Largest-remainder split of total_cents proportional to weights: floor every
+    # exact quota, then hand the leftover cents to the largest remainders
+    # (earlier entries win ties), so the parts always add up to the total.
+    weights = [Fraction(str(w)) for w in weights]
+    weight_sum = sum(weights)
+
+    quotas = [total_cents * w / weight_sum for w in weights]
+    parts = [q.numerator // q.denominator for q in quotas]
+
+    leftover = total_cents - sum(parts)
+    by_remainder = sorted(range(len(quotas)), key=lambda i: parts[i] - quotas[i])
+    for i in by_remainder[:leftover]:
+        parts[i] += 1
+
+    return parts
+
+def format_cents(cents: int) -> str:
+    # "12.30" / "-0.05": the only place balances turn back into decimal text
+    sign = "-" if cents < 0 else ""
+    whole, frac = divmod(abs(int(cents)), 100)
+    return f"{sign}{whole}.{frac:02d}"
+
+def cents_to_float(cents: int) -> float:
+    return int(cents) / 100
 
-    for uid, bal in net_map.items():
-        if bal > 0:
-            creditors.append([uid, bal])
-        elif bal < 0:
-            debtors.append([uid, -bal])
-    
+def sql_cents(column):
+    # NUMERIC / FLOAT money column -> exact BIGINT cents, computed in the database
+    return cast(func.round(column * 100), BigInteger)
+
+def sql_sum_cents(column):
+    return cast(func.coalesce(func.sum(sql_cents(column)), 0), BigInteger)
+
+def simplify_debts(net_map: Dict[int, int]) -> List[Tuple[int, int, int]]:
+    # net_map holds integer cents; transfers are (from_user, to_user, cents)
+    creditors = [(uid, bal) for uid, bal in net_map.items() if bal > 0]
+    debtors = [(uid, -bal) for uid, bal in net_map.items() if bal < 0]
 
     creditors.sort(key= lambda x: x[1], reverse=True)
     debtors.sort(key= lambda x: x[1], reverse=True)
@@ -29,81 +74,236 @@ def simplify_debts(net_map: Dict[int, Decimal]):
     creditors = deque(creditors)
     debtors = deque(debtors)
 
-    transfers : List[Tuple[int, int, Decimal]] = []
+    transfers : List[Tuple[int, int, int]] = []
 
     while creditors and debtors:
         cred_id, cred_amt = creditors[0]
         debt_id, debt_amt = debtors[0]
 
-        pay_amt = qround(min(cred_amt, debt_amt))
+        pay_amt = min(cred_amt, debt_amt)
 
         transfers.append((debt_id, cred_id, pay_amt))
 
-        new_cred = qround(cred_amt - pay_amt)
-        new_debt = qround(debt_amt - pay_amt)
-
         creditors.popleft()
         debtors.popleft()
 
-        if new_cred > Decimal("0"):
-            creditors.appendleft([cred_id, new_cred])
-        if new_debt > Decimal("0"):
-            debtors.appendleft([debt_id, new_debt])
+        if cred_amt > pay_amt:
+            creditors.appendleft((cred_id, cred_amt - pay_amt))
+        if debt_amt > pay_amt:
+            debtors.appendleft((debt_id, debt_amt - pay_amt))
     return transfers
 
-async def get_user_total_balance(db: AsyncSession, user_id: int):
-    paid_q = select(func.coalesce(func.sum(Expense.amount), 0)).where(Expense.paid_by == user_id)
-    paid_res = await db.execute(paid_q)
-    paid = Decimal(str(paid_res.scalar() or 0))
+class SolverBudgetExceeded(Exception):
+    pass
 
-    owed_q = (
-        select(func.coalesce(func.sum(ExpenseSplit.amount), 0))
-        .where(ExpenseSplit.user_id == user_id)
-        .join(Expense, Expense.id == ExpenseSplit.expense_id)
-    )
+def _check_deadline(deadline: float):
+    if time.thread_time() > deadline:
+        raise SolverBudgetExceeded()
 
-    owed_res = await db.execute(owed_q)
-    owed = Decimal(str(owed_res.scalar() or 0))
-    
-    return qround(paid - owed)
+def _zero_sum_groups_exact(amounts: List, deadline: float) -> List[List[int]]:
+    # dp[mask] = max number of zero-sum subgroups the users in mask can be split into
+    n = len(amounts)
+    size = 1 << n
+    sums = [0] * size
+    dp = [0] * size
 
-async def get_overall_net_map(db: AsyncSession) -> Dict[int, Decimal]:
-    paid_q = (
-        select(
-            Expense.paid_by,
-            func.coalesce(func.sum(Expense.amount), 0)
+    for mask in range(1, size):
+        low = mask & -mask
+        sums[mask] = sums[mask ^ low] + amounts[low.bit_length() - 1]
+
+        best = 0
+        rest = mask
+        while rest:
+            bit = rest & -rest
+            if dp[mask ^ bit] > best:
+                best = dp[mask ^ bit]
+            rest ^= bit
+
+        dp[mask] = best + (1 if sums[mask] == 0 else 0)
+
+        if mask & 0x3FF == 0:
+            _check_deadline(deadline)
+
+    # Walk back along an optimal chain; every time the remaining users sum to
+    # zero, the users removed since the previous zero-sum point form a group.
+    groups = []
+    current = []
+    mask = size - 1
+
+    while mask:
+        target = dp[mask] - (1 if sums[mask] == 0 else 0)
+        rest = mask
+        while rest:
+            bit = rest & -rest
+            if dp[mask ^ bit] == target:
+                break
+            rest ^= bit
+
+        current.append(bit.bit_length() - 1)
+        mask ^= bit
+
+        if sums[mask] == 0:
+            groups.append(current)
+            current = []
+
+    return groups
+
+def _zero_sum_groups_heuristic(amounts: List, deadline: float) -> List[List[int]]:
+    # Peel off disjoint zero-sum subsets, smallest first, then leave whatever
+    # remains as one group for the greedy matcher.
+    remaining = set(range(len(amounts)))
+    groups = []
+
+    for k in range(2, HEURISTIC_MAX_SUBSET + 1):
+        by_amount: Dict = {}
+        for i in remaining:
+            by_amount.setdefault(amounts[i], set()).add(i)
+
+        for combo in combinations(sorted(remaining), k - 1):
+            _check_deadline(deadline)
+
+            if any(i not in remaining for i in combo):
+                continue
+
+            need = -sum(amounts[i] for i in combo)
+            match = next(
+                (j for j in by_amount.get(need, ()) if j > combo[-1] and j in remaining),
+                None
+            )
+            if match is None:
+                continue
+
+            group = list(combo) + [match]
+            groups.append(group)
+            for i in group:
+                remaining.discard(i)
+                by_amount[amounts[i]].discard(i)
+
+    if remaining:
+        groups.append(sorted(remaining))
+
+    return groups
+
+def simplify_debts_optimal(net_map: Dict[int, int], budget_ms: int | None = None):
+    # Minimum transfers = users - (max number of zero-sum subgroups), since each
+    # zero-sum subgroup of size k settles internally with k - 1 transfers.
+    greedy = simplify_debts(net_map)
+
+    if budget_ms is None:
+        budget_ms = settings.SETTLEMENT_SOLVER_BUDGET_MS
+
+    deadline = time.thread_time() + budget_ms / 1000
+    users = sorted(uid for uid, bal in net_map.items() if bal != 0)
+    amounts = [net_map[uid] for uid in users]
+
+    try:
+        if len(users) <= EXACT_SOLVER_MAX_USERS:
+            groups = _zero_sum_groups_exact(amounts, deadline)
+        else:
+            groups = _zero_sum_groups_heuristic(amounts, deadline)
+    except SolverBudgetExceeded:
+        return greedy
+
+    transfers = []
+    for group in groups:
+        transfers.extend(simplify_debts({users[i]: amounts[i] for i in group}))
+
+    return transfers if len(transfers) < len(greedy) else greedy
+
+def plan_transfers(net_map: Dict[int, int], strategy: str = "greedy"):
+    if strategy == "optimal":
+        return simplify_debts_optimal(net_map)
+    return simplify_debts(net_map)
+
+def ledger_entries(group_id: int | None = None, user_id: int | None = None):
+    # Every balance movement as (group_id, user_id, cents): payers +amount,
+    # split users -share, settlement senders +amount, receivers -amount.
+    # Archived expenses that were never deleted still count.
+    queries = []
+
+    for expense, split in ((Expense, ExpenseSplit), (ExpenseArchive, ExpenseSplitArchive)):
+        paid_q = (
+            select(expense.group_id, expense.paid_by.label("user_id"), sql_cents(expense.amount).label("cents"))
+            .where(expense.is_deleted == False)
         )
-        .where(Expense.is_deleted == False)
-        .group_by(Expense.paid_by)
-    )
-    paid_res = await db.execute(paid_q)
-    paid_map = {
-        uid: qround(Decimal(str(amt)))
-        for uid, amt in paid_res.all()
-    }
+        owed_q = (
+            select(expense.group_id, split.user_id, -sql_cents(split.amount))
+            .join(expense, expense.id == split.expense_id)
+            .where(expense.is_deleted == False)
+        )
+
+        if group_id is not None:
+            paid_q = paid_q.where(expense.group_id == group_id)
+            owed_q = owed_q.where(expense.group_id == group_id)
+
+        if user_id is not None:
+            paid_q = paid_q.where(expense.paid_by == user_id)
+            owed_q = owed_q.where(split.user_id == user_id)
+
+        queries += [paid_q, owed_q]
+
+    sent_q = select(SettlementHistory.group_id, SettlementHistory.from_user, sql_cents(SettlementHistory.amount))
+    received_q = select(SettlementHistory.group_id, SettlementHistory.to_user, -sql_cents(SettlementHistory.amount))
 
-    owed_q = (
+    if group_id is not None:
+        sent_q = sent_q.where(SettlementHistory.group_id == group_id)
+        received_q = received_q.where(SettlementHistory.group_id == group_id)
+
+    if user_id is not None:
+        sent_q = sent_q.where(SettlementHistory.from_user == user_id)
+        received_q = received_q.where(SettlementHistory.to_user == user_id)
+
+    return union_all(*queries, sent_q, received_q).subquery()
+
+def expense_source(include_archived: bool = False):
+    # Expenses as one selectable. By default the live ones; audits get every
+    # row ever recorded, hot and archived, with is_deleted / archived flags.
+    def columns(expense, archived):
+        return select(
+            expense.id, expense.group_id, expense.paid_by, expense.amount,
+            expense.description, expense.created_at, expense.is_deleted,
+            archived.label("archived")
+        )
+
+    if not include_archived:
+        return columns(Expense, false()).where(Expense.is_deleted == False).subquery()
+
+    return union_all(columns(Expense, false()), columns(ExpenseArchive, true())).subquery()
+
+def split_source(include_archived: bool = False, *hot_filters):
+    # Splits matching expense_source(); archived expenses keep their ids.
+    # hot_filters bound ExpenseSplit.expense_created_at, the partition key of
+    # the hot splits, so lookups only touch the partitions they need.
+    hot = select(
+        ExpenseSplit.expense_id, ExpenseSplit.expense_created_at,
+        ExpenseSplit.user_id, ExpenseSplit.amount
+    ).where(*hot_filters)
+
+    if not include_archived:
+        return hot.subquery()
+
+    archived = (
         select(
-            ExpenseSplit.user_id,
-            func.coalesce(func.sum(ExpenseSplit.amount), 0)
+            ExpenseSplitArchive.expense_id, ExpenseArchive.created_at,
+            ExpenseSplitArchive.user_id, ExpenseSplitArchive.amount
         )
-        .join(Expense, Expense.id == ExpenseSplit.expense_id)
-        .where(Expense.is_deleted == False)
-        .group_by(ExpenseSplit.user_id)
+        .join(ExpenseArchive, ExpenseArchive.id == ExpenseSplitArchive.expense_id)
     )
-    owed_res = await db.execute(owed_q)
-    owed_map = {
-        uid: qround(Decimal(str(amt)))
-        for uid, amt in owed_res.all()
-    }
-
-    user_ids = set(paid_map) | set(owed_map)
-
-    net = {}
-    for uid in user_ids:
-        net[uid] = qround(
-            paid_map.get(uid, Decimal("0")) -
-            owed_map.get(uid, Decimal("0"))
-        )
+    return union_all(hot, archived).subquery()
+
+async def get_user_total_balance(db: AsyncSession, user_id: int) -> int:
+    # Expenses and settlements across all groups, one statement
+    entries = ledger_entries(user_id=user_id)
+    total = await db.scalar(select(cast(func.coalesce(func.sum(entries.c.cents), 0), BigInteger)))
+
+    return int(total)
+
+async def get_overall_net_map(db: AsyncSession) -> Dict[int, int]:
+    # group_balances is ledger_entries() pre-aggregated per (group, user)
+    q = (
+        select(GroupBalance.user_id, cast(func.sum(GroupBalance.net_cents), BigInteger))
+        .group_by(GroupBalance.user_id)
+    )
+    res = await db.execute(q)
 
-    return net
+    return {uid: int(cents) for uid, cents in res.all()}
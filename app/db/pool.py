@@ -0,0 +1,89 @@
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util.queue import AsyncAdaptedQueue
+
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.connects = 0
+        self.connect_seconds_total = 0.0
+
+    def record_wait(self, waited: float):
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def record_connect(self, seconds: float):
+        self.connects += 1
+        self.connect_seconds_total += seconds
+
+class _WaitTimedQueue(AsyncAdaptedQueue):
+    # The pool's idle connections. The pool only blocks on it once every
+    # connection it may open is checked out, so this is the saturation wait.
+    stats: PoolStats
+
+    def get(self, block: bool = True, timeout: float | None = None):
+        if not block:
+            return super().get(block, timeout)
+
+        started = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            self.stats.record_wait(time.perf_counter() - started)
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    # Times how long checkouts wait for a free connection and counts pool
+    # timeouts, so saturation shows up before request latency does. Opening
+    # new connections is timed separately: it happens while the pool still
+    # has room, and would otherwise pass for waiting.
+    _queue_class = _WaitTimedQueue
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+        self._pool.stats = self.stats
+
+    def _do_get(self):
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.checkouts += 1
+        return conn
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        record = super()._create_connection()
+        self.stats.record_connect(time.perf_counter() - started)
+        return record
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = pool._pool.stats = self.stats
+        return pool
+
+def pool_stats(pool) -> dict:
+    stats = {
+        "size": pool.size() if hasattr(pool, "size") else None,
+        "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+        # QueuePool reports not-yet-opened connections as negative overflow
+        "overflow": max(pool.overflow(), 0) if hasattr(pool, "overflow") else None,
+    }
+
+    instrumented = getattr(pool, "stats", None)
+    if isinstance(instrumented, PoolStats):
+        stats.update({
+            "checkouts": instrumented.checkouts,
+            "timeouts": instrumented.timeouts,
+            "wait_seconds_total": round(instrumented.wait_seconds_total, 6),
+            "wait_seconds_max": round(instrumented.wait_seconds_max, 6),
+            "connects": instrumented.connects,
+            "connect_seconds_total": round(instrumented.connect_seconds_total, 6)
+        })
+
+    return stats
@@ -1,21 +1,153 @@
+import itertools
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import functions
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from app.core.config import settings
+from app.db.pool import InstrumentedAsyncPool
 
 Base = declarative_base()
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=False,
-    pool_pre_ping=True
-)
+@compiles(functions.now, "sqlite")
+def _sqlite_now(element, compiler, **kw):
+    # SQLite keeps timestamps as text and CURRENT_TIMESTAMP has no fraction,
+    # while bound datetimes are written as "...HH:MM:SS.ffffff". Defaults in
+    # the bound format keep keyset comparisons against cursors exact.
+    return "STRFTIME('%Y-%m-%d %H:%M:%f000', 'now')"
+
+# Recycle interval used when DB_POOL_LIVENESS=recycle but DB_POOL_RECYCLE is unset
+DEFAULT_RECYCLE_SECONDS = 300
+
+def engine_options(url: str) -> dict:
+    recycle = settings.DB_POOL_RECYCLE
+    if settings.DB_POOL_LIVENESS == "recycle" and recycle < 0:
+        recycle = DEFAULT_RECYCLE_SECONDS
+
+    options = {
+        "echo": False,
+        "poolclass": InstrumentedAsyncPool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": recycle,
+        # pre_ping: one extra round trip per checkout, catches every dead connection
+        # recycle: no per-checkout cost, connections older than DB_POOL_RECYCLE are replaced
+        # none: trust the connection, errors surface on first use
+        "pool_pre_ping": settings.DB_POOL_LIVENESS == "pre_ping",
+    }
+
+    if url.startswith("postgresql+asyncpg"):
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE
+        }
+
+    return options
+
+engine = create_async_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+
+read_replica_urls = [url.strip() for url in settings.READ_REPLICA_URLS.split(",") if url.strip()]
+read_engines = [create_async_engine(url, **engine_options(url)) for url in read_replica_urls]
+_next_replica = itertools.count()
+
+# Set by get_current_user, so sessions know whose request they serve
+current_user_id: ContextVar[int | None] = ContextVar("current_user_id", default=None)
+
+class WritePins:
+    # Users who wrote within the last window_seconds read from the primary,
+    # so they see their own writes even while the replicas lag. Per process:
+    # every pin has the same lifetime, so insertion order is expiry order.
+    def __init__(self, window_seconds: float, max_users: int):
+        self.window_seconds = window_seconds
+        self.max_users = max_users
+        self._until: "OrderedDict[int, float]" = OrderedDict()
+
+        self.pins = 0
+        self.pinned_reads = 0
+
+    def pin(self, user_id: int):
+        now = time.monotonic()
+        self._until[user_id] = now + self.window_seconds
+        self._until.move_to_end(user_id)
+        self.pins += 1
+
+        while self._until:
+            oldest, until = next(iter(self._until.items()))
+            if until > now and len(self._until) <= self.max_users:
+                break
+            del self._until[oldest]
+
+    def is_pinned(self, user_id: int | None) -> bool:
+        if user_id is None:
+            return False
+
+        pinned = self._until.get(user_id, 0) > time.monotonic()
+        if pinned:
+            self.pinned_reads += 1
+        return pinned
+
+    def stats(self) -> dict:
+        return {
+            "replicas": len(read_engines),
+            "pinned_users": len(self._until),
+            "pins": self.pins,
+            "pinned_reads": self.pinned_reads
+        }
+
+write_pins = WritePins(settings.READ_YOUR_WRITES_SECONDS, settings.READ_YOUR_WRITES_MAX_USERS)
+
+class PrimarySession(Session):
+    pass
+
+@event.listens_for(PrimarySession, "after_commit")
+def _pin_writer(session):
+    # Sessions without a requesting user (background jobs) don't pin anyone
+    user_id = current_user_id.get()
+    if read_engines and user_id is not None:
+        write_pins.pin(user_id)
+
+class ReadSession(Session):
+    # The bind is chosen on first use rather than at creation, because the
+    # session is created before get_current_user has identified the user
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._chosen_bind = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing:
+            return engine.sync_engine
+
+        if self._chosen_bind is None:
+            if not read_engines or write_pins.is_pinned(current_user_id.get()):
+                self._chosen_bind = engine.sync_engine
+            else:
+                replica = read_engines[next(_next_replica) % len(read_engines)]
+                self._chosen_bind = replica.sync_engine
+
+        return self._chosen_bind
 
 async_session = sessionmaker(
+    class_=AsyncSession,
+    sync_session_class=PrimarySession,
     bind=engine,
+    expire_on_commit=False
+)
+
+read_session = sessionmaker(
     class_=AsyncSession,
+    sync_session_class=ReadSession,
     expire_on_commit=False
 )
 
 async def get_db():
     async with async_session() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+async def get_read_db():
+    # For GET routes: a replica (round-robin), or the primary when no replicas
+    # are configured or the user wrote within READ_YOUR_WRITES_SECONDS
+    async with read_session() as session:
+        yield session
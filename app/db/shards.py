@@ -0,0 +1,97 @@
+import asyncio
+import itertools
+from typing import Awaitable, Callable, Dict, List
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.db.session import engine, engine_options, async_session, get_db, get_read_db, PrimarySession
+
+# Shard 0 is the main database: it also holds users and is where the rest of
+# the app (auth, background jobs) connects. A group and everything recorded
+# for it (members, expenses, splits, settlements, balances, activity,
+# notifications) lives on shard group_id % SHARD_COUNT; users are copied to
+# every shard so joins and foreign keys keep working there.
+#
+# Ids are interleaved across shards (app.commands.init_shards sets every
+# sequence on shard k to k, k + N, k + 2N, ...), so any row id also names
+# its shard and ids stay unique across the cluster.
+shard_urls = [settings.DATABASE_URL] + [url.strip() for url in settings.SHARD_DATABASE_URLS.split(",") if url.strip()]
+shard_engines = [engine] + [create_async_engine(url, **engine_options(url)) for url in shard_urls[1:]]
+shard_sessionmakers = [async_session] + [
+    sessionmaker(bind=e, class_=AsyncSession, sync_session_class=PrimarySession, expire_on_commit=False)
+    for e in shard_engines[1:]
+]
+
+SHARD_COUNT = len(shard_engines)
+
+_next_group_shard = itertools.count()
+
+def shard_for(row_id: int) -> int:
+    return row_id % SHARD_COUNT
+
+def next_group_shard() -> int:
+    # New groups are spread round-robin; the shard's sequence gives the id
+    return next(_next_group_shard) % SHARD_COUNT
+
+class ShardSessions:
+    # One session per shard for the current request, opened on first use.
+    # Shard 0 reuses the request's own session, so with a single shard every
+    # route sees exactly the session it had before sharding.
+    def __init__(self, home: AsyncSession):
+        self._sessions: Dict[int, AsyncSession] = {0: home}
+
+    def get(self, shard: int) -> AsyncSession:
+        if shard not in self._sessions:
+            self._sessions[shard] = shard_sessionmakers[shard]()
+        return self._sessions[shard]
+
+    def for_group(self, group_id: int) -> AsyncSession:
+        return self.get(shard_for(group_id))
+
+    def for_row(self, row_id: int) -> AsyncSession:
+        return self.get(shard_for(row_id))
+
+    def all(self) -> List[AsyncSession]:
+        return [self.get(shard) for shard in range(SHARD_COUNT)]
+
+    async def gather(self, fn: Callable[[AsyncSession], Awaitable]) -> List:
+        # Cross-shard fan-out: every shard concurrently, results in shard order
+        return await asyncio.gather(*(fn(db) for db in self.all()))
+
+    async def execute_all(self, statement) -> List:
+        return await self.gather(lambda db: db.execute(statement))
+
+    async def close(self):
+        for shard, session in self._sessions.items():
+            if shard != 0:
+                await session.close()
+
+async def get_shards(db: AsyncSession = Depends(get_db)):
+    shards = ShardSessions(db)
+    try:
+        yield shards
+    finally:
+        await shards.close()
+
+async def get_read_shards(db: AsyncSession = Depends(get_read_db)):
+    # Shard 0 reads may go to a replica; the other shards read their primary
+    shards = ShardSessions(db)
+    try:
+        yield shards
+    finally:
+        await shards.close()
+
+# Routes keyed by a path id get that shard's session directly
+
+async def get_group_db(group_id: int, shards: ShardSessions = Depends(get_shards)) -> AsyncSession:
+    return shards.for_group(group_id)
+
+async def get_group_read_db(group_id: int, shards: ShardSessions = Depends(get_read_shards)) -> AsyncSession:
+    return shards.for_group(group_id)
+
+async def get_expense_db(expense_id: int, shards: ShardSessions = Depends(get_shards)) -> AsyncSession:
+    return shards.for_row(expense_id)
+
+async def get_expense_read_db(expense_id: int, shards: ShardSessions = Depends(get_read_shards)) -> AsyncSession:
+    return shards.for_row(expense_id)
@@ -1,11 +1,53 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.api.v1.routes.system import router as system_router
 from app.api.v1.routes.user import router as user_router
 from app.api.v1.routes.group import router as group_router
 from app.api.v1.routes.expense import router as expense_router
 from app.api.v1.routes.balances import router as balance_router
+from app.api.v1.routes.activity import router as activity_router
+from app.api.v1.routes.notifications import router as notification_router
+from app.core.metrics import MetricsMiddleware, install_query_hooks
+from app.core.idempotency import purge_loop
+from app.core.activity_writer import activity_writer
+from app.core.archiver import expense_archiver
+from app.core.partitions import partition_loop
+from app.core.events import event_hub
+from app.core.config import settings
+from app.db.session import engine, read_engines
+from app.db.shards import shard_engines
 
-app = FastAPI(title="Splitwise Backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    purge_task = asyncio.create_task(purge_loop(settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS))
+    activity_task = asyncio.create_task(activity_writer.run())
+    archive_task = asyncio.create_task(expense_archiver.run())
+    partition_task = asyncio.create_task(partition_loop(
+        settings.EXPENSE_PARTITION_CHECK_SECONDS, settings.EXPENSE_PARTITION_MONTHS_AHEAD
+    ))
+    bridge_task = None
+    if settings.EVENTS_PG_BRIDGE:
+        bridge_task = asyncio.create_task(event_hub.run_bridge(settings.DATABASE_URL))
+    yield
+    purge_task.cancel()
+    activity_task.cancel()
+    archive_task.cancel()
+    partition_task.cancel()
+    if bridge_task is not None:
+        bridge_task.cancel()
+    # don't lose the events still buffered
+    await activity_writer.flush()
+
+app = FastAPI(title="Splitwise Backend", lifespan=lifespan)
+
+app.add_middleware(MetricsMiddleware)
+install_query_hooks(engine)
+for replica in read_engines:
+    install_query_hooks(replica)
+# shard 0 is engine itself
+for shard in shard_engines[1:]:
+    install_query_hooks(shard)
 
 @app.get("/")
 async def root():
@@ -15,4 +57,6 @@ app.include_router(system_router, prefix="/api/v1/system")
 app.include_router(user_router, prefix="/api/v1/users")
 app.include_router(group_router, prefix="/api/v1/groups")
 app.include_router(expense_router, prefix="/api/v1/expense")
-app.include_router(balance_router, prefix="/api/v1/balances")
\ No newline at end of file
+app.include_router(balance_router, prefix="/api/v1/balances")
+app.include_router(activity_router, prefix="/api/v1")
+app.include_router(notification_router, prefix="/api/v1/notifications")
\ No newline at end of file
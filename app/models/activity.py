@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, DateTime, Index
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class Activity(Base):
+    __tablename__ = "activities"
+
+    id = Column(Integer, primary_key=True)
+    group_id = Column(Integer, ForeignKey("groups.id", ondelete="CASCADE"), nullable=False)
+    actor_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # expense_created / expense_edited / expense_deleted / settlement_added /
+    # settlement_undone / member_joined / member_left
+    action = Column(String(32), nullable=False)
+    expense_id = Column(Integer, nullable=True)
+    settlement_id = Column(Integer, nullable=True)
+    # member joined / left, settlement receiver
+    target_user_id = Column(Integer, nullable=True)
+    amount_cents = Column(BigInteger, nullable=True)
+    # when it happened; rows are written in batches a little later
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # group activity log, newest first by id
+        Index("ix_activities_group_id_id", group_id, id),
+    )
@@ -1,9 +1,11 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Numeric, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Numeric, Boolean, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
 class Expense(Base):
+    # On PostgreSQL the table is range-partitioned by created_at month with
+    # primary key (id, created_at); see the partition migration.
     __tablename__ = "expenses"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -11,8 +13,21 @@ class Expense(Base):
     paid_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     amount = Column(Numeric(10, 2), nullable=False)
     description = Column(String, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    is_deleted = Column(Boolean, nullable=False, server_default="false")
+    # partition key: never null, and loaded back on insert for the splits
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    is_deleted = Column(Boolean, nullable=False, server_default=text("false"))
 
+    __table_args__ = (
+        # group listings / export / keyset pagination
+        Index("ix_expenses_group_created", group_id, created_at.desc(), id.desc()),
+        # live-ledger aggregations skip soft-deleted rows
+        Index("ix_expenses_group_active", group_id, postgresql_where=text("is_deleted = false")),
+        # the archiver's queue of soft-deleted rows
+        Index("ix_expenses_deleted", id, postgresql_where=text("is_deleted = true")),
+        # "my expenses" / credits, newest first
+        Index("ix_expenses_paid_by_created", paid_by, created_at.desc(), id.desc()),
+    )
+
+    __mapper_args__ = {"eager_defaults": True}
 
     splits = relationship("ExpenseSplit", back_populates="expense", cascade="all, delete")
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Numeric, Boolean, Index
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+# Cold copies of expenses / expense_splits moved out by app.core.archiver.
+# Rows keep their original ids, so expense ids in activities and
+# notifications still point at them.
+
+class ExpenseArchive(Base):
+    __tablename__ = "expenses_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    group_id = Column(Integer, ForeignKey("groups.id", ondelete="CASCADE"), nullable=False)
+    paid_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    amount = Column(Numeric(10, 2), nullable=False)
+    description = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=True)
+    is_deleted = Column(Boolean, nullable=False)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # audit listings / export
+        Index("ix_expenses_archive_group_created", group_id, created_at.desc(), id.desc()),
+        # ledger totals per payer
+        Index("ix_expenses_archive_paid_by", paid_by),
+    )
+
+class ExpenseSplitArchive(Base):
+    __tablename__ = "expense_splits_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    expense_id = Column(Integer, ForeignKey("expenses_archive.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    amount = Column(Numeric(10, 2), nullable=False)
+
+    __table_args__ = (
+        Index("ix_expense_splits_archive_user_expense", user_id, expense_id),
+    )
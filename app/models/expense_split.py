@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Numeric, ForeignKey
+from sqlalchemy import Column, Integer, Numeric, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
@@ -6,8 +6,17 @@ class ExpenseSplit(Base):
     __tablename__ = "expense_splits"
 
     id = Column(Integer, primary_key=True, index=True)
-    expense_id = Column(Integer, ForeignKey("expenses.id"), nullable=False)
+    expense_id = Column(Integer, ForeignKey("expenses.id"), nullable=False, index=True)
+    # copy of the expense's created_at: the partition key on PostgreSQL, where
+    # the foreign key is (expense_id, expense_created_at)
+    expense_created_at = Column(DateTime(timezone=True), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     amount = Column(Numeric(10, 2), nullable=False)
 
+    __table_args__ = (
+        Index("ix_expense_splits_user_expense", user_id, expense_id),
+        # a user's splits newest first, for keyset pages of their expenses
+        Index("ix_expense_splits_user_created", user_id, expense_created_at.desc(), expense_id.desc()),
+    )
+
     expense = relationship("Expense", back_populates="splits")
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, DateTime, func
+from sqlalchemy import Column, ForeignKey, Integer, DateTime, func, UniqueConstraint
 from app.db.session import Base
 from sqlalchemy.orm import relationship
 
@@ -8,7 +8,11 @@ class GroupMember(Base):
     id = Column(Integer, primary_key=True, index=True)
 
     group_id = Column(Integer, ForeignKey("groups.id", ondelete="CASCADE"))
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     joined_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        UniqueConstraint("group_id", "user_id", name="uq_group_members_group_user"),
+    )
+
     group = relationship("Group", back_populates="members")
\ No newline at end of file
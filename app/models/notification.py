@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, ForeignKey, DateTime, Index, text
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class Notification(Base):
+    __tablename__ = "notifications"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    group_id = Column(Integer, ForeignKey("groups.id", ondelete="CASCADE"), nullable=False)
+    actor_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # expense_added / expense_edited / expense_deleted / settlement_received
+    kind = Column(String(32), nullable=False)
+    expense_id = Column(Integer, nullable=True)
+    settlement_id = Column(Integer, nullable=True)
+    # what this user owes / received
+    amount_cents = Column(BigInteger, nullable=True)
+    is_read = Column(Boolean, nullable=False, default=False, server_default=text("false"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # inbox listing and mark-read ranges, both by id
+        Index("ix_notifications_user_id_id", user_id, id),
+    )
+
+class NotificationCounter(Base):
+    # Unread badge, kept in step with notifications so it is a single-row read
+    __tablename__ = "notification_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    unread_count = Column(Integer, nullable=False, server_default="0")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from app.db.session import Base
 
@@ -12,3 +12,13 @@ class SettlementHistory(Base):
     amount = Column(Float, nullable=False)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # group history listing and ledger rebuilds
+        Index("ix_settlement_history_group_created", group_id, created_at.desc()),
+        # per-user ledger totals
+        Index("ix_settlement_history_from_user", from_user),
+        Index("ix_settlement_history_to_user", to_user),
+    )
+
+    __mapper_args__ = {"eager_defaults": True}
@@ -1,15 +1,35 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from typing import List, Literal
+
+SplitMode = Literal["exact", "equal", "percent", "shares"]
 
 class SplitInput(BaseModel):
     user_id: int
-    amount: float
+    # exact mode only
+    amount: float | None = None
+    # percent mode: share of the total in %, shares mode: relative weight
+    weight: float | None = None
 
 class ExpenseCreate(BaseModel):
     group_id : int
     amount : float
     description : str | None = None
-    splits: List[SplitInput]
+    # exact: per-user amounts, equal: listed users (or every member if empty),
+    # percent / shares: per-user weights, expanded to cents on the server
+    split_mode: SplitMode = "exact"
+    splits: List[SplitInput] = []
+
+class ExpenseUpdate(BaseModel):
+    amount : float
+    description : str | None = None
+    split_mode: SplitMode = "exact"
+    splits: List[SplitInput] = []
+
+class ExpenseBulkCreate(BaseModel):
+    items: List[ExpenseCreate] = Field(min_length=1, max_length=5000)
+    # atomic: reject the whole batch if any item is invalid
+    # partial: insert the valid items and report the rest
+    mode: Literal["atomic", "partial"] = "atomic"
 
 class ExpenseOut(BaseModel):
     id: int
@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+class NotificationMarkRead(BaseModel):
+    # Inclusive id range; either end may be left open. to_id alone works as a
+    # high-water mark: "everything up to the newest notification I've seen".
+    # Nothing set marks the whole inbox.
+    from_id: int | None = None
+    to_id: int | None = None
@@ -0,0 +1,76 @@
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.activity import Activity
+from app.models.group_member import GroupMember
+from app.models.user import User
+from app.core.utils import format_cents
+from app.core.pagination import id_page, split_id_page, merge_pages, DEFAULT_PAGE_SIZE
+from app.db.shards import ShardSessions
+from app.core.dependencies import check_group_membership
+
+def _activity_query():
+    actor = aliased(User)
+    target = aliased(User)
+
+    return (
+        select(
+            Activity,
+            actor.name.label("actor_name"),
+            target.name.label("target_name")
+        )
+        .join(actor, actor.id == Activity.actor_id)
+        .outerjoin(target, target.id == Activity.target_user_id)
+    )
+
+def _activity_out(row) -> dict:
+    activity = row.Activity
+    return {
+        "id": activity.id,
+        "group_id": activity.group_id,
+        "action": activity.action,
+        "actor": {"id": activity.actor_id, "name": row.actor_name},
+        "target_user": (
+            {"id": activity.target_user_id, "name": row.target_name}
+            if activity.target_user_id is not None else None
+        ),
+        "expense_id": activity.expense_id,
+        "settlement_id": activity.settlement_id,
+        "amount": format_cents(activity.amount_cents) if activity.amount_cents is not None else None,
+        "created_at": activity.created_at
+    }
+
+async def list_group_activity(
+    db: AsyncSession,
+    user_id: int,
+    group_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: str | None = None
+):
+    await check_group_membership(db, group_id, user_id)
+
+    q = _activity_query().where(Activity.group_id == group_id)
+    q = id_page(q, Activity.id, limit=limit, after=after)
+
+    res = await db.execute(q)
+    rows, next_cursor = split_id_page(res.all(), limit, key=lambda r: r.Activity.id)
+
+    return {"activities": [_activity_out(r) for r in rows], "next_cursor": next_cursor}
+
+async def list_user_activity(
+    shards: ShardSessions,
+    user_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: str | None = None
+):
+    # Everything that happened in the user's current groups, on every shard
+    my_groups = select(GroupMember.group_id).where(GroupMember.user_id == user_id)
+
+    q = _activity_query().where(Activity.group_id.in_(my_groups))
+    q = id_page(q, Activity.id, limit=limit, after=after)
+
+    key = lambda r: r.Activity.id
+    pages = [res.all() for res in await shards.execute_all(q)]
+    rows, next_cursor = split_id_page(merge_pages(pages, key), limit, key=key)
+
+    return {"activities": [_activity_out(r) for r in rows], "next_cursor": next_cursor}
@@ -1,40 +1,47 @@
-from fastapi import Depends
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.utils import get_overall_net_map, simplify_debts
+from typing import Dict
+from app.core.utils import get_overall_net_map, plan_transfers, format_cents
+from app.db.shards import ShardSessions
 from app.models.user import User
 from sqlalchemy import select
-from decimal import Decimal
 
-async def get_overall_balances(db: AsyncSession):
-    net = await get_overall_net_map(db)
+async def _sharded_net_map(shards: ShardSessions) -> Dict[int, int]:
+    # A user's groups can sit on several shards: add up their per-shard nets
+    net: Dict[int, int] = {}
+    for shard_net in await shards.gather(get_overall_net_map):
+        for uid, cents in shard_net.items():
+            net[uid] = net.get(uid, 0) + cents
+    return net
+
+async def get_overall_balances(shards: ShardSessions):
+    net = await _sharded_net_map(shards)
 
     return {
-        uid: str(amount)
-        for uid, amount in net.items()
-        if amount != 0
+        uid: format_cents(cents)
+        for uid, cents in net.items()
+        if cents != 0
     }
 
 async def get_user_balance(
-    db: AsyncSession,
+    shards: ShardSessions,
     user_id: int
 ):
-    net = await get_overall_net_map(db)
+    net = await _sharded_net_map(shards)
     return {
         "user_id": user_id,
-        "net_balance": str(net.get(user_id, Decimal("0")))
+        "net_balance": format_cents(net.get(user_id, 0))
     }
 
-async def get_simplified_balances(db: AsyncSession):
-    net = await get_overall_net_map(db)
+async def get_simplified_balances(shards: ShardSessions, strategy: str = "greedy"):
+    net = await _sharded_net_map(shards)
 
-    # Drop near-zero balances
+    # Drop settled users
     net = {
-        uid: amt
-        for uid, amt in net.items()
-        if abs(amt) >= Decimal("0.01")
+        uid: cents
+        for uid, cents in net.items()
+        if cents != 0
     }
 
-    transfers = simplify_debts(net)
+    transfers = plan_transfers(net, strategy)
 
     if not transfers:
         return {
@@ -45,13 +52,14 @@ async def get_simplified_balances(db: AsyncSession):
     user_ids = {u for t in transfers for u in (t[0], t[1])}
 
     q = select(User.id, User.name).where(User.id.in_(user_ids))
-    res = await db.execute(q)
+    # users live on shard 0
+    res = await shards.get(0).execute(q)
     users = {uid: name for uid, name in res.all()}
 
     return {
         "net": {
-            uid: str(amt)
-            for uid, amt in net.items()
+            uid: format_cents(cents)
+            for uid, cents in net.items()
         },
         "settlements": [
             {
@@ -59,7 +67,7 @@ async def get_simplified_balances(db: AsyncSession):
                 "from_name": users.get(f),
                 "to_id": t,
                 "to_name": users.get(t),
-                "amount": str(a)
+                "amount": format_cents(a)
             }
             for f, t, a in transfers
         ]
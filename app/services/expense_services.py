@@ -1,52 +1,94 @@
+import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, delete, case, union_all, and_, tuple_
 from app.models.expense import Expense
 from app.models.expense_split import ExpenseSplit
 from app.models.group_member import GroupMember
 from app.models.user import User
-from app.core.utils import qround
+from app.core.utils import qround, to_cents, from_cents, allocate_cents, format_cents, sql_cents, sql_sum_cents, expense_source, split_source
+from app.core.pagination import keyset_page, split_page, merge_pages, created_between, DEFAULT_PAGE_SIZE
+from app.db.shards import ShardSessions, shard_for
+from app.core.dependencies import check_group_membership
+from app.core.activity_writer import activity_writer
+from app.core.events import event_hub
+from app.services.ledger_services import apply_balance_deltas, expense_deltas, invert_deltas, merge_deltas
+from app.services.notification_services import notification_rows, fan_out
 from decimal import Decimal
+from fractions import Fraction
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Set, Tuple
+from datetime import datetime
 from fastapi import HTTPException
 
-async def create_expense(db: AsyncSession, data, paid_by: int):
-    # 1. Check if payer is member of group
-    q = select(GroupMember).where(
-        GroupMember.group_id == data.group_id,
-        GroupMember.user_id == paid_by
-    )
-    result = await db.execute(q)
-    
-    if not result.scalar_one_or_none():
-        raise HTTPException(403, "Payer is not a member of the group")
+PERCENT_TOTAL = Fraction(100)
+
+def resolve_splits(data, members: Set[int]) -> List[Tuple[int, int]]:
+    # Expand any split mode to [(user_id, cents)] in one pass; raises ValueError
+    # with the message the API returns.
+    total = to_cents(data.amount)
+    mode = data.split_mode
+
+    if total <= 0:
+        raise ValueError("Expense amount must be positive")
 
-    # Extract user_ids from split input
-    user_ids = [s.user_id for s in data.splits]
+    if mode == "equal" and not data.splits:
+        # compact form: everyone in the group
+        user_ids = sorted(members)
+    else:
+        user_ids = [s.user_id for s in data.splits]
+
+    if not user_ids:
+        raise ValueError("Expense must have at least one split")
 
-    # 2. Check duplicates
     if len(user_ids) != len(set(user_ids)):
-        raise HTTPException(400, "Duplicate users found in splits")
+        raise ValueError("Duplicate users found in splits")
 
-    # 3. Validate positive amount
-    if any(s.amount <= 0 for s in data.splits):
-        raise HTTPException(400, "Split amounts must be positive")
+    if any(uid not in members for uid in user_ids):
+        raise ValueError("Some users in split are not group members")
 
-    # 4. Validate sum of splits == total
-    total = sum(s.amount for s in data.splits)
-    if total != data.amount:
-        raise HTTPException(400, "Sum of split amounts must equal total amount")
+    if mode == "exact":
+        if any(s.amount is None or s.amount <= 0 for s in data.splits):
+            raise ValueError("Split amounts must be positive")
 
-    # 5. Validate all users in split are members of the group
-    q2 = select(GroupMember).where(
-        GroupMember.group_id == data.group_id,
-        GroupMember.user_id.in_(user_ids)
-    )
-    result2 = await db.execute(q2)
-    members = result2.scalars().all()
+        cents = [to_cents(s.amount) for s in data.splits]
+        if sum(cents) != total:
+            raise ValueError("Sum of split amounts must equal total amount")
+
+        return list(zip(user_ids, cents))
+
+    if mode == "equal":
+        weights = [1] * len(user_ids)
+    else:
+        if any(s.weight is None or s.weight <= 0 for s in data.splits):
+            raise ValueError(f"Every split needs a positive weight in {mode} mode")
+
+        weights = [s.weight for s in data.splits]
+
+        if mode == "percent" and sum(Fraction(str(w)) for w in weights) != PERCENT_TOTAL:
+            raise ValueError("Split percentages must add up to 100")
+
+    cents = allocate_cents(total, weights)
+
+    if any(c <= 0 for c in cents):
+        raise ValueError("Amount is too small to split between these users")
+
+    return list(zip(user_ids, cents))
+
+async def create_expense(db: AsyncSession, data, paid_by: int, before_commit: Callable[[Expense], Awaitable] | None = None):
+    # 1. Load the group's members once: validates the payer and every split user
+    q = select(GroupMember.user_id).where(GroupMember.group_id == data.group_id)
+    members = set((await db.execute(q)).scalars().all())
+
+    if paid_by not in members:
+        raise HTTPException(403, "Payer is not a member of the group")
 
-    if len(members) != len(user_ids):
-        raise HTTPException(400, "Some users in split are not group members")
+    # 2. Expand the split spec to per-user cents
+    try:
+        splits = resolve_splits(data, members)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
 
-    # 6. Create expense
+    # 3. Create expense
     expense = Expense(
         group_id=data.group_id,
         paid_by=paid_by,
@@ -54,121 +96,338 @@ async def create_expense(db: AsyncSession, data, paid_by: int):
         description=data.description
     )
     db.add(expense)
-    await db.flush()  # gives expense.id
-
-    # 7. Create split records
-    for s in data.splits:
-        split = ExpenseSplit(
-            expense_id=expense.id,
-            user_id=s.user_id,
-            amount=s.amount
-        )
-        db.add(split)
+    await db.flush()  # gives expense.id and created_at
+
+    # 4. Create split records in one batched insert
+    await db.execute(insert(ExpenseSplit.__table__), [
+        {"expense_id": expense.id, "expense_created_at": expense.created_at, "user_id": uid, "amount": from_cents(cents)}
+        for uid, cents in splits
+    ])
+
+    # 5. Update the group balance ledger in the same transaction
+    await apply_balance_deltas(
+        db,
+        data.group_id,
+        expense_deltas(paid_by, data.amount, [(uid, from_cents(cents)) for uid, cents in splits])
+    )
+
+    # 6. Notify every split participant
+    await fan_out(db, notification_rows("expense_added", paid_by, data.group_id, splits, expense_id=expense.id))
+
+    # e.g. the idempotency key's stored response, committed with the expense
+    if before_commit is not None:
+        await before_commit(expense)
 
     await db.commit()
     await db.refresh(expense)
 
+    activity_writer.record(
+        data.group_id, paid_by, "expense_created",
+        expense_id=expense.id, amount_cents=to_cents(data.amount)
+    )
+    event_hub.publish(data.group_id, "expense_created", expense_id=expense.id, actor_id=paid_by)
+
     return expense
 
+async def bulk_create_expenses(db: AsyncSession, data, paid_by: int):
+    items = data.items
+
+    # 1. Load the members of every touched group in a single query
+    group_ids = {item.group_id for item in items}
+
+    q = select(GroupMember.group_id, GroupMember.user_id).where(GroupMember.group_id.in_(group_ids))
+    res = await db.execute(q)
+
+    members: Dict[int, Set[int]] = {}
+    for gid, uid in res.all():
+        members.setdefault(gid, set()).add(uid)
+
+    errors = []
+    valid = []
+
+    for index, item in enumerate(items):
+        group_members = members.get(item.group_id, set())
+
+        if paid_by not in group_members:
+            errors.append({"index": index, "error": "Payer is not a member of the group"})
+            continue
+
+        try:
+            valid.append((index, item, resolve_splits(item, group_members)))
+        except ValueError as e:
+            errors.append({"index": index, "error": str(e)})
+
+    # 2. All-or-nothing mode rejects the whole batch on any invalid item
+    if errors and data.mode == "atomic":
+        raise HTTPException(400, {"message": "Bulk import rejected", "errors": errors})
+
+    if not valid:
+        return {"created": [], "errors": errors}
+
+    # 3. Multi-row INSERT ... RETURNING for the expenses, ids come back in input order.
+    # Core table inserts keep every row in one statement even when some
+    # descriptions are None (the ORM splits rows by which keys are set).
+    expense_table = Expense.__table__
+    expense_q = insert(expense_table).returning(expense_table.c.id, expense_table.c.created_at, sort_by_parameter_order=True)
+    expense_res = await db.execute(expense_q, [
+        {
+            "group_id": item.group_id,
+            "paid_by": paid_by,
+            "amount": item.amount,
+            "description": item.description
+        }
+        for _, item, _ in valid
+    ])
+    inserted = expense_res.all()
+    expense_ids = [row.id for row in inserted]
+
+    # 4. One batched insert for every split of the batch
+    await db.execute(insert(ExpenseSplit.__table__), [
+        {"expense_id": row.id, "expense_created_at": row.created_at, "user_id": uid, "amount": from_cents(cents)}
+        for row, (_, _, splits) in zip(inserted, valid)
+        for uid, cents in splits
+    ])
+
+    # 5. One ledger upsert per touched group
+    group_deltas: Dict[int, Dict[int, int]] = {}
+    for _, item, splits in valid:
+        group_deltas[item.group_id] = merge_deltas(
+            group_deltas.get(item.group_id, {}),
+            expense_deltas(paid_by, item.amount, [(uid, from_cents(cents)) for uid, cents in splits])
+        )
+
+    for group_id in sorted(group_deltas):
+        await apply_balance_deltas(db, group_id, group_deltas[group_id])
+
+    # 6. Notifications for the whole batch in one fan-out
+    await fan_out(db, [
+        row
+        for expense_id, (_, item, splits) in zip(expense_ids, valid)
+        for row in notification_rows("expense_added", paid_by, item.group_id, splits, expense_id=expense_id)
+    ])
+
+    await db.commit()
+
+    for expense_id, (_, item, _) in zip(expense_ids, valid):
+        activity_writer.record(
+            item.group_id, paid_by, "expense_created",
+            expense_id=expense_id, amount_cents=to_cents(item.amount)
+        )
+
+    # one event per group, not per item: a large import would overflow subscribers
+    imported = Counter(item.group_id for _, item, _ in valid)
+    for group_id, count in imported.items():
+        event_hub.publish(group_id, "expenses_imported", count=count, actor_id=paid_by)
+
+    return {
+        "created": [
+            {"index": index, "id": expense_id}
+            for expense_id, (index, _, _) in zip(expense_ids, valid)
+        ],
+        "errors": errors
+    }
+
+async def bulk_create_expenses_sharded(shards: ShardSessions, data, paid_by: int):
+    # Split the batch by the shard that owns each item's group
+    by_shard: Dict[int, List[int]] = {}
+    for index, item in enumerate(data.items):
+        by_shard.setdefault(shard_for(item.group_id), []).append(index)
+
+    if len(by_shard) == 1:
+        shard, = by_shard
+        return await bulk_create_expenses(shards.get(shard), data, paid_by)
+
+    # One transaction can't span databases
+    if data.mode == "atomic":
+        raise HTTPException(400, "An atomic bulk import can't mix groups stored on different shards")
+
+    async def import_part(shard: int, indexes: List[int]):
+        part = data.model_copy(update={"items": [data.items[i] for i in indexes]})
+        result = await bulk_create_expenses(shards.get(shard), part, paid_by)
+
+        # positions within the part back to positions in the request
+        return (
+            [{**row, "index": indexes[row["index"]]} for row in result["created"]],
+            [{**row, "index": indexes[row["index"]]} for row in result["errors"]]
+        )
+
+    parts = await asyncio.gather(*(import_part(shard, indexes) for shard, indexes in by_shard.items()))
+
+    return {
+        "created": sorted((row for created, _ in parts for row in created), key=lambda row: row["index"]),
+        "errors": sorted((row for _, errors in parts for row in errors), key=lambda row: row["index"])
+    }
+
 async def delete_expense(db: AsyncSession, user_id: int, expense_id: int):
-    # Fetch expense
-    q = select(Expense).where(Expense.id == expense_id)
+    # Fetch expense (locked, so a concurrent delete can't reverse the ledger twice)
+    q = select(Expense).where(Expense.id == expense_id).with_for_update()
     res = await db.execute(q)
     expense = res.scalar_one_or_none()
 
-    if not expense:
+    if not expense or expense.is_deleted:
         raise HTTPException(404, "Expense not found")
 
     # Authorization: only payer can delete
     if expense.paid_by != user_id:
         raise HTTPException(403, "You cannot delete this expense")
 
+    splits_q = select(ExpenseSplit.user_id, ExpenseSplit.amount).where(ExpenseSplit.expense_id == expense_id)
+    splits = (await db.execute(splits_q)).all()
+
     # Cascade deletes ExpenseSplit if relationship is set
     expense.is_deleted = True
+
+    await apply_balance_deltas(
+        db,
+        expense.group_id,
+        invert_deltas(expense_deltas(expense.paid_by, expense.amount, splits))
+    )
+
+    await fan_out(db, notification_rows(
+        "expense_deleted", user_id, expense.group_id,
+        [(uid, to_cents(amount)) for uid, amount in splits],
+        expense_id=expense.id
+    ))
+
     await db.commit()
 
+    activity_writer.record(
+        expense.group_id, user_id, "expense_deleted",
+        expense_id=expense.id, amount_cents=to_cents(expense.amount)
+    )
+    event_hub.publish(expense.group_id, "expense_deleted", expense_id=expense.id, actor_id=user_id)
 
     return {"status": "deleted"}
 
 async def edit_expense(db: AsyncSession, data, expense_id: int, user_id: int):
-    q = select(Expense).where(Expense.id == expense_id)
+    q = select(Expense).where(Expense.id == expense_id).with_for_update()
     res = await db.execute(q)
     expense = res.scalar_one_or_none()
 
-    if not expense:
+    if not expense or expense.is_deleted:
         raise HTTPException(404, "Expense doesn't exist")
     
     if expense.paid_by != user_id:
         raise HTTPException(403, "You can't edit this expense")
     
-    q_member = select(GroupMember).where(
-        GroupMember.group_id == expense.group_id,
-        GroupMember.user_id == user_id
-    )
-
-    member = await db.execute(q_member)
-
-    if not member.scalar_one_or_none():
-        raise HTTPException(403, "You are not member of this group")
-    
-    user_ids = [s.user_id for s in data.splits]
+    await check_group_membership(db, expense.group_id, user_id)
 
-    if len(user_ids) >= len(set(user_ids)):
-        raise HTTPException(400, "Duplicate users in split") 
-    
-    total = sum(s.amout for s in data.splits)
+    q_members = select(GroupMember.user_id).where(GroupMember.group_id == expense.group_id)
+    members = set((await db.execute(q_members)).scalars().all())
 
-    if total != data.amount:
-        raise HTTPException(400, "Split sums do not match the amount")
+    try:
+        splits = resolve_splits(data, members)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     
-    q_members = select(GroupMember).where(
-        GroupMember.group_id == expense.group_id,
-        GroupMember.user_id.in_(user_ids)
+    # one partition; the expense row lock above serializes edits of its splits
+    this_expense = (
+        ExpenseSplit.expense_id == expense_id,
+        ExpenseSplit.expense_created_at == expense.created_at
     )
+    old_q = select(ExpenseSplit.user_id, ExpenseSplit.amount).where(*this_expense)
+    old_splits = (await db.execute(old_q)).all()
 
-    rows = await db.execute(q_members)
+    old_deltas = expense_deltas(expense.paid_by, expense.amount, old_splits)
+    new_deltas = expense_deltas(expense.paid_by, data.amount, [(uid, from_cents(cents)) for uid, cents in splits])
 
-    if len(rows.scalars().all()) != len(user_ids):
-        raise HTTPException(400, "Some users are not group members")
-    
     expense.amount = data.amount
     expense.description = data.description
 
-    del_q = select(ExpenseSplit).where(ExpenseSplit.expense_id == expense_id)
-    old_splits = await db.execute(del_q)
+    # Only touch the splits that differ: one statement each for dropped,
+    # changed and added users, none when the split set is unchanged
+    old_cents = {uid: to_cents(amount) for uid, amount in old_splits}
+    new_cents = dict(splits)
 
-    for s in old_splits.scalars().all():
-        await db.delete(s)
+    removed = [uid for uid in old_cents if uid not in new_cents]
+    changed = {uid: cents for uid, cents in splits if uid in old_cents and old_cents[uid] != cents}
+    added = [(uid, cents) for uid, cents in splits if uid not in old_cents]
 
-    for s in data.splits:
-        new_s = ExpenseSplit(
-            expense_id=expense_id,
-            user_id=s.user_id,
-            amount=s.amount
+    if removed:
+        await db.execute(
+            delete(ExpenseSplit)
+            .where(*this_expense, ExpenseSplit.user_id.in_(removed))
+            .execution_options(synchronize_session=False)
         )
-        db.add(new_s)
+
+    if changed:
+        new_amounts = {uid: from_cents(cents) for uid, cents in changed.items()}
+        await db.execute(
+            update(ExpenseSplit)
+            .where(*this_expense, ExpenseSplit.user_id.in_(new_amounts))
+            .values(amount=case(new_amounts, value=ExpenseSplit.user_id))
+            .execution_options(synchronize_session=False)
+        )
+
+    if added:
+        await db.execute(insert(ExpenseSplit.__table__), [
+            {"expense_id": expense_id, "expense_created_at": expense.created_at, "user_id": uid, "amount": from_cents(cents)}
+            for uid, cents in added
+        ])
+
+    await apply_balance_deltas(db, expense.group_id, merge_deltas(invert_deltas(old_deltas), new_deltas))
+
+    # new participants with their new share, dropped ones without an amount
+    dropped = [(uid, None) for uid in removed]
+    await fan_out(db, notification_rows("expense_edited", user_id, expense.group_id, splits + dropped, expense_id=expense.id))
 
     await db.commit()
     await db.refresh(expense)
+
+    activity_writer.record(
+        expense.group_id, user_id, "expense_edited",
+        expense_id=expense.id, amount_cents=to_cents(expense.amount)
+    )
+    event_hub.publish(expense.group_id, "expense_edited", expense_id=expense.id, actor_id=user_id)
+
     return expense
 
 async def get_my_expenses(
-    db: AsyncSession,
-    user_id: int
+    shards: ShardSessions,
+    user_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None
 ):
-    q = (
-        select(Expense)
-        .where(Expense.paid_by == user_id)
-        .order_by(Expense.created_at.desc(), Expense.id.desc())
+    q = select(Expense).where(
+        Expense.paid_by == user_id,
+        Expense.is_deleted == False,
+        *created_between(since, until, Expense.created_at)
     )
+    q = keyset_page(q, Expense.created_at, Expense.id, limit=limit, after=after)
 
-    res = await db.execute(q)
-    return res.scalars().all()
+    key = lambda e: (e.created_at, e.id)
+    pages = [res.scalars().all() for res in await shards.execute_all(q)]
+    expenses, next_cursor = split_page(merge_pages(pages, key), limit, key=key)
+
+    return {
+        "expenses": expenses,
+        "next_cursor": next_cursor
+    }
 
 async def get_debt(
-    db: AsyncSession,
-    user_id: int
+    shards: ShardSessions,
+    user_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None
 ):
+    filters = (
+        ExpenseSplit.user_id == user_id,
+        ExpenseSplit.amount > 0,
+        Expense.paid_by != user_id,
+        Expense.is_deleted == False,
+        *created_between(since, until, Expense.created_at, ExpenseSplit.expense_created_at)
+    )
+
+    total_q = (
+        select(sql_sum_cents(ExpenseSplit.amount))
+        .join(Expense, Expense.id == ExpenseSplit.expense_id)
+        .where(*filters)
+    )
+
     q = (
         select(
             Expense.id.label("expense_id"),
@@ -176,30 +435,28 @@ async def get_debt(
             Expense.group_id,
             Expense.created_at,
             Expense.paid_by,
-            ExpenseSplit.amount.label("owed_amount"),
+            sql_cents(ExpenseSplit.amount).label("owed_cents"),
             User.name.label("payer_name")
         )
         .join(ExpenseSplit, Expense.id == ExpenseSplit.expense_id)
         .join(User, User.id == Expense.paid_by)
-        .where(
-            ExpenseSplit.user_id == user_id,
-            ExpenseSplit.amount > 0,
-            Expense.paid_by != user_id,
-            # Expense.is_deleted == False
-        )
-        .order_by(Expense.created_at.desc(), Expense.id.desc())
+        .where(*filters)
     )
+    q = keyset_page(q, Expense.created_at, Expense.id, limit=limit, after=after)
 
-    res = await db.execute(q)
-    rows = res.all()
+    async def shard_page(db: AsyncSession):
+        return await db.scalar(total_q), (await db.execute(q)).all()
+
+    # Total and page from every shard at once
+    totals, pages = zip(*await shards.gather(shard_page))
+    total = sum(totals)
+
+    key = lambda r: (r.created_at, r.expense_id)
+    rows, next_cursor = split_page(merge_pages(list(pages), key), limit, key=key)
 
-    total = Decimal("0")
     expenses = []
 
     for row in rows:
-        amt = qround(Decimal(str(row.owed_amount)))
-        total += amt
-
         expenses.append({
             "expense_id": row.expense_id,
             "description": row.description,
@@ -208,50 +465,68 @@ async def get_debt(
                 "id": row.paid_by,
                 "name": row.payer_name
             },
-            "amount_i_owe": str(amt),
+            "amount_i_owe": format_cents(row.owed_cents),
             "created_at": row.created_at
         })
 
     return {
-        "total_debt": str(qround(total)),
-        "expenses": expenses
+        "total_debt": format_cents(total),
+        "expenses": expenses,
+        "next_cursor": next_cursor
     }
 
 async def get_cred(
-    db: AsyncSession,
-    user_id: int
+    shards: ShardSessions,
+    user_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None
 ):
+    filters = (
+        Expense.paid_by == user_id,
+        ExpenseSplit.user_id != user_id,
+        ExpenseSplit.amount > 0,
+        Expense.is_deleted == False,
+        *created_between(since, until, Expense.created_at, ExpenseSplit.expense_created_at)
+    )
+
+    total_q = (
+        select(sql_sum_cents(ExpenseSplit.amount))
+        .join(Expense, Expense.id == ExpenseSplit.expense_id)
+        .where(*filters)
+    )
+
     q = (
         select(
             Expense.id.label("expense_id"),
             Expense.description,
             Expense.group_id,
             Expense.created_at,
+            ExpenseSplit.id.label("split_id"),
             ExpenseSplit.user_id.label("debtor_id"),
-            ExpenseSplit.amount.label("owed_amount"),
+            sql_cents(ExpenseSplit.amount).label("owed_cents"),
             User.name.label("debtor_name")
         )
         .join(ExpenseSplit, Expense.id == ExpenseSplit.expense_id)
         .join(User, User.id == ExpenseSplit.user_id)
-        .where(
-            Expense.paid_by == user_id,
-            ExpenseSplit.user_id != user_id,
-            ExpenseSplit.amount > 0,
-            # Expense.is_deleted == False
-        )
-        .order_by(Expense.created_at.desc(), Expense.id.desc())
+        .where(*filters)
     )
+    # An expense yields one row per debtor, so the split id breaks ties within it
+    q = keyset_page(q, Expense.created_at, Expense.id, ExpenseSplit.id, limit=limit, after=after)
 
-    res = await db.execute(q)
-    rows = res.all()
+    async def shard_page(db: AsyncSession):
+        return await db.scalar(total_q), (await db.execute(q)).all()
+
+    totals, pages = zip(*await shards.gather(shard_page))
+    total = sum(totals)
+
+    key = lambda r: (r.created_at, r.expense_id, r.split_id)
+    rows, next_cursor = split_page(merge_pages(list(pages), key), limit, key=key)
 
-    total = Decimal("0")
     credits = []
 
     for row in rows:
-        amt = qround(Decimal(str(row.owed_amount)))
-        total += amt
-
         credits.append({
             "expense_id": row.expense_id,
             "description": row.description,
@@ -260,49 +535,77 @@ async def get_cred(
                 "id": row.debtor_id,
                 "name": row.debtor_name
             },
-            "amount_owed": str(amt),
+            "amount_owed": format_cents(row.owed_cents),
             "created_at": row.created_at
         })
 
     return {
-        "total_credit": str(qround(total)),
-        "credits": credits
+        "total_credit": format_cents(total),
+        "credits": credits,
+        "next_cursor": next_cursor
     }
 
 async def get_expenses(
-    db: AsyncSession,
-    user_id: int
+    shards: ShardSessions,
+    user_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None
 ):
-    q = (
-        select(Expense)
-        .outerjoin(ExpenseSplit, Expense.id == ExpenseSplit.expense_id)
+    # Paid by the user or split with them. Each side walks its own index from
+    # the cursor and stops after one page, so a page never reads the whole
+    # history; the outer query merges the two and drops duplicates.
+    paid = keyset_page(
+        select(Expense.created_at, Expense.id).where(
+            Expense.paid_by == user_id,
+            Expense.is_deleted == False,
+            *created_between(since, until, Expense.created_at)
+        ),
+        Expense.created_at, Expense.id, limit=limit, after=after
+    ).subquery()
+    split = keyset_page(
+        select(ExpenseSplit.expense_created_at, ExpenseSplit.expense_id)
+        .join(Expense, and_(
+            Expense.id == ExpenseSplit.expense_id,
+            Expense.created_at == ExpenseSplit.expense_created_at
+        ))
         .where(
-            (Expense.paid_by == user_id) |
-            (ExpenseSplit.user_id == user_id)
-        )
-        .order_by(Expense.created_at.desc(), Expense.id.desc())
-        .distinct()
-    )
+            ExpenseSplit.user_id == user_id,
+            Expense.is_deleted == False,
+            *created_between(since, until, ExpenseSplit.expense_created_at)
+        ),
+        ExpenseSplit.expense_created_at, ExpenseSplit.expense_id, limit=limit, after=after
+    ).subquery()
+    involved = union_all(select(*paid.c), select(*split.c))
 
-    res = await db.execute(q)
-    return res.scalars().all()
+    q = select(Expense).where(tuple_(Expense.created_at, Expense.id).in_(involved))
+    q = keyset_page(q, Expense.created_at, Expense.id, limit=limit)
+
+    key = lambda e: (e.created_at, e.id)
+    pages = [res.scalars().all() for res in await shards.execute_all(q)]
+    expenses, next_cursor = split_page(merge_pages(pages, key), limit, key=key)
+
+    return {
+        "expenses": expenses,
+        "next_cursor": next_cursor
+    }
 
 async def get_expense_by_id(
     db: AsyncSession,
     expense_id: int,
-    user_id: int
+    user_id: int,
+    include_archived: bool = False
 ):
+    expenses = expense_source(include_archived)
+
     q = (
         select(
-            Expense,
-            User.id.label("payer_id"),
+            expenses,
             User.name.label("payer_name")
         )
-        .join(User, User.id == Expense.paid_by)
-        .where(
-            Expense.id == expense_id,
-            # Expense.is_deleted == False
-        )
+        .join(User, User.id == expenses.c.paid_by)
+        .where(expenses.c.id == expense_id)
     )
 
     res = await db.execute(q)
@@ -311,33 +614,24 @@ async def get_expense_by_id(
     if not row:
         raise HTTPException(404, "Expense not found")
 
-    expense = row.Expense
-
-    q_member = (
-        select(GroupMember)
-        .where(
-            GroupMember.group_id == expense.group_id,
-            GroupMember.user_id == user_id
-        )
-    )
+    await check_group_membership(db, row.group_id, user_id)
 
-    member_res = await db.execute(q_member)
-    if not member_res.scalar_one_or_none():
-        raise HTTPException(403, "Unauthorized access")
+    # one partition
+    splits = split_source(include_archived, ExpenseSplit.expense_created_at == row.created_at)
 
     splits_q = (
         select(
-            ExpenseSplit.user_id,
-            ExpenseSplit.amount
+            splits.c.user_id,
+            splits.c.amount
         )
-        .where(ExpenseSplit.expense_id == expense_id)
-        .order_by(ExpenseSplit.user_id)
+        .where(splits.c.expense_id == expense_id)
+        .order_by(splits.c.user_id)
     )
 
     splits_res = await db.execute(splits_q)
     split_rows = splits_res.all()
 
-    splits = [
+    split_list = [
         {
             "user_id": uid,
             "amount": str(qround(Decimal(str(amount))))
@@ -345,14 +639,20 @@ async def get_expense_by_id(
         for uid, amount in split_rows
     ]
 
-    return {
-        "id": expense.id,
-        "description": expense.description,
-        "amount": str(qround(Decimal(str(expense.amount)))),
-        "created_at": expense.created_at,
+    result = {
+        "id": row.id,
+        "description": row.description,
+        "amount": str(qround(Decimal(str(row.amount)))),
+        "created_at": row.created_at,
         "paid_by": {
-            "id": row.payer_id,
+            "id": row.paid_by,
             "name": row.payer_name
         },
-        "splits": splits
+        "splits": split_list
     }
+
+    if include_archived:
+        result["is_deleted"] = row.is_deleted
+        result["archived"] = row.archived
+
+    return result
@@ -1,15 +1,32 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import delete, and_
 from app.models.group import Group
 from app.models.group_member import GroupMember
-from app.models.expense import Expense
-from app.models.expense_split import ExpenseSplit
 from app.models.user import User
+from app.models.group_balance import GroupBalance
+from app.models.expense_split import ExpenseSplit
 from decimal import Decimal
-from typing import Dict
+from typing import Dict, AsyncIterator
+from datetime import datetime
+import csv
+import io
+import json
 from fastapi import HTTPException
-from sqlalchemy import func
-from app.core.utils import qround, simplify_debts
+from app.core.utils import qround, plan_transfers, cents_to_float, expense_source, split_source
+from app.core.pagination import keyset_page, split_page, created_between, DEFAULT_PAGE_SIZE
+from app.db.shards import ShardSessions, shard_for
+from app.core.dependencies import get_group_access, check_group_membership, forget_group_access
+from app.core.activity_writer import activity_writer
+from app.core.events import event_hub
+from app.services.notification_services import forget_group_unread
+from app.services.user_service import ensure_user_on_shard
+
+EXPORT_CHUNK_ROWS = 1000
+EXPORT_CSV_HEADER = [
+    "expense_id", "created_at", "description", "amount",
+    "paid_by_id", "paid_by_name", "split_user_id", "split_amount"
+]
 
 async def create_group(db: AsyncSession, name:str, creator_id:int):
     group = Group(name=name, created_by=creator_id)
@@ -21,6 +38,9 @@ async def create_group(db: AsyncSession, name:str, creator_id:int):
 
     await db.commit()
     await db.refresh(group)
+
+    activity_writer.record(group.id, creator_id, "member_joined", target_user_id=creator_id)
+
     return group
 
 async def delete_group(db: AsyncSession, group_id: int, creator_id: int):
@@ -31,118 +51,114 @@ async def delete_group(db: AsyncSession, group_id: int, creator_id: int):
     if not group:
         raise HTTPException(404, "Group doesn't exist")
     
+    await forget_group_unread(db, group_id)
     await db.delete(group)
     await db.commit()
+    forget_group_access(db, group_id)
+
+    event_hub.publish(group_id, "group_deleted", actor_id=creator_id)
 
     return {"status": "deleted"}
 
 async def add_member(db: AsyncSession, group_id: int, user_id: int, creator_id: int):
-    q = select(Group).where(Group.id == group_id)
-    res = await db.execute(q)
-    group = res.scalar_one_or_none()
+    access = await get_group_access(db, group_id, creator_id)
 
-    if not group:
+    if not access:
         raise HTTPException(404, "Group doesn't exist")
     
-    if group.created_by != creator_id:
+    if not access.is_admin:
         raise HTTPException(403, "Only the group creator can add members")
     
-    check_q = select(GroupMember).where(
-        GroupMember.group_id == group_id,
-        GroupMember.user_id == user_id
-    )
-
-    existing = await db.execute(check_q)
-    member = existing.scalar_one_or_none()
+    target = await get_group_access(db, group_id, user_id)
 
-    if member:
+    if target.is_member:
         raise HTTPException(400, "User already exist in this group")
 
+    # Users live on shard 0; other shards hold copies for their foreign keys
+    if not await ensure_user_on_shard(db, user_id, shard_for(group_id)):
+        raise HTTPException(404, "User does not exist")
+
     new_member = GroupMember(group_id=group_id, user_id=user_id)
     db.add(new_member)
     await db.commit()
+    forget_group_access(db, group_id)
     await db.refresh(new_member)
+
+    activity_writer.record(group_id, creator_id, "member_joined", target_user_id=user_id)
+    event_hub.publish(group_id, "member_joined", user_id=user_id, actor_id=creator_id)
+
     return new_member
 
 async def remove_member(db: AsyncSession, group_id: int, user_id: int, creator_id: int):
     #TODO: if balance due, restrict removal of member
-    res1 = await db.execute(select(Group).where(Group.id == group_id))
-    group = res1.scalar_one_or_none()
+    access = await get_group_access(db, group_id, creator_id)
 
-    if not group:
+    if not access:
         raise HTTPException(404, "Group does not exist")
 
-    if group.created_by != creator_id:
+    if not access.is_admin:
         raise HTTPException(403, "Only group admin can remove members")
 
     if user_id == creator_id:
         raise HTTPException(400, "Transfer admin role before removing yourself")
 
     res = await db.execute(
-        select(GroupMember).where(
+        delete(GroupMember).where(
             GroupMember.group_id == group_id,
             GroupMember.user_id == user_id
         )
     )
-    member = res.scalar_one_or_none()
 
-    if not member:
+    if not res.rowcount:
         raise HTTPException(404, "User is not a member of this group")
 
-    await db.delete(member)
     await db.commit()
+    forget_group_access(db, group_id)
+
+    activity_writer.record(group_id, creator_id, "member_left", target_user_id=user_id)
+    event_hub.publish(group_id, "member_left", user_id=user_id, actor_id=creator_id)
 
     return {"status": "member_removed"}
 
 async def exit_group(db: AsyncSession, group_id: int, user_id: int):
     #TODO : if balance is due, restrict user to exit
-    res = await db.execute(select(Group).where(Group.id == group_id))
-    group = res.scalar_one_or_none()
+    access = await get_group_access(db, group_id, user_id)
 
-    if not group:
+    if not access:
         raise HTTPException(404, "Group not found")
 
-    if group.create_by == user_id:
+    if access.is_admin:
         raise HTTPException(400, "Group admin cannot exit. Transfer admin role first.")
 
-    res_mem = await db.execute(
-        select(GroupMember).where(
+    if not access.is_member:
+        raise HTTPException(404, "You are not a member of this group")
+
+    await db.execute(
+        delete(GroupMember).where(
             GroupMember.group_id == group_id,
             GroupMember.user_id == user_id
         )
     )
-    member = res_mem.scalar_one_or_none()
-
-    if not member:
-        raise HTTPException(404, "You are not a member of this group")
-
-    await db.delete(member)
     await db.commit()
+    forget_group_access(db, group_id)
+
+    activity_writer.record(group_id, user_id, "member_left", target_user_id=user_id)
+    event_hub.publish(group_id, "member_left", user_id=user_id, actor_id=user_id)
 
     return {"status": "exited_group"}
 
-async def list_group_for_user(db: AsyncSession, user_id: int):
+async def list_group_for_user(shards: ShardSessions, user_id: int):
     q = (
         select(Group)
         .join(GroupMember)
         .where(GroupMember.user_id == user_id)
     )
-    result = await db.execute(q)
-    return result.scalars().all()
+    # the user's groups can live on any shard
+    results = await shards.execute_all(q)
+    return [group for result in results for group in result.scalars().all()]
 
 async def list_group_members(db:AsyncSession, user_id:int, group_id: int):
-    check_q = (
-        select(GroupMember)
-        .where(
-            GroupMember.group_id == group_id,
-            GroupMember.user_id == user_id
-        )
-    )
-
-    check = await db.execute(check_q)
-
-    if not check.scalar():
-        raise HTTPException(status_code=403, detail="Unauthorized access")
+    await check_group_membership(db, group_id, user_id)
     
     members__q = (
         select(User)
@@ -155,15 +171,15 @@ async def list_group_members(db:AsyncSession, user_id:int, group_id: int):
     return users
 
 async def edit_group(db: AsyncSession, group_id: int, user_id: int, data):
-    q = select(Group).where(Group.id == group_id)
-    res = await db.execute(q)
-    group = res.scalar_one_or_none()
+    access = await get_group_access(db, group_id, user_id)
 
-    if not group:
+    if not access:
         raise HTTPException(404, "Group doesn't exist")
     
-    if group.created_by != user_id:
+    if not access.is_admin:
         raise HTTPException(403, "Only group admin can edit group")
+
+    group = await db.get(Group, group_id)
     
     if data.name:
         group.name = data.name
@@ -174,47 +190,23 @@ async def edit_group(db: AsyncSession, group_id: int, user_id: int, data):
     await db.refresh(group)
     return group
 
-async def get_group_net_balances(db : AsyncSession, group_id: int) -> Dict[int, Decimal]:
-    paid_q = (
-        select(Expense.paid_by, func.coalesce(func.sum(Expense.amount), 0))
-        .where(Expense.group_id == group_id)
-        .group_by(Expense.paid_by)
-    )
-
-    paid_res = await db.execute(paid_q)
-    paid_rows = paid_res.all()
-
-    owed_q = (
-        select(ExpenseSplit.user_id, func.coalesce(func.sum(ExpenseSplit.amount), 0))
-        .join(Expense, Expense.id == ExpenseSplit.expense_id)
-        .where(Expense.group_id == group_id)
-        .group_by(ExpenseSplit.user_id)
+async def get_group_net_balances(db : AsyncSession, group_id: int) -> Dict[int, int]:
+    # Ledger rows already net expenses against recorded settlements
+    q = (
+        select(GroupBalance.user_id, GroupBalance.net_cents)
+        .where(GroupBalance.group_id == group_id)
     )
 
-    owed_res = await db.execute(owed_q)
-    owed_rows = owed_res.all()
-
-    paid_map: Dict[int, Decimal] = {row[0]: Decimal(str(row[1])) for row in paid_rows}
-    owed_map: Dict[int, Decimal] = {row[0]: Decimal(str(row[1])) for row in owed_rows}
-
-    user_ids = set(paid_map.keys()) | set(owed_map.keys())
-
-    net: Dict[int, Decimal] = {}
-    for uid in user_ids:
-        p = paid_map.get(uid, Decimal("0"))
-        o = owed_map.get(uid, Decimal("0"))
-        net[uid] = qround(p-o)
+    res = await db.execute(q)
 
-    return net
+    return {uid: cents for uid, cents in res.all()}
 
-async def get_group_settlement_plan(db: AsyncSession, group_id: int):
+async def get_group_settlement_plan(db: AsyncSession, group_id: int, strategy: str = "greedy"):
     net = await get_group_net_balances(db, group_id=group_id)
 
-    net = {uid: (qround(amount)) if abs(amount) >= Decimal("0.005") else Decimal("0") for uid, amount in net.items()}
+    net = {uid: cents for uid, cents in net.items() if cents != 0}
 
-    net = {uid: amt for uid, amt in net.items() if amt != 0}
-
-    transfers = simplify_debts(net)
+    transfers = plan_transfers(net, strategy)
 
     if transfers:
         user_ids = set()
@@ -229,63 +221,65 @@ async def get_group_settlement_plan(db: AsyncSession, group_id: int):
             {
                 "from_id": f, "from_name": users.get(f),
                 "to_id": t, "to_name": users.get(t),
-                "amount": float(a)
+                "amount": cents_to_float(a)
             }
             for f, t, a in transfers
         ]
     else:
         plan = []
 
-    return {"net": {uid: float(amount) for uid, amount in net.items()}, "settlements": plan}
+    return {"net": {uid: cents_to_float(cents) for uid, cents in net.items()}, "settlements": plan}
 
 async def list_group_expenses(
         db: AsyncSession,
         user_id: int,
-        group_id: int
+        group_id: int,
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: str | None = None,
+        include_archived: bool = False,
+        since: datetime | None = None,
+        until: datetime | None = None
 ):
-    check_q = (
-        select(GroupMember)
-        .where(
-            GroupMember.group_id == group_id,
-            GroupMember.user_id == user_id
-        )
-    )
+    await check_group_membership(db, group_id, user_id)
 
-    check = await db.execute(check_q)
-
-    if not check.scalar():
-        raise HTTPException(status_code=403, detail="Unauthorized Access")
-    
+    expenses = expense_source(include_archived)
 
     expense_q = (
         select(
-            Expense,
-            User.id.label("payer_id"),
+            expenses,
             User.name.label("payer_name")
         )
-        .join(User, User.id == Expense.paid_by)
+        .join(User, User.id == expenses.c.paid_by)
         .where(
-            Expense.group_id == group_id,
-            # Expense.is_deleted == False
+            expenses.c.group_id == group_id,
+            *created_between(since, until, expenses.c.created_at)
         )
-        .order_by(Expense.created_at, Expense.id)
     )
+    expense_q = keyset_page(expense_q, expenses.c.created_at, expenses.c.id, limit=limit, after=after)
 
     expense_res = await db.execute(expense_q)
-    expense_rows = expense_res.all()
+    expense_rows, next_cursor = split_page(
+        expense_res.all(), limit, key=lambda r: (r.created_at, r.id)
+    )
 
-    if not expense_res:
-        return []
+    if not expense_rows:
+        return {"expenses": [], "next_cursor": None}
     
-    expense_ids =[row.Expense.id for row in expense_rows]
+    expense_ids =[row.id for row in expense_rows]
+
+    # only the partitions this page spans
+    splits = split_source(
+        include_archived,
+        ExpenseSplit.expense_created_at.between(expense_rows[-1].created_at, expense_rows[0].created_at)
+    )
 
     splits_q = (
         select(
-            ExpenseSplit.expense_id,
-            ExpenseSplit.user_id,
-            ExpenseSplit.amount
+            splits.c.expense_id,
+            splits.c.user_id,
+            splits.c.amount
         )
-        .where(ExpenseSplit.expense_id.in_(expense_ids))
+        .where(splits.c.expense_id.in_(expense_ids))
     )
 
     splits_res = await db.execute(splits_q)
@@ -301,19 +295,126 @@ async def list_group_expenses(
     
     result = []
     for row in expense_rows:
-        expense = row.Expense
-        result.append({
-            "id": expense.id,
-            "description": expense.description,
-            "amount": str(qround(Decimal(str(expense.amount)))),
-            "created_at": expense.created_at,
+        item = {
+            "id": row.id,
+            "description": row.description,
+            "amount": str(qround(Decimal(str(row.amount)))),
+            "created_at": row.created_at,
             "paid_by": {
-                "id": row.payer_id,
+                "id": row.paid_by,
                 "name": row.payer_name
             },
-            "splits": splits_map.get(expense.id, [])
-        })
+            "splits": splits_map.get(row.id, [])
+        }
+        if include_archived:
+            item["is_deleted"] = row.is_deleted
+            item["archived"] = row.archived
+        result.append(item)
     
-    return result
+    return {"expenses": result, "next_cursor": next_cursor}
+
+def _money(amount) -> str | None:
+    if amount is None:
+        return None
+    return str(qround(Decimal(str(amount))))
+
+def _expense_line(row, splits) -> str:
+    return json.dumps({
+        "id": row.id,
+        "description": row.description,
+        "amount": _money(row.amount),
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "paid_by": {
+            "id": row.paid_by,
+            "name": row.payer_name
+        },
+        "splits": splits
+    }) + "\n"
+
+async def stream_group_expenses(
+        db: AsyncSession,
+        group_id: int,
+        fmt: str = "ndjson",
+        include_archived: bool = False,
+        since: datetime | None = None,
+        until: datetime | None = None
+) -> AsyncIterator[str]:
+    # One row per (expense, split), fetched through a server-side cursor in
+    # EXPORT_CHUNK_ROWS partitions, so memory stays flat however large the ledger.
+    expenses = expense_source(include_archived)
+    splits = split_source(include_archived)
+
+    q = (
+        select(
+            expenses.c.id,
+            expenses.c.description,
+            expenses.c.amount,
+            expenses.c.created_at,
+            expenses.c.paid_by,
+            User.name.label("payer_name"),
+            splits.c.user_id.label("split_user_id"),
+            splits.c.amount.label("split_amount")
+        )
+        .join(User, User.id == expenses.c.paid_by)
+        .outerjoin(splits, and_(
+            splits.c.expense_id == expenses.c.id,
+            *created_between(since, until, splits.c.expense_created_at)
+        ))
+        .where(
+            expenses.c.group_id == group_id,
+            *created_between(since, until, expenses.c.created_at)
+        )
+        .order_by(expenses.c.created_at.desc(), expenses.c.id.desc(), splits.c.user_id)
+        .execution_options(yield_per=EXPORT_CHUNK_ROWS)
+    )
+
+    result = await db.stream(q)
+
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(EXPORT_CSV_HEADER)
+
+        async for partition in result.partitions():
+            for row in partition:
+                writer.writerow([
+                    row.id,
+                    row.created_at.isoformat() if row.created_at else "",
+                    row.description or "",
+                    _money(row.amount),
+                    row.paid_by,
+                    row.payer_name,
+                    row.split_user_id if row.split_user_id is not None else "",
+                    _money(row.split_amount) or ""
+                ])
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+
+        if buf.tell():
+            yield buf.getvalue()
+        return
+
+    # ndjson: splits of one expense arrive on consecutive rows; an expense's
+    # line is emitted once the next expense (or the end of the stream) is seen.
+    current = None
+    splits = []
+
+    async for partition in result.partitions():
+        lines = []
+        for row in partition:
+            if current is not None and row.id != current.id:
+                lines.append(_expense_line(current, splits))
+                splits = []
+
+            current = row
+            if row.split_user_id is not None:
+                splits.append({"user_id": row.split_user_id, "amount": _money(row.split_amount)})
+
+        if lines:
+            yield "".join(lines)
+
+    if current is not None:
+        yield _expense_line(current, splits)
 
 # 10 - Services
\ No newline at end of file
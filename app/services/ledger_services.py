@@ -0,0 +1,93 @@
+from typing import Dict, Iterable, Tuple
+from sqlalchemy import select, delete, func, cast, BigInteger, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.group_balance import GroupBalance
+from app.core.utils import to_cents, ledger_entries
+
+def _add(deltas: Dict[int, int], user_id: int, cents: int):
+    deltas[user_id] = deltas.get(user_id, 0) + cents
+
+def expense_deltas(paid_by: int, amount, splits: Iterable[Tuple[int, object]]) -> Dict[int, int]:
+    # payer is owed the full amount, every split user owes their share
+    deltas: Dict[int, int] = {}
+    _add(deltas, paid_by, to_cents(amount))
+
+    for user_id, split_amount in splits:
+        _add(deltas, user_id, -to_cents(split_amount))
+
+    return deltas
+
+def settlement_deltas(from_user: int, to_user: int, amount) -> Dict[int, int]:
+    cents = to_cents(amount)
+    deltas: Dict[int, int] = {}
+    _add(deltas, from_user, cents)
+    _add(deltas, to_user, -cents)
+    return deltas
+
+def invert_deltas(deltas: Dict[int, int]) -> Dict[int, int]:
+    return {uid: -cents for uid, cents in deltas.items()}
+
+def merge_deltas(*parts: Dict[int, int]) -> Dict[int, int]:
+    merged: Dict[int, int] = {}
+    for part in parts:
+        for uid, cents in part.items():
+            _add(merged, uid, cents)
+    return merged
+
+def insert_for(db: AsyncSession):
+    # SQLite (benchmark / local stand-in) shares PostgreSQL's ON CONFLICT syntax
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert
+    return postgresql.insert
+
+async def apply_balance_deltas(db: AsyncSession, group_id: int, deltas: Dict[int, int]):
+    # Runs inside the caller's transaction, so the ledger commits (or rolls back)
+    # together with the expense / settlement write that produced the deltas.
+    # Rows are sorted by user_id so concurrent writers lock them in the same order.
+    rows = [
+        {"group_id": group_id, "user_id": uid, "net_cents": cents}
+        for uid, cents in sorted(deltas.items())
+        if cents != 0
+    ]
+
+    if not rows:
+        return
+
+    stmt = insert_for(db)(GroupBalance).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[GroupBalance.group_id, GroupBalance.user_id],
+        set_={
+            "net_cents": GroupBalance.net_cents + stmt.excluded.net_cents,
+            "updated_at": func.now()
+        }
+    )
+    await db.execute(stmt)
+
+async def rebuild_group_balances(db: AsyncSession, group_id: int | None = None) -> int:
+    # Block ledger writers (not readers) until the rebuilt rows are committed,
+    # so no delta is applied twice or lost while the ledger is recomputed.
+    if db.get_bind().dialect.name == "postgresql":
+        await db.execute(text("LOCK TABLE group_balances IN EXCLUSIVE MODE"))
+
+    entries = ledger_entries(group_id=group_id)
+
+    totals_q = (
+        select(
+            entries.c.group_id,
+            entries.c.user_id,
+            cast(func.sum(entries.c.cents), BigInteger)
+        )
+        .group_by(entries.c.group_id, entries.c.user_id)
+    )
+
+    delete_q = delete(GroupBalance)
+    if group_id is not None:
+        delete_q = delete_q.where(GroupBalance.group_id == group_id)
+
+    await db.execute(delete_q)
+    res = await db.execute(
+        insert_for(db)(GroupBalance).from_select(["group_id", "user_id", "net_cents"], totals_q)
+    )
+
+    return res.rowcount
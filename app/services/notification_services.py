@@ -0,0 +1,158 @@
+from collections import Counter
+from typing import Iterable, List, Tuple
+from fastapi import HTTPException
+from sqlalchemy import select, insert, update, case, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.notification import Notification, NotificationCounter
+from app.models.user import User
+from app.core.utils import format_cents
+from app.core.pagination import id_page, split_id_page, merge_pages, DEFAULT_PAGE_SIZE
+from app.db.shards import ShardSessions
+from app.services.ledger_services import insert_for
+
+def notification_rows(
+    kind: str,
+    actor_id: int,
+    group_id: int,
+    recipients: Iterable[Tuple[int, int | None]],
+    expense_id: int | None = None,
+    settlement_id: int | None = None
+) -> List[dict]:
+    # recipients: (user_id, amount_cents); nobody is notified about their own action
+    return [
+        {
+            "user_id": uid,
+            "group_id": group_id,
+            "actor_id": actor_id,
+            "kind": kind,
+            "expense_id": expense_id,
+            "settlement_id": settlement_id,
+            "amount_cents": cents
+        }
+        for uid, cents in recipients
+        if uid != actor_id
+    ]
+
+async def fan_out(db: AsyncSession, rows: List[dict]):
+    # Runs inside the caller's transaction: one multi-row INSERT for the
+    # notifications and one upsert for the unread counters of every recipient.
+    if not rows:
+        return
+
+    await db.execute(insert(Notification.__table__).values(rows))
+
+    unread = Counter(row["user_id"] for row in rows)
+
+    # sorted, so concurrent fan-outs lock counter rows in the same order
+    stmt = insert_for(db)(NotificationCounter).values([
+        {"user_id": uid, "unread_count": n} for uid, n in sorted(unread.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[NotificationCounter.user_id],
+        set_={"unread_count": NotificationCounter.unread_count + stmt.excluded.unread_count}
+    )
+    await db.execute(stmt)
+
+async def forget_group_unread(db: AsyncSession, group_id: int):
+    # Runs inside the caller's transaction before the group is deleted: its
+    # notifications cascade away, so take their unread ones off each badge
+    q = (
+        select(Notification.user_id, func.count())
+        .where(Notification.group_id == group_id, Notification.is_read == False)
+        .group_by(Notification.user_id)
+    )
+    unread = dict((await db.execute(q)).all())
+
+    if not unread:
+        return
+
+    await db.execute(
+        update(NotificationCounter)
+        .where(NotificationCounter.user_id.in_(sorted(unread)))
+        .values(unread_count=NotificationCounter.unread_count - case(unread, value=NotificationCounter.user_id))
+        .execution_options(synchronize_session=False)
+    )
+
+def _notification_out(row) -> dict:
+    notification = row.Notification
+    return {
+        "id": notification.id,
+        "group_id": notification.group_id,
+        "kind": notification.kind,
+        "actor": {"id": notification.actor_id, "name": row.actor_name},
+        "expense_id": notification.expense_id,
+        "settlement_id": notification.settlement_id,
+        "amount": format_cents(notification.amount_cents) if notification.amount_cents is not None else None,
+        "is_read": notification.is_read,
+        "created_at": notification.created_at
+    }
+
+async def list_notifications(
+    shards: ShardSessions,
+    user_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: str | None = None,
+    unread_only: bool = False
+):
+    # Notifications live with their group, so a user's feed spans every shard
+    q = (
+        select(Notification, User.name.label("actor_name"))
+        .join(User, User.id == Notification.actor_id)
+        .where(Notification.user_id == user_id)
+    )
+
+    if unread_only:
+        q = q.where(Notification.is_read == False)
+
+    q = id_page(q, Notification.id, limit=limit, after=after)
+
+    key = lambda r: r.Notification.id
+    pages = [res.all() for res in await shards.execute_all(q)]
+    rows, next_cursor = split_id_page(merge_pages(pages, key), limit, key=key)
+
+    return {"notifications": [_notification_out(r) for r in rows], "next_cursor": next_cursor}
+
+async def _unread_count_on(db: AsyncSession, user_id: int) -> int:
+    q = select(NotificationCounter.unread_count).where(NotificationCounter.user_id == user_id)
+    return (await db.execute(q)).scalar_one_or_none() or 0
+
+async def get_unread_count(shards: ShardSessions, user_id: int) -> int:
+    # every shard keeps its own counter row for the user
+    return sum(await shards.gather(lambda db: _unread_count_on(db, user_id)))
+
+async def _mark_read_on(db: AsyncSession, user_id: int, from_id: int | None, to_id: int | None) -> int:
+    # 1. Flip the whole range in one statement; only unread rows match, so
+    # the row count is exactly how many the badge has to drop
+    q = (
+        update(Notification)
+        .where(Notification.user_id == user_id, Notification.is_read == False)
+        .values(is_read=True)
+        .execution_options(synchronize_session=False)
+    )
+
+    if from_id is not None:
+        q = q.where(Notification.id >= from_id)
+    if to_id is not None:
+        q = q.where(Notification.id <= to_id)
+
+    res = await db.execute(q)
+    marked = res.rowcount
+
+    # 2. Same transaction, so the shard's counter never drifts from its rows
+    if marked:
+        await db.execute(
+            update(NotificationCounter)
+            .where(NotificationCounter.user_id == user_id)
+            .values(unread_count=NotificationCounter.unread_count - marked)
+        )
+
+    await db.commit()
+    return marked
+
+async def mark_read(shards: ShardSessions, user_id: int, from_id: int | None = None, to_id: int | None = None):
+    if from_id is not None and to_id is not None and from_id > to_id:
+        raise HTTPException(400, "from_id must not be greater than to_id")
+
+    marked = sum(await shards.gather(lambda db: _mark_read_on(db, user_id, from_id, to_id)))
+
+    return {"marked_read": marked, "unread_count": await get_unread_count(shards, user_id)}
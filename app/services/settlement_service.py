@@ -1,92 +1,46 @@
+from typing import Awaitable, Callable
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.models.expense import Expense
-from app.models.expense_split import ExpenseSplit
-from app.models.group_member import GroupMember
+from app.models.group_balance import GroupBalance
 from app.schemas.settlements import Settlement
 from fastapi import HTTPException
 from app.models.settlement_history import SettlementHistory
+from app.core.utils import simplify_debts, cents_to_float, to_cents
+from app.core.dependencies import check_group_membership, get_group_access
+from app.core.activity_writer import activity_writer
+from app.core.events import event_hub
+from app.services.ledger_services import apply_balance_deltas, settlement_deltas, invert_deltas
+from app.services.notification_services import notification_rows, fan_out
 
 async def compute_group_settlements(db: AsyncSession, group_id: int, user_id: int):
     # Ensure user is in group
-    q = select(GroupMember).where(
-        GroupMember.group_id == group_id,
-        GroupMember.user_id == user_id
+    await check_group_membership(db, group_id, user_id)
+
+    # Step 1: Net balance per user, read from the group ledger in one query
+    q_bal = (
+        select(GroupBalance.user_id, GroupBalance.net_cents)
+        .where(
+            GroupBalance.group_id == group_id,
+            GroupBalance.net_cents != 0
+        )
     )
-    is_member = await db.scalar(q)
-    if not is_member:
-        raise HTTPException(403, "You are not a member of this group")
+    rows = (await db.execute(q_bal)).all()
 
-    # Step 1: Fetch all expenses of group
-    q_exp = select(Expense).where(Expense.group_id == group_id)
-    expenses = (await db.scalars(q_exp)).all()
+    # Step 2: Greedy settlement matching on exact integer cents
+    transfers = simplify_debts({uid: cents for uid, cents in rows})
 
-    # Step 2: Calculate balances per user
-    balances = {}  # user_id → balance
+    return [
+        Settlement(from_user=f, to_user=t, amount=cents_to_float(a))
+        for f, t, a in transfers
+    ]
 
-    for exp in expenses:
-        # paid_by increases balance
-        balances[exp.paid_by] = balances.get(exp.paid_by, 0) + float(exp.amount)
-
-        # splits decrease balance
-        q_split = select(ExpenseSplit).where(ExpenseSplit.expense_id == exp.id)
-        splits = (await db.scalars(q_split)).all()
-
-        for s in splits:
-            balances[s.user_id] = balances.get(s.user_id, 0) - float(s.amount)
-
-    # Step 3: Convert balances into payers/receivers
-    payers = []     # (user_id, amount_owed)
-    receivers = []  # (user_id, amount_to_receive)
-
-    for uid, bal in balances.items():
-        if bal < 0:
-            payers.append([uid, -bal])  # store as positive amount to pay
-        elif bal > 0:
-            receivers.append([uid, bal])
-
-    # Step 4: Greedy settlement matching
-    settlements = []
-    i = 0
-    j = 0
-
-    while i < len(payers) and j < len(receivers):
-        payer_id, owe = payers[i]
-        receiver_id, recv = receivers[j]
-
-        amount = min(owe, recv)
-
-        settlements.append(Settlement(
-            from_user=payer_id,
-            to_user=receiver_id,
-            amount=amount
-        ))
-
-        payers[i][1] -= amount
-        receivers[j][1] -= amount
-
-        if payers[i][1] == 0:
-            i += 1
-        if receivers[j][1] == 0:
-            j += 1
-
-    return settlements
-
-async def add_settlement(db: AsyncSession, user_id: int, data):
+async def add_settlement(db: AsyncSession, user_id: int, data, before_commit: Callable[[SettlementHistory], Awaitable] | None = None):
     # User must be part of group
-    q = select(GroupMember).where(
-        GroupMember.group_id == data.group_id,
-        GroupMember.user_id == user_id
-    )
-    if not await db.scalar(q):
-        raise HTTPException(403, "You are not a member of this group")
+    await check_group_membership(db, data.group_id, user_id)
 
     # to_user must also be part of group
-    q2 = select(GroupMember).where(
-        GroupMember.group_id == data.group_id,
-        GroupMember.user_id == data.to_user
-    )
-    if not await db.scalar(q2):
+    receiver = await get_group_access(db, data.group_id, data.to_user)
+    if not receiver.is_member:
         raise HTTPException(400, "Receiver is not in this group")
 
     settlement = SettlementHistory(
@@ -97,19 +51,34 @@ async def add_settlement(db: AsyncSession, user_id: int, data):
     )
 
     db.add(settlement)
+    await db.flush()  # gives settlement.id and created_at
+
+    await apply_balance_deltas(db, data.group_id, settlement_deltas(user_id, data.to_user, data.amount))
+
+    await fan_out(db, notification_rows(
+        "settlement_received", user_id, data.group_id,
+        [(data.to_user, to_cents(data.amount))],
+        settlement_id=settlement.id
+    ))
+
+    if before_commit is not None:
+        await before_commit(settlement)
+
     await db.commit()
     await db.refresh(settlement)
 
+    activity_writer.record(
+        settlement.group_id, user_id, "settlement_added",
+        settlement_id=settlement.id, target_user_id=settlement.to_user,
+        amount_cents=to_cents(settlement.amount)
+    )
+    event_hub.publish(settlement.group_id, "settlement_added", settlement_id=settlement.id, actor_id=user_id)
+
     return settlement
 
 async def get_settlement_history(db: AsyncSession, group_id: int, user_id: int):
     # Ensure requester is in group
-    q = select(GroupMember).where(
-        GroupMember.group_id == group_id,
-        GroupMember.user_id == user_id
-    )
-    if not await db.scalar(q):
-        raise HTTPException(403, "You are not a member of this group")
+    await check_group_membership(db, group_id, user_id)
 
     # Fetch history
     q2 = select(SettlementHistory).where(
@@ -120,8 +89,8 @@ async def get_settlement_history(db: AsyncSession, group_id: int, user_id: int):
     return result.scalars().all()
 
 async def undo_settlement(db: AsyncSession, settlement_id: int, user_id: int):
-    # Fetch settlement
-    q = select(SettlementHistory).where(SettlementHistory.id == settlement_id)
+    # Fetch settlement (locked, so a concurrent undo can't reverse the ledger twice)
+    q = select(SettlementHistory).where(SettlementHistory.id == settlement_id).with_for_update()
     result = await db.execute(q)
     settlement = result.scalar_one_or_none()
 
@@ -133,18 +102,25 @@ async def undo_settlement(db: AsyncSession, settlement_id: int, user_id: int):
         raise HTTPException(403, "You are not allowed to undo this settlement")
 
     # Ensure user is still in group
-    q2 = select(GroupMember).where(
-        GroupMember.group_id == settlement.group_id,
-        GroupMember.user_id == user_id
-    )
-
-    if not await db.scalar(q2):
-        raise HTTPException(403, "You are not a member of this group")
+    await check_group_membership(db, settlement.group_id, user_id)
 
-    # Delete the record
+    # Delete the record and reverse its ledger effect
     await db.delete(settlement)
+
+    await apply_balance_deltas(
+        db,
+        settlement.group_id,
+        invert_deltas(settlement_deltas(settlement.from_user, settlement.to_user, settlement.amount))
+    )
+
     await db.commit()
 
+    activity_writer.record(
+        settlement.group_id, user_id, "settlement_undone",
+        settlement_id=settlement.id, target_user_id=settlement.to_user,
+        amount_cents=to_cents(settlement.amount)
+    )
+    event_hub.publish(settlement.group_id, "settlement_undone", settlement_id=settlement.id, actor_id=user_id)
+
     return { "status": "undo successful" }
 
-#TODO: remove membership check for user - add at route through util function
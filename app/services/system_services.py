@@ -1,9 +1,17 @@
-from app.db.session import engine
+from app.db.session import engine, read_engines, write_pins
+from app.db.pool import pool_stats
+from app.core.metrics import gauge_lines, stats_lines, render_http_metrics
 from sqlalchemy import select, func
-from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.shards import ShardSessions, shard_engines
 from app.models.user import User
 from app.models.group import Group
 from app.models.expense import Expense
+from app.core.security import password_pool
+from app.core.principal_cache import principal_cache
+from app.core.idempotency import idempotency_cache
+from app.core.activity_writer import activity_writer
+from app.core.archiver import expense_archiver
+from app.core.events import event_hub
 
 async def check_db_service():
     try:
@@ -18,19 +26,40 @@ async def system_health():
         "status": "ok"
     }
 
-async def system_metrics(db: AsyncSession):
-    users_q = select(func.count(User.id))
+async def _shard_count(shards: ShardSessions, q) -> int:
+    return sum(res.scalar() for res in await shards.execute_all(q))
+
+async def system_metrics(shards: ShardSessions) -> str:
     groups_q = select(func.count(Group.id))
     expenses_q = select(func.count(Expense.id)).where(
         Expense.is_deleted == False
     )
 
-    users_res = await db.execute(users_q)
-    groups_res = await db.execute(groups_q)
-    expenses_res = await db.execute(expenses_q)
+    # users are mirrored to every shard: count them on shard 0 only
+    users = (await shards.get(0).execute(select(func.count(User.id)))).scalar()
+    groups = await _shard_count(shards, groups_q)
+    expenses = await _shard_count(shards, expenses_q)
 
-    return {
-        "users": users_res.scalar(),
-        "groups": groups_res.scalar(),
-        "expenses": expenses_res.scalar()
-    }
\ No newline at end of file
+    lines = (
+        gauge_lines("splitwise_users", "Registered users", users)
+        + gauge_lines("splitwise_groups", "Groups", groups)
+        + gauge_lines("splitwise_expenses", "Non-deleted expenses", expenses)
+        + render_http_metrics()
+        + stats_lines("splitwise_password_hash", "Password hashing pool", password_pool.stats())
+        + stats_lines("splitwise_principal_cache", "Principal cache", principal_cache.stats())
+        + stats_lines("splitwise_idempotency_cache", "Idempotency cache", idempotency_cache.stats())
+        + stats_lines("splitwise_activity_writer", "Activity writer", activity_writer.stats())
+        + stats_lines("splitwise_expense_archiver", "Expense archiver", expense_archiver.stats())
+        + stats_lines("splitwise_events", "Group event hub", event_hub.stats())
+        + stats_lines("splitwise_db_pool", "Primary database pool", pool_stats(engine.pool))
+        + stats_lines("splitwise_read_routing", "Read routing", write_pins.stats())
+    )
+
+    for index, replica in enumerate(read_engines):
+        lines += stats_lines(f"splitwise_db_replica{index}_pool", f"Read replica {index} pool", pool_stats(replica.pool))
+
+    for index, shard in enumerate(shard_engines[1:], start=1):
+        lines += stats_lines(f"splitwise_db_shard{index}_pool", f"Shard {index} pool", pool_stats(shard.pool))
+
+    # Prometheus text exposition format
+    return "\n".join(lines) + "\n"
\ No newline at end of file
@@ -2,12 +2,61 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.models.user import User
 from app.schemas.user import UserCreate
-from app.core.security import hash_password
+from app.core.security import hash_password_async
 from app.core.jwt_config import create_access_token, create_refresh_token
 from app.services.user_queries import get_user_by_email, get_user_by_id
-from app.core.security import verify_password
+from app.core.security import verify_password_async
+from app.core.principal_cache import principal_cache
 from fastapi import HTTPException
 from sqlalchemy.sql import func
+from typing import Iterable
+from app.db.shards import shard_sessionmakers
+from app.services.ledger_services import insert_for
+
+# What other shards need to join and reference users; auth stays on shard 0,
+# so credentials are not copied
+MIRRORED_USER_COLUMNS = ("id", "email", "name", "is_active")
+# Stored as password_hash on the mirrors: matches no password
+MIRROR_PASSWORD_HASH = "!"
+
+def _mirror_row(user: User) -> dict:
+    return {**{col: getattr(user, col) for col in MIRRORED_USER_COLUMNS}, "password_hash": MIRROR_PASSWORD_HASH}
+
+def _upsert_users(db: AsyncSession, rows: list):
+    # Also overwrites hashes copied by earlier versions
+    stmt = insert_for(db)(User).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[User.id],
+        set_={col: stmt.excluded[col] for col in (*MIRRORED_USER_COLUMNS[1:], "password_hash")}
+    )
+
+async def mirror_users(users: Iterable[User]):
+    # Upsert the users into every shard but the first one
+    rows = [_mirror_row(user) for user in users]
+
+    if not rows:
+        return
+
+    for sessionmaker in shard_sessionmakers[1:]:
+        async with sessionmaker() as db:
+            await db.execute(_upsert_users(db, rows))
+            await db.commit()
+
+async def ensure_user_on_shard(db: AsyncSession, user_id: int, shard: int) -> bool:
+    # Whether the user exists, checked on shard 0 where users live. On other
+    # shards also upsert their copy within the caller's transaction, in case
+    # the mirror at sign-up never got there.
+    if shard == 0:
+        return await db.get(User, user_id) is not None
+
+    async with shard_sessionmakers[0]() as source:
+        user = await source.get(User, user_id)
+
+    if user is None:
+        return False
+
+    await db.execute(_upsert_users(db, [_mirror_row(user)]))
+    return True
 
 async def authenticate_user(
     db: AsyncSession,
@@ -18,7 +67,7 @@ async def authenticate_user(
     if not user:
         return None
 
-    if not verify_password(password, user.password_hash):
+    if not await verify_password_async(password, user.password_hash):
         return None
 
     return user
@@ -31,12 +80,13 @@ async def create_user(db: AsyncSession, data: UserCreate):
     user = User(
         email = data.email,
         name = data.name,
-        password_hash = hash_password(data.password)
+        password_hash = await hash_password_async(data.password)
     )
 
     db.add(user)
     await db.commit()
     await db.refresh(user)
+    await mirror_users([user])
     return user
 
 async def edit_user(db : AsyncSession, data ,user_id: int):
@@ -55,6 +105,8 @@ async def edit_user(db : AsyncSession, data ,user_id: int):
 
     await db.commit()
     await db.refresh(user)
+    await mirror_users([user])
+    principal_cache.invalidate_user(user_id)
 
     return user
 
@@ -76,5 +128,6 @@ async def login_user_service(
 
     await db.commit()
     await db.refresh(user)
+    principal_cache.invalidate_user(user.id)
 
     return user, access_token, refresh_token
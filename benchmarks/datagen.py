@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+from sqlalchemy import insert
+from app.db.session import Base, engine, async_session
+from app.core.security import hash_password
+from app.models.user import User
+from app.models.group import Group
+from app.models.group_member import GroupMember
+from app.models.expense import Expense
+from app.models.expense_split import ExpenseSplit
+from app.models.settlement_history import SettlementHistory
+from app.models.group_balance import GroupBalance
+# not seeded, but --create-schema must create every table the API writes to
+import app.models.idempotency_key
+import app.models.activity
+import app.models.notification
+import app.models.expense_archive
+from app.services.ledger_services import rebuild_group_balances
+
+# Every generated user logs in with this password
+BENCH_PASSWORD = "bench-password"
+BENCH_EMAIL = "bench-user-{}@example.com"
+BENCH_GROUP = "bench-group-{}"
+
+BATCH_ROWS = 5000
+
+def expenses_per_group(rng: random.Random, groups: int, total: int, skew: float) -> List[int]:
+    # Pareto weights: with skew ~1.2 a handful of groups hold most of the history,
+    # which is where balance / listing performance degrades first.
+    weights = [rng.paretovariate(skew) for _ in range(groups)]
+    scale = total / sum(weights)
+    counts = [int(w * scale) for w in weights]
+
+    # hand the rounding leftovers to the heaviest groups
+    for i in sorted(range(groups), key=lambda i: -weights[i])[:total - sum(counts)]:
+        counts[i] += 1
+
+    return counts
+
+def equal_split_cents(total_cents: int, parts: int) -> List[int]:
+    base, rest = divmod(total_cents, parts)
+    return [base + (1 if i < rest else 0) for i in range(parts)]
+
+async def _insert_batches(db, table, rows: List[dict], returning=None) -> List[int]:
+    ids = []
+    for start in range(0, len(rows), BATCH_ROWS):
+        batch = rows[start:start + BATCH_ROWS]
+        if returning is None:
+            await db.execute(insert(table), batch)
+        else:
+            res = await db.execute(insert(table).returning(returning, sort_by_parameter_order=True), batch)
+            ids.extend(res.scalars().all())
+    return ids
+
+async def seed(
+    users: int,
+    groups: int,
+    expenses: int,
+    skew: float = 1.2,
+    min_members: int = 3,
+    max_members: int = 12,
+    max_split: int = 8,
+    days: int = 365,
+    seed_value: int = 42,
+    create_schema: bool = False
+) -> Dict[str, int]:
+    rng = random.Random(seed_value)
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    if create_schema:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    # bcrypt once, not once per user
+    password_hash = hash_password(BENCH_PASSWORD)
+
+    async with async_session() as db:
+        user_table = User.__table__
+        user_ids = await _insert_batches(db, user_table, [
+            {
+                "email": BENCH_EMAIL.format(i),
+                "name": f"Bench User {i}",
+                "password_hash": password_hash,
+                "is_active": True
+            }
+            for i in range(users)
+        ], returning=user_table.c.id)
+
+        group_table = Group.__table__
+        creators = [rng.choice(user_ids) for _ in range(groups)]
+        group_ids = await _insert_batches(db, group_table, [
+            {"name": BENCH_GROUP.format(i), "created_by": creators[i]}
+            for i in range(groups)
+        ], returning=group_table.c.id)
+
+        members: Dict[int, List[int]] = {}
+        member_rows = []
+        for group_id, creator in zip(group_ids, creators):
+            size = min(rng.randint(min_members, max_members), len(user_ids))
+            others = rng.sample([u for u in user_ids if u != creator], size - 1)
+            members[group_id] = [creator] + others
+            member_rows += [{"group_id": group_id, "user_id": uid} for uid in members[group_id]]
+        await _insert_batches(db, GroupMember.__table__, member_rows)
+
+        expense_table = Expense.__table__
+        counts = expenses_per_group(rng, len(group_ids), expenses, skew)
+        expense_rows = []
+        split_plan = []
+
+        for group_id, count in zip(group_ids, counts):
+            group_members = members[group_id]
+            for _ in range(count):
+                amount_cents = rng.randint(100, 50000)
+                participants = rng.sample(group_members, rng.randint(1, min(max_split, len(group_members))))
+
+                expense_rows.append({
+                    "group_id": group_id,
+                    "paid_by": rng.choice(group_members),
+                    "amount": amount_cents / 100,
+                    "description": f"bench expense {len(expense_rows)}",
+                    "created_at": now - timedelta(seconds=rng.randint(0, days * 86400)),
+                    "is_deleted": False
+                })
+                split_plan.append(list(zip(participants, equal_split_cents(amount_cents, len(participants)))))
+
+        expense_ids = await _insert_batches(db, expense_table, expense_rows, returning=expense_table.c.id)
+
+        split_rows = [
+            {"expense_id": expense_id, "expense_created_at": row["created_at"], "user_id": uid, "amount": cents / 100}
+            for expense_id, row, splits in zip(expense_ids, expense_rows, split_plan)
+            for uid, cents in splits
+        ]
+        await _insert_batches(db, ExpenseSplit.__table__, split_rows)
+
+        await rebuild_group_balances(db)
+        await db.commit()
+
+    # aiosqlite's worker thread keeps the process alive until the pool is closed
+    await engine.dispose()
+
+    return {
+        "users": len(user_ids),
+        "groups": len(group_ids),
+        "memberships": len(member_rows),
+        "expenses": len(expense_ids),
+        "splits": len(split_rows)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed deterministic synthetic data for benchmarks")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--groups", type=int, default=100)
+    parser.add_argument("--expenses", type=int, default=50000)
+    parser.add_argument("--skew", type=float, default=1.2, help="Pareto shape for expenses per group (lower = more skewed)")
+    parser.add_argument("--min-members", type=int, default=3)
+    parser.add_argument("--max-members", type=int, default=12)
+    parser.add_argument("--max-split", type=int, default=8)
+    parser.add_argument("--days", type=int, default=365, help="spread created_at over this many days")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--create-schema", action="store_true", help="create tables from the models first (scratch databases only)")
+    args = parser.parse_args()
+
+    counts = asyncio.run(seed(
+        users=args.users,
+        groups=args.groups,
+        expenses=args.expenses,
+        skew=args.skew,
+        min_members=args.min_members,
+        max_members=args.max_members,
+        max_split=args.max_split,
+        days=args.days,
+        seed_value=args.seed,
+        create_schema=args.create_schema
+    ))
+
+    print(", ".join(f"{k}={v}" for k, v in counts.items()))
+
+if __name__ == "__main__":
+    main()
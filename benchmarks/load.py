@@ -0,0 +1,349 @@
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import statistics
+import time
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Tuple
+import httpx
+from fastapi.routing import APIRoute
+from sqlalchemy import select
+from app.main import app
+from app.db.session import async_session, engine
+from app.core.jwt_config import create_access_token
+from app.core.metrics import QUERY_COUNT_HEADER
+from app.models.group import Group
+from app.models.group_member import GroupMember
+from app.models.expense import Expense
+from app.models.user import User
+from benchmarks.datagen import BENCH_EMAIL, BENCH_PASSWORD
+
+API = "/api/v1"
+
+@dataclass
+class Fixture:
+    # user_id -> bearer token, group_id -> member ids, group_id -> creator
+    tokens: Dict[int, str]
+    members: Dict[int, List[int]]
+    creators: Dict[int, int]
+    expenses: List[Tuple[int, int]]
+    user_ids: List[int]
+    emails: List[str]
+    counter: itertools.count = field(default_factory=itertools.count)
+
+    def member(self, rng: random.Random) -> Tuple[int, int]:
+        group_id = rng.choice(list(self.members))
+        return group_id, rng.choice(self.members[group_id])
+
+    def auth(self, user_id: int) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[user_id]}"}
+
+# A builder returns (url, request kwargs) for one request
+Builder = Callable[[Fixture, random.Random], Tuple[str, dict]]
+
+@dataclass
+class Scenario:
+    method: str
+    route: str
+    build: Builder
+    write: bool = False
+
+def _as_member(url: str, **extra) -> Builder:
+    def build(fx: Fixture, rng: random.Random):
+        group_id, user_id = fx.member(rng)
+        return url.format(group_id=group_id, user_id=user_id), {"headers": fx.auth(user_id), **extra}
+    return build
+
+def _as_user(url: str, **extra) -> Builder:
+    def build(fx: Fixture, rng: random.Random):
+        user_id = rng.choice(fx.user_ids)
+        return url.format(user_id=user_id), {"headers": fx.auth(user_id), **extra}
+    return build
+
+def _anonymous(url: str) -> Builder:
+    def build(fx: Fixture, rng: random.Random):
+        return url.format(user_id=rng.choice(fx.user_ids)), {}
+    return build
+
+def _expense_body(fx: Fixture, rng: random.Random, group_id: int) -> dict:
+    members = fx.members[group_id]
+    participants = rng.sample(members, rng.randint(1, len(members)))
+    share_cents = rng.randint(100, 5000)
+    return {
+        "group_id": group_id,
+        # splits must add up to the amount in cents
+        "amount": share_cents * len(participants) / 100,
+        "description": "load test",
+        "splits": [{"user_id": uid, "amount": share_cents / 100} for uid in participants]
+    }
+
+def _create_expense(fx: Fixture, rng: random.Random):
+    group_id, user_id = fx.member(rng)
+    return f"{API}/expense/", {"headers": fx.auth(user_id), "json": _expense_body(fx, rng, group_id)}
+
+def _bulk_expenses(fx: Fixture, rng: random.Random):
+    group_id, user_id = fx.member(rng)
+    items = [_expense_body(fx, rng, group_id) for _ in range(20)]
+    return f"{API}/expense/bulk", {"headers": fx.auth(user_id), "json": {"items": items}}
+
+def _fetch_expense(fx: Fixture, rng: random.Random):
+    expense_id, group_id = rng.choice(fx.expenses)
+    user_id = rng.choice(fx.members[group_id])
+    return f"{API}/expense/{expense_id}", {"headers": fx.auth(user_id)}
+
+def _add_settlement(fx: Fixture, rng: random.Random):
+    group_id = rng.choice([g for g, m in fx.members.items() if len(m) > 1])
+    from_user, to_user = rng.sample(fx.members[group_id], 2)
+    body = {"group_id": group_id, "to_user": to_user, "amount": rng.randint(100, 2000) / 100}
+    return f"{API}/groups/{group_id}/settlements/add", {"headers": fx.auth(from_user), "json": body}
+
+def _add_member(fx: Fixture, rng: random.Random):
+    group_id = rng.choice(list(fx.creators))
+    admin = fx.creators[group_id]
+    # may pick an existing member; the 400 is part of the route's cost profile
+    return f"{API}/groups/{group_id}/add/{rng.choice(fx.user_ids)}", {"headers": fx.auth(admin)}
+
+def _mark_read(fx: Fixture, rng: random.Random):
+    user_id = rng.choice(fx.user_ids)
+    # whole inbox: the widest range the endpoint accepts
+    return f"{API}/notifications/mark-read", {"headers": fx.auth(user_id), "json": {}}
+
+def _create_group(fx: Fixture, rng: random.Random):
+    user_id = rng.choice(fx.user_ids)
+    name = f"load-group-{time.time_ns()}-{next(fx.counter)}"
+    return f"{API}/groups/", {"headers": fx.auth(user_id), "json": {"name": name}}
+
+def _register(fx: Fixture, rng: random.Random):
+    email = f"load-{time.time_ns()}-{next(fx.counter)}@example.com"
+    return f"{API}/users/register", {"json": {"email": email, "name": "load", "password": BENCH_PASSWORD}}
+
+def _login(fx: Fixture, rng: random.Random):
+    body = {"email": rng.choice(fx.emails), "name": "load", "password": BENCH_PASSWORD}
+    return f"{API}/users/login", {"json": body}
+
+SCENARIOS = [
+    Scenario("GET", "/", _anonymous("/")),
+    Scenario("GET", f"{API}/system/health", _anonymous(f"{API}/system/health")),
+    Scenario("GET", f"{API}/system/health/db", _anonymous(f"{API}/system/health/db")),
+    Scenario("GET", f"{API}/system/metrics", _anonymous(f"{API}/system/metrics")),
+
+    Scenario("GET", f"{API}/users/", _anonymous(f"{API}/users/")),
+    Scenario("GET", f"{API}/users/me", _as_user(f"{API}/users/me")),
+    Scenario("GET", f"{API}/users/me/activity", _as_user(f"{API}/users/me/activity")),
+    Scenario("GET", f"{API}/users/{{user_id}}/balance", _anonymous(f"{API}/users/{{user_id}}/balance")),
+    Scenario("POST", f"{API}/users/login", _login),
+    Scenario("POST", f"{API}/users/register", _register, write=True),
+
+    Scenario("GET", f"{API}/groups/my-groups", _as_user(f"{API}/groups/my-groups")),
+    Scenario("GET", f"{API}/groups/{{group_id}}/group-members", _as_member(f"{API}/groups/{{group_id}}/group-members")),
+    Scenario("GET", f"{API}/groups/{{group_id}}/balances", _as_member(f"{API}/groups/{{group_id}}/balances")),
+    Scenario("GET", f"{API}/groups/{{group_id}}/settlements", _as_member(f"{API}/groups/{{group_id}}/settlements")),
+    Scenario("GET", f"{API}/groups/{{group_id}}/settlement-history", _as_member(f"{API}/groups/{{group_id}}/settlement-history")),
+    Scenario("GET", f"{API}/groups/{{group_id}}/expenses", _as_member(f"{API}/groups/{{group_id}}/expenses")),
+    Scenario("GET", f"{API}/groups/{{group_id}}/expenses/export", _as_member(f"{API}/groups/{{group_id}}/expenses/export")),
+    Scenario("GET", f"{API}/groups/{{group_id}}/activity-log", _as_member(f"{API}/groups/{{group_id}}/activity-log")),
+    Scenario("POST", f"{API}/groups/", _create_group, write=True),
+    Scenario("POST", f"{API}/groups/{{group_id}}/add/{{user_id}}", _add_member, write=True),
+    Scenario("POST", f"{API}/groups/{{group_id}}/settlements/add", _add_settlement, write=True),
+
+    Scenario("GET", f"{API}/expense/my-expenses", _as_user(f"{API}/expense/my-expenses")),
+    Scenario("GET", f"{API}/expense/debt", _as_user(f"{API}/expense/debt")),
+    Scenario("GET", f"{API}/expense/cred", _as_user(f"{API}/expense/cred")),
+    Scenario("GET", f"{API}/expense/my-expenses/all", _as_user(f"{API}/expense/my-expenses/all")),
+    Scenario("GET", f"{API}/expense/{{expense_id}}", _fetch_expense),
+    Scenario("POST", f"{API}/expense/", _create_expense, write=True),
+    Scenario("POST", f"{API}/expense/bulk", _bulk_expenses, write=True),
+
+    Scenario("GET", f"{API}/balances/overall", _as_user(f"{API}/balances/overall")),
+    Scenario("GET", f"{API}/balances/user/{{user_id}}", _as_user(f"{API}/balances/user/{{user_id}}")),
+    Scenario("GET", f"{API}/balances/simplified", _as_user(f"{API}/balances/simplified")),
+
+    Scenario("GET", f"{API}/notifications/", _as_user(f"{API}/notifications/")),
+    Scenario("GET", f"{API}/notifications/unread-count", _as_user(f"{API}/notifications/unread-count")),
+    Scenario("POST", f"{API}/notifications/mark-read", _mark_read, write=True),
+]
+
+# Routes left out on purpose; anything else without a scenario is reported too
+SKIP_REASONS = {
+    ("POST", f"{API}/users/refresh"): "needs a per-user refresh cookie",
+    ("POST", f"{API}/users/logout"): "clears the refresh token other scenarios rely on",
+    ("PATCH", f"{API}/users/edit/{{user_id}}"): "untyped request body",
+    ("PATCH", f"{API}/groups/{{group_id}}"): "untyped request body",
+    ("PATCH", f"{API}/expense/{{expense_id}}"): "rewrites seeded expenses",
+    ("GET", f"{API}/groups/{{group_id}}/events"): "long-lived stream",
+    ("DELETE", f"{API}/groups/{{group_id}}"): "destructive",
+    ("DELETE", f"{API}/groups/{{group_id}}/remove/{{user_id}}"): "destructive",
+    ("DELETE", f"{API}/groups/{{group_id}}/exit"): "destructive",
+    ("DELETE", f"{API}/groups/{{group_id}}/settlements/undo/{{settlement_id}}"): "destructive",
+    ("DELETE", f"{API}/expense/{{expense_id}}"): "destructive",
+}
+
+def uncovered_routes(scenarios: List[Scenario]) -> List[Tuple[str, str, str]]:
+    covered = {(s.method, s.route) for s in scenarios}
+    missing = []
+
+    for route in app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        for method in sorted(route.methods):
+            if (method, route.path) not in covered:
+                missing.append((method, route.path, SKIP_REASONS.get((method, route.path), "no scenario")))
+
+    return missing
+
+async def load_fixture(sample_expenses: int = 1000) -> Fixture:
+    async with async_session() as db:
+        rows = (await db.execute(select(GroupMember.group_id, GroupMember.user_id))).all()
+        groups = (await db.execute(select(Group.id, Group.created_by))).all()
+        expenses = (await db.execute(
+            select(Expense.id, Expense.group_id)
+            .where(Expense.is_deleted == False)
+            .order_by(Expense.id.desc())
+            .limit(sample_expenses)
+        )).all()
+        # seeded users all share BENCH_PASSWORD
+        emails = (await db.execute(
+            select(User.email).where(User.email.like(BENCH_EMAIL.format("%")))
+        )).scalars().all()
+
+    members: Dict[int, List[int]] = {}
+    for group_id, user_id in rows:
+        members.setdefault(group_id, []).append(user_id)
+
+    if not members:
+        raise SystemExit("no group members found, run `python -m benchmarks.datagen` first")
+
+    user_ids = sorted({uid for uids in members.values() for uid in uids})
+
+    return Fixture(
+        tokens={uid: create_access_token({"sub": str(uid)}, expires_min=24 * 60) for uid in user_ids},
+        members=members,
+        creators={gid: creator for gid, creator in groups if creator is not None and gid in members},
+        expenses=[(e.id, e.group_id) for e in expenses],
+        user_ids=user_ids,
+        emails=list(emails)
+    )
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    fx: Fixture,
+    scenario: Scenario,
+    requests: int,
+    concurrency: int,
+    seed: int
+) -> dict:
+    latencies: List[float] = []
+    queries: List[int] = []
+    statuses: Dict[int, int] = {}
+    remaining = itertools.count()
+
+    async def worker(worker_id: int):
+        rng = random.Random(seed * 1000 + worker_id)
+        while next(remaining) < requests:
+            url, kwargs = scenario.build(fx, rng)
+
+            started = time.perf_counter()
+            res = await client.request(scenario.method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+
+            statuses[res.status_code] = statuses.get(res.status_code, 0) + 1
+            if QUERY_COUNT_HEADER in res.headers:
+                queries.append(int(res.headers[QUERY_COUNT_HEADER]))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "method": scenario.method,
+        "route": scenario.route,
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "rejected": sum(n for status, n in statuses.items() if 400 <= status < 500),
+        "errors": sum(n for status, n in statuses.items() if status >= 500),
+        "statuses": statuses,
+        "queries": statistics.fmean(queries) if queries else None
+    }
+
+def print_report(results: List[dict], skipped: List[Tuple[str, str, str]]):
+    header = f"{'route':<58} {'reqs':>6} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'4xx':>5} {'5xx':>5} {'sql/req':>8}"
+    print(header)
+    print("-" * len(header))
+
+    for r in results:
+        queries = f"{r['queries']:.1f}" if r["queries"] is not None else "-"
+        print(
+            f"{r['method'] + ' ' + r['route']:<58} {r['requests']:>6} {r['rps']:>8.1f} "
+            f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['rejected']:>5} {r['errors']:>5} {queries:>8}"
+        )
+
+    if skipped:
+        print("\nnot exercised:")
+        for method, path, reason in skipped:
+            print(f"  {method} {path} ({reason})")
+
+async def run(
+    requests: int,
+    concurrency: int,
+    seed: int,
+    read_only: bool = False,
+    only: str | None = None
+) -> Tuple[List[dict], List[Tuple[str, str, str]]]:
+    fx = await load_fixture()
+
+    scenarios = [s for s in SCENARIOS if not (read_only and s.write)]
+    if only:
+        scenarios = [s for s in scenarios if only in s.route]
+
+    results = []
+    # In-process ASGI transport: measures the app and the database, not the network
+    transport = httpx.ASGITransport(app=app)
+    # Never keep cookies: login sets an access_token cookie that would override
+    # the per-user bearer tokens for every later request
+    cookies = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", cookies=cookies) as client:
+        for i, scenario in enumerate(scenarios):
+            results.append(await run_scenario(client, fx, scenario, requests, concurrency, seed + i))
+
+    await engine.dispose()
+    return results, uncovered_routes(SCENARIOS)
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive every API route in-process and report latency per route")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--read-only", action="store_true", help="skip scenarios that write")
+    parser.add_argument("--only", help="run routes whose path contains this text")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results, skipped = asyncio.run(run(
+        requests=args.requests,
+        concurrency=args.concurrency,
+        seed=args.seed,
+        read_only=args.read_only,
+        only=args.only
+    ))
+
+    print_report(results, skipped)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"results": results, "skipped": skipped}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
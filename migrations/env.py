@@ -14,6 +14,11 @@ import app.models.group
 import app.models.group_member
 import app.models.expense_split
 import app.models.expense
+import app.models.group_balance
+import app.models.idempotency_key
+import app.models.activity
+import app.models.notification
+import app.models.expense_archive
 
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 
@@ -0,0 +1,213 @@
+"""partition expenses by month
+
+Revision ID: 2c6e8f4a1b57
+Revises: 7d3f1a6b9c84
+Create Date: 2026-02-10 09:27:51.604318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c6e8f4a1b57'
+down_revision: Union[str, Sequence[str], None] = '7d3f1a6b9c84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Partitions created up front past the current month; the app keeps the
+# window moving (app.core.partitions)
+MONTHS_AHEAD = 3
+
+# create_expense_partitions(first, last): one partition of expenses and of
+# expense_splits per month in [first, last], named <table>_pYYYY_MM, UTC bounds
+CREATE_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION create_expense_partitions(first_month date, last_month date)
+RETURNS integer LANGUAGE plpgsql AS $$
+DECLARE
+    cur_month date := date_trunc('month', first_month);
+    created integer := 0;
+    suffix text;
+    lower_bound timestamptz;
+    upper_bound timestamptz;
+BEGIN
+    WHILE cur_month <= last_month LOOP
+        suffix := to_char(cur_month, 'YYYY_MM');
+        lower_bound := cur_month::timestamp AT TIME ZONE 'UTC';
+        upper_bound := (cur_month + interval '1 month')::timestamp AT TIME ZONE 'UTC';
+
+        IF to_regclass('expenses_p' || suffix) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF expenses FOR VALUES FROM (%L) TO (%L)',
+                'expenses_p' || suffix, lower_bound, upper_bound
+            );
+            created := created + 1;
+        END IF;
+
+        IF to_regclass('expense_splits_p' || suffix) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF expense_splits FOR VALUES FROM (%L) TO (%L)',
+                'expense_splits_p' || suffix, lower_bound, upper_bound
+            );
+            created := created + 1;
+        END IF;
+
+        cur_month := cur_month + interval '1 month';
+    END LOOP;
+
+    RETURN created;
+END
+$$
+"""
+
+
+def _serial_sequence(table: str) -> str:
+    return op.get_bind().scalar(sa.text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": table})
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rewrites both tables in one transaction: plan a maintenance window
+    # sized to the data (writes to expenses are blocked meanwhile).
+
+    # 1. Set the monolithic tables aside
+    op.rename_table('expense_splits', 'expense_splits_unpartitioned')
+    op.rename_table('expenses', 'expenses_unpartitioned')
+
+    expense_seq = _serial_sequence('expenses_unpartitioned')
+    split_seq = _serial_sequence('expense_splits_unpartitioned')
+
+    # 2. Partitioned parents; the primary key has to include the partition key
+    op.execute(f"""
+        CREATE TABLE expenses (
+            id integer NOT NULL DEFAULT nextval('{expense_seq}'),
+            group_id integer NOT NULL,
+            paid_by integer NOT NULL,
+            amount numeric(10, 2) NOT NULL,
+            description varchar,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            is_deleted boolean NOT NULL DEFAULT false
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute(f"""
+        CREATE TABLE expense_splits (
+            id integer NOT NULL DEFAULT nextval('{split_seq}'),
+            expense_id integer NOT NULL,
+            expense_created_at timestamptz NOT NULL,
+            user_id integer NOT NULL,
+            amount numeric(10, 2) NOT NULL
+        ) PARTITION BY RANGE (expense_created_at)
+    """)
+
+    # 3. Monthly partitions from the oldest expense to MONTHS_AHEAD out, plus a
+    # default partition so an insert never fails if the window falls behind
+    op.execute(CREATE_PARTITIONS_FUNCTION)
+    op.execute(f"""
+        SELECT create_expense_partitions(
+            coalesce((SELECT min(created_at) FROM expenses_unpartitioned), now())::date,
+            (now() + interval '{MONTHS_AHEAD} months')::date
+        )
+    """)
+    op.execute("CREATE TABLE expenses_default PARTITION OF expenses DEFAULT")
+    op.execute("CREATE TABLE expense_splits_default PARTITION OF expense_splits DEFAULT")
+
+    # 4. Copy the rows; splits take their expense's created_at as partition key
+    op.execute("""
+        INSERT INTO expenses (id, group_id, paid_by, amount, description, created_at, is_deleted)
+        SELECT id, group_id, paid_by, amount, description, coalesce(created_at, now()), is_deleted
+        FROM expenses_unpartitioned
+    """)
+    op.execute("""
+        INSERT INTO expense_splits (id, expense_id, expense_created_at, user_id, amount)
+        SELECT s.id, s.expense_id, coalesce(e.created_at, now()), s.user_id, s.amount
+        FROM expense_splits_unpartitioned s
+        JOIN expenses_unpartitioned e ON e.id = s.expense_id
+    """)
+
+    # 5. Hand the id sequences over before dropping their old owners
+    op.execute(f"ALTER SEQUENCE {expense_seq} OWNED BY expenses.id")
+    op.execute(f"ALTER SEQUENCE {split_seq} OWNED BY expense_splits.id")
+    op.drop_table('expense_splits_unpartitioned')
+    op.drop_table('expenses_unpartitioned')
+
+    # 6. Keys and indexes on the parents cascade to every partition
+    op.create_primary_key('expenses_pkey', 'expenses', ['id', 'created_at'])
+    op.create_primary_key('expense_splits_pkey', 'expense_splits', ['id', 'expense_created_at'])
+    op.create_foreign_key(None, 'expenses', 'groups', ['group_id'], ['id'])
+    op.create_foreign_key(None, 'expenses', 'users', ['paid_by'], ['id'])
+    op.create_foreign_key(None, 'expense_splits', 'users', ['user_id'], ['id'])
+    op.create_foreign_key(
+        'expense_splits_expense_fkey', 'expense_splits', 'expenses',
+        ['expense_id', 'expense_created_at'], ['id', 'created_at']
+    )
+
+    op.create_index(op.f('ix_expenses_id'), 'expenses', ['id'], unique=False)
+    op.create_index('ix_expenses_group_created', 'expenses', ['group_id', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+    op.create_index('ix_expenses_group_active', 'expenses', ['group_id'], unique=False, postgresql_where=sa.text('is_deleted = false'))
+    op.create_index('ix_expenses_deleted', 'expenses', ['id'], unique=False, postgresql_where=sa.text('is_deleted = true'))
+    op.create_index('ix_expenses_paid_by_created', 'expenses', ['paid_by', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+    op.create_index(op.f('ix_expense_splits_id'), 'expense_splits', ['id'], unique=False)
+    op.create_index(op.f('ix_expense_splits_expense_id'), 'expense_splits', ['expense_id'], unique=False)
+    op.create_index('ix_expense_splits_user_expense', 'expense_splits', ['user_id', 'expense_id'], unique=False)
+
+    op.execute("ANALYZE expenses")
+    op.execute("ANALYZE expense_splits")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.rename_table('expense_splits', 'expense_splits_partitioned')
+    op.rename_table('expenses', 'expenses_partitioned')
+
+    expense_seq = _serial_sequence('expenses_partitioned')
+    split_seq = _serial_sequence('expense_splits_partitioned')
+
+    op.execute(f"""
+        CREATE TABLE expenses (
+            id integer NOT NULL DEFAULT nextval('{expense_seq}'),
+            group_id integer NOT NULL,
+            paid_by integer NOT NULL,
+            amount numeric(10, 2) NOT NULL,
+            description varchar,
+            created_at timestamptz DEFAULT now(),
+            is_deleted boolean NOT NULL DEFAULT false
+        )
+    """)
+    op.execute(f"""
+        CREATE TABLE expense_splits (
+            id integer NOT NULL DEFAULT nextval('{split_seq}'),
+            expense_id integer NOT NULL,
+            user_id integer NOT NULL,
+            amount numeric(10, 2) NOT NULL
+        )
+    """)
+    op.execute("INSERT INTO expenses SELECT * FROM expenses_partitioned")
+    op.execute("""
+        INSERT INTO expense_splits (id, expense_id, user_id, amount)
+        SELECT id, expense_id, user_id, amount FROM expense_splits_partitioned
+    """)
+
+    op.execute(f"ALTER SEQUENCE {expense_seq} OWNED BY expenses.id")
+    op.execute(f"ALTER SEQUENCE {split_seq} OWNED BY expense_splits.id")
+    # dropping the parents drops every partition with them
+    op.drop_table('expense_splits_partitioned')
+    op.drop_table('expenses_partitioned')
+    op.execute("DROP FUNCTION create_expense_partitions(date, date)")
+
+    op.create_primary_key('expenses_pkey', 'expenses', ['id'])
+    op.create_primary_key('expense_splits_pkey', 'expense_splits', ['id'])
+    op.create_foreign_key(None, 'expenses', 'groups', ['group_id'], ['id'])
+    op.create_foreign_key(None, 'expenses', 'users', ['paid_by'], ['id'])
+    op.create_foreign_key(None, 'expense_splits', 'users', ['user_id'], ['id'])
+    op.create_foreign_key(None, 'expense_splits', 'expenses', ['expense_id'], ['id'])
+
+    op.create_index(op.f('ix_expenses_id'), 'expenses', ['id'], unique=False)
+    op.create_index('ix_expenses_group_created', 'expenses', ['group_id', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+    op.create_index('ix_expenses_group_active', 'expenses', ['group_id'], unique=False, postgresql_where=sa.text('is_deleted = false'))
+    op.create_index('ix_expenses_deleted', 'expenses', ['id'], unique=False, postgresql_where=sa.text('is_deleted = true'))
+    op.create_index('ix_expenses_paid_by_created', 'expenses', ['paid_by', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+    op.create_index(op.f('ix_expense_splits_id'), 'expense_splits', ['id'], unique=False)
+    op.create_index(op.f('ix_expense_splits_expense_id'), 'expense_splits', ['expense_id'], unique=False)
+    op.create_index('ix_expense_splits_user_expense', 'expense_splits', ['user_id', 'expense_id'], unique=False)
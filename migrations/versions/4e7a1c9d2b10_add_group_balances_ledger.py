@@ -0,0 +1,37 @@
+"""add group_balances ledger
+
+Revision ID: 4e7a1c9d2b10
+Revises: 18b8273a8a99
+Create Date: 2026-01-05 10:12:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e7a1c9d2b10'
+down_revision: Union[str, Sequence[str], None] = '18b8273a8a99'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('group_balances',
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('net_cents', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('group_id', 'user_id')
+    )
+    # Existing data is backfilled with: python -m app.commands.rebuild_balances
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('group_balances')
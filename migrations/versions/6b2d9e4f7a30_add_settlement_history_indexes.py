@@ -0,0 +1,51 @@
+"""add settlement history indexes
+
+Revision ID: 6b2d9e4f7a30
+Revises: 2c6e8f4a1b57
+Create Date: 2026-10-18 04:12:37.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b2d9e4f7a30'
+down_revision: Union[str, Sequence[str], None] = '2c6e8f4a1b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Earlier revisions never created the table (databases built with
+    # create_all have it); create it where it is missing
+    if not sa.inspect(op.get_bind()).has_table('settlement_history'):
+        op.create_table('settlement_history',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('group_id', sa.Integer(), nullable=False),
+            sa.Column('from_user', sa.Integer(), nullable=False),
+            sa.Column('to_user', sa.Integer(), nullable=False),
+            sa.Column('amount', sa.Float(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+            sa.ForeignKeyConstraint(['from_user'], ['users.id'], ),
+            sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ),
+            sa.ForeignKeyConstraint(['to_user'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_settlement_history_id'), 'settlement_history', ['id'], unique=False)
+
+    # Built CONCURRENTLY so live writes to the table are not blocked
+    with op.get_context().autocommit_block():
+        op.create_index('ix_settlement_history_group_created', 'settlement_history', ['group_id', sa.text('created_at DESC')], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_settlement_history_from_user', 'settlement_history', ['from_user'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_settlement_history_to_user', 'settlement_history', ['to_user'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_settlement_history_to_user', table_name='settlement_history')
+    op.drop_index('ix_settlement_history_from_user', table_name='settlement_history')
+    op.drop_index('ix_settlement_history_group_created', table_name='settlement_history')
@@ -0,0 +1,62 @@
+"""add expense archive
+
+Revision ID: 7d3f1a6b9c84
+Revises: e4a9b7c3d512
+Create Date: 2026-02-03 14:12:36.918207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3f1a6b9c84'
+down_revision: Union[str, Sequence[str], None] = 'e4a9b7c3d512'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('expenses_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('paid_by', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('is_deleted', sa.Boolean(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['paid_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_expenses_archive_group_created', 'expenses_archive', ['group_id', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+    op.create_index('ix_expenses_archive_paid_by', 'expenses_archive', ['paid_by'], unique=False)
+    op.create_table('expense_splits_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('expense_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['expense_id'], ['expenses_archive.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_expense_splits_archive_expense_id'), 'expense_splits_archive', ['expense_id'], unique=False)
+    op.create_index('ix_expense_splits_archive_user_expense', 'expense_splits_archive', ['user_id', 'expense_id'], unique=False)
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_expenses_deleted', 'expenses', ['id'], unique=False, postgresql_where=sa.text('is_deleted = true'), postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_expenses_deleted', table_name='expenses', postgresql_where=sa.text('is_deleted = true'))
+    op.drop_index('ix_expense_splits_archive_user_expense', table_name='expense_splits_archive')
+    op.drop_index(op.f('ix_expense_splits_archive_expense_id'), table_name='expense_splits_archive')
+    op.drop_table('expense_splits_archive')
+    op.drop_index('ix_expenses_archive_paid_by', table_name='expenses_archive')
+    op.drop_index('ix_expenses_archive_group_created', table_name='expenses_archive')
+    op.drop_table('expenses_archive')
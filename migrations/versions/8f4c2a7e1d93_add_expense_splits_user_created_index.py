@@ -0,0 +1,30 @@
+"""add expense_splits user created index
+
+Revision ID: 8f4c2a7e1d93
+Revises: 6b2d9e4f7a30
+Create Date: 2026-10-18 09:41:05.527310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f4c2a7e1d93'
+down_revision: Union[str, Sequence[str], None] = '6b2d9e4f7a30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # expense_splits is partitioned, and PostgreSQL can't build an index on a
+    # partitioned parent CONCURRENTLY; it cascades to every partition
+    op.create_index('ix_expense_splits_user_created', 'expense_splits', ['user_id', sa.text('expense_created_at DESC'), sa.text('expense_id DESC')], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_expense_splits_user_created', table_name='expense_splits')
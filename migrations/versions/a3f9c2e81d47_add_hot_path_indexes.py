@@ -0,0 +1,56 @@
+"""add hot path indexes
+
+Revision ID: a3f9c2e81d47
+Revises: 4e7a1c9d2b10
+Create Date: 2026-01-19 16:40:02.503716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f9c2e81d47'
+down_revision: Union[str, Sequence[str], None] = '4e7a1c9d2b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Membership must be unique before the constraint can be added
+    op.execute("""
+        DELETE FROM group_members a
+        USING group_members b
+        WHERE a.group_id = b.group_id
+          AND a.user_id = b.user_id
+          AND a.id > b.id
+    """)
+
+    # Built CONCURRENTLY so live writes to these tables are not blocked
+    with op.get_context().autocommit_block():
+        op.create_index('uq_group_members_group_user', 'group_members', ['group_id', 'user_id'], unique=True, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index(op.f('ix_group_members_user_id'), 'group_members', ['user_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index(op.f('ix_expense_splits_expense_id'), 'expense_splits', ['expense_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_expense_splits_user_expense', 'expense_splits', ['user_id', 'expense_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_expenses_group_created', 'expenses', ['group_id', sa.text('created_at DESC'), sa.text('id DESC')], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_expenses_group_active', 'expenses', ['group_id'], unique=False, postgresql_where=sa.text('is_deleted = false'), postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_expenses_paid_by_created', 'expenses', ['paid_by', sa.text('created_at DESC'), sa.text('id DESC')], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+    op.execute(
+        "ALTER TABLE group_members ADD CONSTRAINT uq_group_members_group_user "
+        "UNIQUE USING INDEX uq_group_members_group_user"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_group_members_group_user', 'group_members', type_='unique')
+    op.drop_index('ix_expenses_paid_by_created', table_name='expenses')
+    op.drop_index('ix_expenses_group_active', table_name='expenses', postgresql_where=sa.text('is_deleted = false'))
+    op.drop_index('ix_expenses_group_created', table_name='expenses')
+    op.drop_index('ix_expense_splits_user_expense', table_name='expense_splits')
+    op.drop_index(op.f('ix_expense_splits_expense_id'), table_name='expense_splits')
+    op.drop_index(op.f('ix_group_members_user_id'), table_name='group_members')
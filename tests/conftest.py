@@ -0,0 +1,92 @@
+import os
+import tempfile
+
+# Every run drops and recreates the tables, so the suite gets its own
+# database: TEST_DATABASE_URL (a scratch PostgreSQL database, needed for the
+# query plan tests) or else a throwaway SQLite file. Set before app imports.
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL") or f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ.setdefault("JWT_SECRET", "test-secret-not-for-production-use")
+os.environ["SHARD_DATABASE_URLS"] = ""
+os.environ["READ_REPLICA_URLS"] = ""
+os.environ["EVENTS_PG_BRIDGE"] = "false"
+
+import httpx
+import pytest
+from sqlalchemy import insert
+from app.main import app
+from app.db.session import Base, engine, async_session
+from app.core.jwt_config import create_access_token
+from app.core.security import hash_password
+from app.models.user import User
+from app.models.group import Group
+from app.models.group_member import GroupMember
+from app.models.expense import Expense
+from app.models.expense_split import ExpenseSplit
+from app.services.ledger_services import rebuild_group_balances
+# registers every remaining table on Base.metadata
+import benchmarks.datagen
+
+API = "/api/v1"
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture(scope="module")
+async def schema(anyio_backend):
+    # Fresh tables for every test module
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    await engine.dispose()
+
+@pytest.fixture
+async def client(schema):
+    # ASGITransport skips the lifespan, so no background task runs
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+def auth(user_id: int) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+async def seed_group(name: str, members: int, expenses: int) -> dict:
+    # A group whose members take turns paying expenses split equally between
+    # all of them, with its balance ledger rebuilt to match
+    password_hash = hash_password("test-password")
+
+    async with async_session() as db:
+        user_ids = (await db.execute(
+            insert(User.__table__).returning(User.id, sort_by_parameter_order=True),
+            [
+                {"email": f"{name}-{i}@example.com", "name": f"{name} {i}", "password_hash": password_hash, "is_active": True}
+                for i in range(members)
+            ]
+        )).scalars().all()
+
+        group_id = (await db.execute(
+            insert(Group.__table__).returning(Group.id),
+            [{"name": name, "created_by": user_ids[0]}]
+        )).scalar_one()
+        await db.execute(insert(GroupMember.__table__), [
+            {"group_id": group_id, "user_id": uid} for uid in user_ids
+        ])
+
+        if expenses:
+            rows = (await db.execute(
+                insert(Expense.__table__).returning(Expense.id, Expense.created_at, sort_by_parameter_order=True),
+                [
+                    {"group_id": group_id, "paid_by": user_ids[i % members], "amount": members * (i % 7 + 1), "description": f"expense {i}"}
+                    for i in range(expenses)
+                ]
+            )).all()
+            await db.execute(insert(ExpenseSplit.__table__), [
+                {"expense_id": row.id, "expense_created_at": row.created_at, "user_id": uid, "amount": i % 7 + 1}
+                for i, row in enumerate(rows)
+                for uid in user_ids
+            ])
+
+        await rebuild_group_balances(db, group_id)
+        await db.commit()
+
+    return {"group_id": group_id, "user_ids": user_ids}
@@ -0,0 +1,15 @@
+import pytest
+from tests.conftest import API, auth, seed_group
+
+pytestmark = pytest.mark.anyio
+
+async def test_adding_a_member_checks_the_user_exists(client):
+    group = await seed_group("members", members=1, expenses=0)
+    other = await seed_group("members-other", members=1, expenses=0)
+    headers = auth(group["user_ids"][0])
+
+    res = await client.post(f"{API}/groups/{group['group_id']}/add/{other['user_ids'][0] + 1000}", headers=headers)
+    assert res.status_code == 404
+
+    res = await client.post(f"{API}/groups/{group['group_id']}/add/{other['user_ids'][0]}", headers=headers)
+    assert res.status_code == 200, res.text
@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
+from app.core.idempotency import IDEMPOTENCY_HEADER, REPLAY_HEADER, idempotent, idempotency_cache
+from app.db.session import async_session
+from app.models.expense import Expense
+from app.models.idempotency_key import IdempotencyKey
+from tests.conftest import API, auth, seed_group
+
+pytestmark = pytest.mark.anyio
+
+async def stored_key(user_id: int, key: str) -> IdempotencyKey | None:
+    async with async_session() as db:
+        q = select(IdempotencyKey).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        return (await db.execute(q)).scalar_one_or_none()
+
+async def test_retried_expense_is_replayed_not_duplicated(client):
+    group = await seed_group("idem-replay", members=2, expenses=0)
+    user_id = group["user_ids"][0]
+    headers = {**auth(user_id), IDEMPOTENCY_HEADER: "replay-1"}
+    body = {"group_id": group["group_id"], "amount": 10, "description": "taxi", "split_mode": "equal"}
+
+    first = await client.post(f"{API}/expense/", json=body, headers=headers)
+    assert first.status_code == 200, first.text
+
+    # the response was committed with the claim
+    stored = await stored_key(user_id, "replay-1")
+    assert stored.status_code == 200 and stored.response_body == first.text
+
+    # from the table, not this process's cache
+    idempotency_cache._entries.clear()
+    second = await client.post(f"{API}/expense/", json=body, headers=headers)
+    assert second.headers[REPLAY_HEADER] == "true"
+    assert second.json() == first.json()
+
+    async with async_session() as db:
+        count = (await db.execute(select(func.count()).where(Expense.group_id == group["group_id"]))).scalar_one()
+    assert count == 1
+
+async def test_failed_write_leaves_the_key_unused(client):
+    group = await seed_group("idem-failed", members=1, expenses=0)
+    user_id = group["user_ids"][0]
+
+    async def fails_after_staging(before_commit):
+        await before_commit({"ok": True})
+        # e.g. a foreign key violated by the write itself
+        raise IntegrityError("INSERT ...", {}, Exception("violates foreign key constraint"))
+
+    async with async_session() as db:
+        with pytest.raises(IntegrityError):
+            await idempotent(db, user_id, "failed-1", "fp", fails_after_staging)
+
+    assert await stored_key(user_id, "failed-1") is None
+
+    async def succeeds(before_commit):
+        await before_commit({"ok": True})
+        await db.commit()
+        return {"ok": True}
+
+    async with async_session() as db:
+        res = await idempotent(db, user_id, "failed-1", "fp", succeeds)
+    assert res.status_code == 200 and REPLAY_HEADER not in res.headers
@@ -0,0 +1,34 @@
+import pytest
+from tests.conftest import API
+
+pytestmark = pytest.mark.anyio
+
+async def test_metrics_follow_the_text_format(client):
+    res = await client.get(f"{API}/system/metrics")
+    assert res.status_code == 200
+
+    helps, types, samples = set(), {}, []
+    for line in res.text.splitlines():
+        if line.startswith("# HELP "):
+            helps.add(line.split()[2])
+        elif line.startswith("# TYPE "):
+            _, _, name, kind = line.split()
+            types[name] = kind
+        else:
+            samples.append(line.split("{")[0].split()[0])
+
+    for sample in samples:
+        family = next(name for name in (sample, sample.rsplit("_", 1)[0]) if name in types)
+        assert family in helps, sample
+
+    # counters end in _total and keep their type; current levels stay gauges
+    for name, kind in types.items():
+        if kind == "counter":
+            assert name.endswith("_total"), name
+
+    assert types["splitwise_principal_cache_hits_total"] == "counter"
+    assert types["splitwise_password_hash_wait_seconds_total"] == "counter"
+    assert types["splitwise_db_pool_checkouts_total"] == "counter"
+    assert types["splitwise_principal_cache_size"] == "gauge"
+    assert types["splitwise_password_hash_queue_depth"] == "gauge"
+    assert types["splitwise_idempotency_cache_in_flight"] == "gauge"
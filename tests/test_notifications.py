@@ -0,0 +1,31 @@
+import pytest
+from app.db.session import async_session
+from app.services.notification_services import notification_rows, fan_out
+from tests.conftest import API, auth, seed_group
+
+pytestmark = pytest.mark.anyio
+
+async def unread_count(client, user_id: int) -> int:
+    res = await client.get(f"{API}/notifications/unread-count", headers=auth(user_id))
+    assert res.status_code == 200
+    return res.json()["unread_count"]
+
+async def test_deleting_a_group_drops_its_unread_notifications(client):
+    doomed = await seed_group("notify-doomed", members=3, expenses=0)
+    kept = await seed_group("notify-kept", members=2, expenses=0)
+    owner, member, other = doomed["user_ids"]
+
+    async with async_session() as db:
+        for _ in range(2):
+            await fan_out(db, notification_rows("expense_added", owner, doomed["group_id"], [(member, 100), (other, 100)]))
+        # news from another group stays on the badge
+        await fan_out(db, notification_rows("expense_added", kept["user_ids"][0], kept["group_id"], [(member, 100)]))
+        await db.commit()
+
+    assert await unread_count(client, member) == 3
+
+    res = await client.delete(f"{API}/groups/{doomed['group_id']}", headers=auth(owner))
+    assert res.status_code == 200
+
+    assert await unread_count(client, member) == 1
+    assert await unread_count(client, other) == 0
@@ -0,0 +1,102 @@
+import base64
+import json
+from datetime import datetime, timezone
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from app.core.pagination import encode_cursor, decode_cursor, keyset_page, split_page
+from app.models.expense import Expense
+from app.db.session import async_session
+from tests.conftest import API, auth, seed_group
+
+CREATED = datetime(2026, 3, 1, 12, 30, 15, 250000, tzinfo=timezone.utc)
+
+def raw_cursor(data: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(CREATED, 42)) == (CREATED, 42)
+    assert decode_cursor(encode_cursor(CREATED, 7, 9), id_count=2) == (CREATED, 7, 9)
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not-a-cursor",
+    encode_cursor(CREATED, 1)[:-3],
+    # valid ids, but no usable created_at
+    raw_cursor({"ids": [1]}),
+    raw_cursor({"created_at": "yesterday", "ids": [1]}),
+    raw_cursor({"created_at": None, "ids": [1]}),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
+
+def test_cursor_with_wrong_id_count_is_rejected():
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(encode_cursor(CREATED, 1), id_count=2)
+    assert exc.value.status_code == 400
+
+def test_keyset_page_fetches_one_extra_row_after_the_cursor():
+    q = keyset_page(select(Expense.id), Expense.created_at, Expense.id, limit=10, after=encode_cursor(CREATED, 5))
+    sql = str(q)
+
+    assert "(expenses.created_at, expenses.id) <" in sql
+    assert "ORDER BY expenses.created_at DESC, expenses.id DESC" in sql
+    assert q._limit == 11
+
+def test_split_page_only_sets_a_cursor_when_rows_remain():
+    rows = [(CREATED, i) for i in range(3, 0, -1)]
+
+    assert split_page(rows, 3, key=lambda r: r) == (rows, None)
+
+    page, cursor = split_page(rows, 2, key=lambda r: r)
+    assert page == rows[:2]
+    assert decode_cursor(cursor) == rows[1]
+
+@pytest.mark.anyio
+async def test_group_expense_pages_advance_past_equal_timestamps(client):
+    # one insert statement: every expense gets the same created_at default
+    group = await seed_group("paging", members=2, expenses=5)
+    headers = auth(group["user_ids"][0])
+
+    seen = []
+    after = None
+    for _ in range(5):
+        params = {"limit": 2} if after is None else {"limit": 2, "after": after}
+        page = (await client.get(f"{API}/groups/{group['group_id']}/expenses", params=params, headers=headers)).json()
+        seen += [e["id"] for e in page["expenses"]]
+        after = page["next_cursor"]
+        if after is None:
+            break
+
+    assert after is None
+    assert sorted(seen, reverse=True) == seen and len(set(seen)) == 5
+
+@pytest.mark.anyio
+async def test_involved_expense_pages_merge_paid_and_split(client):
+    # the first member pays every other expense and has a split in all of
+    # them, so half the rows come from both sides of the union
+    group = await seed_group("involved", members=2, expenses=7)
+    headers = auth(group["user_ids"][0])
+
+    async with async_session() as db:
+        deleted_id = (await db.execute(
+            select(Expense.id).where(Expense.group_id == group["group_id"]).order_by(Expense.id).limit(1)
+        )).scalar_one()
+        await db.execute(update(Expense).where(Expense.id == deleted_id).values(is_deleted=True))
+        await db.commit()
+
+    seen = []
+    after = None
+    for _ in range(7):
+        params = {"limit": 2} if after is None else {"limit": 2, "after": after}
+        page = (await client.get(f"{API}/expense/my-expenses/all", params=params, headers=headers)).json()
+        seen += [e["id"] for e in page["expenses"]]
+        after = page["next_cursor"]
+        if after is None:
+            break
+
+    assert after is None
+    assert sorted(seen, reverse=True) == seen and len(set(seen)) == len(seen) == 6
+    assert deleted_id not in seen
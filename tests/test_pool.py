@@ -0,0 +1,47 @@
+import asyncio
+import time
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.db.pool import InstrumentedAsyncPool, pool_stats
+
+pytestmark = pytest.mark.anyio
+
+CONNECT_SECONDS = 0.2
+HOLD_SECONDS = 0.2
+
+async def test_checkout_wait_excludes_connecting():
+    e = create_async_engine("sqlite+aiosqlite://", poolclass=InstrumentedAsyncPool, pool_size=1, max_overflow=0)
+
+    @event.listens_for(e.sync_engine, "do_connect")
+    def slow_connect(dialect, conn_rec, cargs, cparams):
+        time.sleep(CONNECT_SECONDS)
+
+    try:
+        # 1. A pool with room opens a connection: no waiting
+        async with e.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+        stats = pool_stats(e.pool)
+        assert stats["connects"] == 1
+        assert stats["connect_seconds_total"] >= CONNECT_SECONDS
+        assert stats["wait_seconds_total"] < CONNECT_SECONDS / 2
+
+        # 2. The only connection is busy: the second checkout waits for it
+        async def hold():
+            async with e.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                await asyncio.sleep(HOLD_SECONDS)
+
+        async def wait_for_it():
+            await asyncio.sleep(HOLD_SECONDS / 4)
+            async with e.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        await asyncio.gather(hold(), wait_for_it())
+
+        stats = pool_stats(e.pool)
+        assert stats["checkouts"] == 3 and stats["connects"] == 1
+        assert stats["wait_seconds_total"] >= HOLD_SECONDS / 2
+    finally:
+        await e.dispose()
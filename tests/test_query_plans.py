@@ -0,0 +1,123 @@
+import json
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event, select, text, func
+from app.db.session import engine, async_session
+from app.models.expense import Expense
+from app.models.group_member import GroupMember
+from benchmarks.datagen import seed
+from app.core.utils import ledger_entries
+from tests.conftest import API, auth
+
+pytestmark = [
+    pytest.mark.anyio,
+    pytest.mark.skipif(engine.dialect.name != "postgresql", reason="query plans need TEST_DATABASE_URL (PostgreSQL)")
+]
+
+# Enough rows that the planner prefers indexes on its own where they apply
+SEED = {"users": 1000, "groups": 200, "expenses": 50000}
+# An unconditioned scan of an index this big reads a hot table end to end;
+# below it (users, empty archive tables) it is just the planner's join choice
+FULL_SCAN_ROWS = 5000
+
+@pytest.fixture(scope="module")
+async def seeded(schema):
+    await seed(**SEED)
+
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("ANALYZE")
+
+    # the busiest group and one of its members
+    async with async_session() as db:
+        group_id = (await db.execute(
+            select(Expense.group_id).group_by(Expense.group_id).order_by(func.count().desc()).limit(1)
+        )).scalar_one()
+        user_id = (await db.execute(select(GroupMember.user_id).where(GroupMember.group_id == group_id).limit(1))).scalar_one()
+
+    return {"group_id": group_id, "user_id": user_id}
+
+@contextmanager
+def captured_selects():
+    # Every read sent to the database meanwhile, with its parameters
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+def full_scans(node: dict, index_rows: dict) -> list:
+    # Seq scans, and index scans without an Index Cond over a big index: with
+    # seq scans priced out, walking a whole unrelated index is how a missing
+    # index shows up
+    found = []
+    node_type = node["Node Type"]
+
+    if node_type == "Seq Scan":
+        found.append(f"Seq Scan on {node['Relation Name']}")
+    elif (
+        node_type in ("Index Scan", "Index Only Scan", "Bitmap Index Scan")
+        and "Index Cond" not in node
+        and index_rows.get(node["Index Name"], 0) >= FULL_SCAN_ROWS
+    ):
+        found.append(f"{node_type} without a condition on {node['Index Name']}")
+
+    for child in node.get("Plans", []):
+        found += full_scans(child, index_rows)
+    return found
+
+async def plan_full_scans(statement: str, parameters) -> list:
+    # Full scans in the plan the database would run for this statement
+    async with engine.connect() as conn:
+        index_rows = dict((await conn.execute(text(
+            "SELECT relname, reltuples FROM pg_class WHERE relkind = 'i'"
+        ))).all())
+
+        # Force index-driven plans: where no index serves a lookup or join,
+        # the planner is left with a full scan
+        for setting in ("enable_seqscan", "enable_hashjoin", "enable_mergejoin"):
+            await conn.exec_driver_sql(f"SET {setting} = off")
+        plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)).scalar()
+        await conn.rollback()
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return full_scans(plan[0]["Plan"], index_rows)
+
+@pytest.mark.parametrize("path", [
+    "/groups/{group_id}/expenses",
+    "/groups/{group_id}/group-members",
+    "/groups/{group_id}/balances",
+    "/groups/{group_id}/settlements",
+    "/groups/{group_id}/settlement-history",
+    "/expense/my-expenses",
+    "/expense/my-expenses/all",
+    "/expense/debt",
+    "/expense/cred",
+    "/users/{user_id}/balance",
+])
+async def test_hot_queries_use_indexes(client, seeded, path):
+    with captured_selects() as statements:
+        res = await client.get(API + path.format(**seeded), headers=auth(seeded["user_id"]))
+    assert res.status_code == 200, res.text
+
+    assert statements
+    for statement, parameters in statements:
+        assert await plan_full_scans(statement, parameters) == [], statement
+
+async def test_group_ledger_uses_indexes(seeded):
+    # what rebuild_group_balances aggregates for one group
+    entries = ledger_entries(group_id=seeded["group_id"])
+    totals_q = select(entries.c.user_id, func.sum(entries.c.cents)).group_by(entries.c.user_id)
+
+    with captured_selects() as statements:
+        async with async_session() as db:
+            await db.execute(totals_q)
+
+    for statement, parameters in statements:
+        assert await plan_full_scans(statement, parameters) == [], statement
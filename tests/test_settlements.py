@@ -0,0 +1,36 @@
+import pytest
+from app.core.metrics import QUERY_COUNT_HEADER
+from tests.conftest import API, auth, seed_group
+
+pytestmark = pytest.mark.anyio
+
+async def settlement_queries(client, group: dict) -> int:
+    headers = auth(group["user_ids"][0])
+    # The first request also loads the principal into its cache
+    await client.get(f"{API}/groups/{group['group_id']}/settlements", headers=headers)
+
+    res = await client.get(f"{API}/groups/{group['group_id']}/settlements", headers=headers)
+    assert res.status_code == 200
+
+    queries = int(res.headers[QUERY_COUNT_HEADER])
+    assert queries > 0
+    return queries
+
+async def test_settlement_query_count_does_not_grow_with_history(client):
+    small = await seed_group("settle-small", members=4, expenses=10)
+    large = await seed_group("settle-large", members=4, expenses=1000)
+
+    assert await settlement_queries(client, small) == await settlement_queries(client, large)
+
+async def test_settlements_clear_every_balance(client):
+    group = await seed_group("settle-plan", members=3, expenses=5)
+    headers = auth(group["user_ids"][0])
+
+    balances = (await client.get(f"{API}/groups/{group['group_id']}/balances", headers=headers)).json()["net"]
+    transfers = (await client.get(f"{API}/groups/{group['group_id']}/settlements", headers=headers)).json()
+
+    for t in transfers:
+        balances[str(t["from_user"])] += t["amount"]
+        balances[str(t["to_user"])] -= t["amount"]
+
+    assert all(abs(v) < 0.005 for v in balances.values())
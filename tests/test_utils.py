@@ -0,0 +1,51 @@
+import pytest
+from app.core.utils import allocate_cents, simplify_debts, simplify_debts_optimal, EXACT_SOLVER_MAX_USERS
+
+def settle(net_map, transfers):
+    left = dict(net_map)
+    for from_user, to_user, cents in transfers:
+        assert cents > 0
+        left[from_user] += cents
+        left[to_user] -= cents
+    return left
+
+@pytest.mark.parametrize("total, weights, expected", [
+    (100, [1, 1, 1], [34, 33, 33]),
+    (1, [1, 1], [1, 0]),
+    (0, [1, 2], [0, 0]),
+    (1000, [1, 0, 1], [500, 0, 500]),
+    (1001, ["33.3", "33.3", "33.4"], [333, 333, 335]),
+])
+def test_allocate_cents(total, weights, expected):
+    assert allocate_cents(total, weights) == expected
+
+def test_allocate_cents_always_adds_up():
+    for total in range(0, 500, 7):
+        for weights in ([3, 3, 3], [1, 2, 4], ["0.1", "0.2", "0.7"], [5]):
+            assert sum(allocate_cents(total, weights)) == total
+
+def test_optimal_beats_greedy_on_zero_sum_subgroups():
+    net_map = {1: 400, 2: 300, 3: -300, 4: -200, 5: -200}
+
+    transfers = simplify_debts_optimal(net_map, budget_ms=1000)
+
+    assert len(simplify_debts(net_map)) == 4
+    assert len(transfers) == 3
+    assert all(v == 0 for v in settle(net_map, transfers).values())
+
+@pytest.mark.parametrize("net_map", [{}, {1: 0, 2: 0}])
+def test_optimal_with_nothing_owed(net_map):
+    assert simplify_debts_optimal(net_map, budget_ms=1000) == []
+
+def test_optimal_heuristic_above_exact_limit():
+    # pairs that cancel out: one transfer each
+    pairs = EXACT_SOLVER_MAX_USERS
+    net_map = {}
+    for i in range(pairs):
+        net_map[2 * i] = 100 * (i + 1)
+        net_map[2 * i + 1] = -100 * (i + 1)
+
+    transfers = simplify_debts_optimal(net_map, budget_ms=1000)
+
+    assert len(transfers) == pairs
+    assert all(v == 0 for v in settle(net_map, transfers).values())